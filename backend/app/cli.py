@@ -0,0 +1,320 @@
+"""
+Verify a directory tree of label images offline, without the HTTP API.
+
+Images go through the same path as POST /api/verify (result cache, OCR
+process pool, validators). One record per image is appended to the output
+as it finishes, so an interrupted run picks up where it stopped when it is
+started again with the same output file.
+
+Run from backend/:
+    python -m app.cli LABEL_DIR -o results.jsonl [--format csv] [--mode auto]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.models.schemas import FieldResults, ImageResult
+from app.routers.verify import OCR_MODES, verify_content
+from app.services.archives import is_image_name
+from app.services.cache import shutdown_cache
+from app.services.engine import shutdown_engine
+from app.services.executor import pool_size, shutdown_pool
+from app.services.similarity import shutdown_near_duplicate_index
+from app.services.uploads import read_file
+
+FIELDS = list(FieldResults.model_fields)
+
+CSV_COLUMNS = [
+    "path",
+    "status",
+    "is_compliant",
+    "detected",
+    "missing",
+    "formatting_issues",
+    *(column for field in FIELDS for column in (f"{field}_status", field)),
+    "processing_time_ms",
+    "cached",
+    "timed_out",
+    "error",
+]
+
+# Progress goes to stderr every this many images
+PROGRESS_EVERY = 50
+
+
+def find_images(root: str) -> List[str]:
+    """Image paths under root, relative to it, in a stable order."""
+    paths = []
+    for directory, subdirs, files in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+        for name in sorted(files):
+            path = os.path.relpath(os.path.join(directory, name), root)
+            path = path.replace(os.sep, "/")
+            if is_image_name(path):
+                paths.append(path)
+    return paths
+
+
+def _jsonl_complete_bytes(data: bytes) -> int:
+    """Length of data up to the end of its last whole, decodable line."""
+    end = offset = 0
+    for line in data.splitlines(keepends=True):
+        offset += len(line)
+        if not line.endswith(b"\n"):
+            break
+        if line.strip():
+            try:
+                json.loads(line)
+            except ValueError:
+                continue
+        end = offset
+    return end
+
+
+def _csv_complete_chars(text: str) -> int:
+    """
+    Length of text up to the end of its last whole record. Quoted fields
+    (raw text, issues) can hold newlines, so records are found with the
+    csv module, not by line: a record is whole once it ends in a newline
+    outside quotes with as many fields as the header.
+    """
+    end = offset = 0
+
+    def lines():
+        nonlocal offset
+        for line in io.StringIO(text, newline=""):
+            offset += len(line)
+            yield line
+
+    columns = None
+    try:
+        # strict: data ending inside a quoted field is an error, not a row
+        for row in csv.reader(lines(), strict=True):
+            columns = len(row) if columns is None else columns
+            if len(row) == columns and text[offset - 1 : offset] == "\n":
+                end = offset
+    except csv.Error:
+        pass
+    return end
+
+
+def _repair(output: str, fmt: str) -> None:
+    """Drop a record cut short by an interrupted write, and anything after it."""
+    with open(output, "rb+") as f:
+        data = f.read()
+        if fmt == "csv":
+            text = data.decode("utf-8", "replace")
+            end = len(text[: _csv_complete_chars(text)].encode("utf-8"))
+        else:
+            end = _jsonl_complete_bytes(data)
+        if end < len(data):
+            f.truncate(end)
+
+
+def completed_paths(output: str, fmt: str) -> Set[str]:
+    """Paths that already have a result in output; failed ones are retried."""
+    if not os.path.exists(output):
+        return set()
+    _repair(output, fmt)
+    done = set()
+    with open(output, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                if row.get("status") == "done":
+                    done.add(row["path"])
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "result" in record:
+                    done.add(record["path"])
+    return done
+
+
+class RecordWriter:
+    """Appends one JSONL line or CSV row per image, flushed as written."""
+
+    def __init__(self, f: TextIO, fmt: str):
+        self.f = f
+        self.fmt = fmt
+        if fmt == "csv":
+            self.csv = csv.DictWriter(f, CSV_COLUMNS)
+            if f.tell() == 0:
+                self.csv.writeheader()
+
+    def write(
+        self, path: str, result: Optional[ImageResult], error: Optional[str]
+    ) -> None:
+        if self.fmt == "csv":
+            self.csv.writerow(_csv_row(path, result, error))
+        elif result is not None:
+            self.f.write(
+                f'{{"path": {json.dumps(path)}, "result": {result.model_dump_json()}}}\n'
+            )
+        else:
+            self.f.write(json.dumps({"path": path, "error": error}) + "\n")
+        self.f.flush()
+
+
+def _csv_row(
+    path: str, result: Optional[ImageResult], error: Optional[str]
+) -> Dict[str, Any]:
+    if result is None:
+        return {"path": path, "status": "failed", "error": error}
+    row = {
+        "path": path,
+        "status": "done",
+        **result.summary.model_dump(),
+        "processing_time_ms": result.processing_time_ms,
+        "cached": result.cached,
+        "timed_out": result.timed_out,
+    }
+    for field in FIELDS:
+        field_result = getattr(result.fields, field)
+        row[f"{field}_status"] = field_result.status.value
+        row[field] = field_result.value
+    return row
+
+
+async def _verify_path(root: str, path: str, mode: str, budget_ms: int) -> ImageResult:
+    upload = await asyncio.to_thread(read_file, os.path.join(root, path))
+    with upload:
+        return await verify_content(upload, path, mode, budget_ms)
+
+
+async def verify_tree(
+    root: str,
+    paths: List[str],
+    writer: RecordWriter,
+    mode: str,
+    budget_ms: int,
+    concurrency: int,
+) -> Dict[str, int]:
+    """
+    Verify paths with at most concurrency images in flight, writing each
+    record as it completes. Returns counts of verified and failed images.
+    """
+    counts = {"verified": 0, "failed": 0}
+    pending = iter(paths)
+    start = time.perf_counter()
+
+    async def worker(next_path: Iterator[str]) -> None:
+        for path in next_path:
+            try:
+                result = await _verify_path(root, path, mode, budget_ms)
+            except HTTPException as e:
+                writer.write(path, None, str(e.detail))
+                counts["failed"] += 1
+            except Exception as e:
+                writer.write(path, None, f"Unexpected error: {e}")
+                counts["failed"] += 1
+            else:
+                writer.write(path, result, None)
+                counts["verified"] += 1
+
+            finished = counts["verified"] + counts["failed"]
+            if finished % PROGRESS_EVERY == 0:
+                rate = finished / (time.perf_counter() - start)
+                print(
+                    f"{finished}/{len(paths)} images, {rate:.2f} images/s",
+                    file=sys.stderr,
+                )
+
+    # Workers share one iterator, so each path is taken exactly once
+    await asyncio.gather(*(worker(pending) for _ in range(concurrency)))
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("root", help="Directory of label images (searched recursively)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL or CSV file")
+    parser.add_argument(
+        "--format",
+        choices=("jsonl", "csv"),
+        help="Output format (default: from the output file's extension)",
+    )
+    parser.add_argument("--mode", choices=OCR_MODES, default=settings.preprocess_mode)
+    parser.add_argument(
+        "--budget-ms",
+        type=int,
+        default=settings.ocr_budget_ms,
+        help="OCR time budget per image; 0 disables the limit",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.ocr_workers,
+        help="OCR processes (default: OCR_WORKERS, or one per core)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Bypass the result cache"
+    )
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        parser.error(f"{args.root} is not a directory")
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    settings.ocr_workers = args.workers
+    if args.no_cache:
+        settings.cache_enabled = False
+
+    paths = find_images(args.root)
+    done = completed_paths(args.output, fmt)
+    todo = [path for path in paths if path not in done]
+    print(
+        f"{len(paths)} images, {len(paths) - len(todo)} already done, "
+        f"{len(todo)} to verify with {pool_size()} OCR workers",
+        file=sys.stderr,
+    )
+
+    # Two images per worker keep the pool busy while others are read
+    # and validated
+    concurrency = 2 * pool_size()
+    start = time.perf_counter()
+    counts = {"verified": 0, "failed": 0}
+    try:
+        with open(args.output, "a", newline="", encoding="utf-8") as f:
+            writer = RecordWriter(f, fmt)
+            counts = asyncio.run(
+                verify_tree(
+                    args.root, todo, writer, args.mode, args.budget_ms, concurrency
+                )
+            )
+    except KeyboardInterrupt:
+        print("Interrupted; run again with the same output to resume", file=sys.stderr)
+        return 130
+    finally:
+        shutdown_pool()
+        shutdown_engine()
+        shutdown_cache()
+        shutdown_near_duplicate_index()
+
+    elapsed = time.perf_counter() - start
+    finished = counts["verified"] + counts["failed"]
+    print(
+        f"Verified {counts['verified']}, failed {counts['failed']} "
+        f"in {elapsed:.1f}s ({finished / elapsed if elapsed else 0:.2f} images/s)",
+        file=sys.stderr,
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
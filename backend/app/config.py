@@ -1,12 +1,69 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     app_name: str = "Alcohol Label Verifier"
+    # Level of the app's own log lines (per-image preprocessing, job recovery)
+    log_level: str = "INFO"
     max_file_size_mb: int = 10
     max_files: int = 10
     tesseract_cmd: str = "tesseract"
 
+    # OCR engine: "auto" uses in-process tesserocr when installed,
+    # "pytesseract" always shells out to the tesseract binary
+    ocr_engine: str = "auto"
+    ocr_lang: str = "eng"
+    ocr_pool_size: int = 2
+    tessdata_path: Optional[str] = None
+    # OCR only detected text blocks instead of the whole image
+    ocr_text_regions: bool = True
+    # Images are decoded at a reduced size down to this long side, then
+    # shrunk further while the smallest text stays this many pixels tall
+    ocr_max_side: int = 3000
+    ocr_min_text_height: int = 20
+    # Per-image OCR time budget in ms for /api/verify (0 = unlimited)
+    ocr_budget_ms: int = 5000
+    # Further OCR passes run only while a field is missing or below this confidence
+    ocr_retry_confidence: float = 0.6
+    # Default preprocessing for /api/verify: none, auto, or a preprocessor mode
+    preprocess_mode: str = "none"
+
+    # Worker processes for batch OCR (0 = one per CPU core)
+    ocr_workers: int = 0
+
+    # Result cache: in-memory LRU backed by a SQLite file ("" = memory only)
+    cache_enabled: bool = True
+    cache_memory_entries: int = 256
+    cache_path: str = ".cache/results.sqlite3"
+    cache_max_disk_mb: int = 512
+    cache_max_age_days: int = 30
+    # Reuse the cached result of an image whose perceptual hash (dHash) is
+    # within this many of 256 bits of the upload's, once one OCR pass reads
+    # the same field values; -1 disables (opt-in, e.g. 32)
+    near_duplicate_max_distance: int = -1
+
+    # Background jobs (/api/jobs): queued images and results in a SQLite
+    # file; workers default to one per OCR worker process
+    jobs_path: str = ".cache/jobs.sqlite3"
+    job_workers: int = 0
+    job_max_files: int = 1000
+    job_max_age_days: int = 7
+    # A claimed image is owned by its worker this long, renewed while it is
+    # being verified; images whose owner stopped renewing are re-queued
+    job_lease_seconds: int = 60
+    # Largest request body for POST /api/jobs
+    job_max_request_mb: int = 2048
+    # Images and bytes accepted from one archive (POST /api/jobs/archive)
+    archive_max_files: int = 50000
+    archive_max_mb: int = 4096
+
+    # Brand registry (CSV or JSON; default app/data/brands.csv), re-read when
+    # the file changes, checked at most this often
+    brand_registry_path: Optional[str] = None
+    brand_registry_check_seconds: float = 5.0
+
     class Config:
         env_file = ".env"
 
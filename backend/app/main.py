@@ -1,8 +1,28 @@
+import asyncio
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 
 from app.config import settings
-from app.routers import verify
+from app.routers import jobs, verify
+from app.services.cache import shutdown_cache
+from app.services.engine import shutdown_engine
+from app.services.executor import shutdown_pool
+from app.services.jobs import start_job_workers, stop_job_workers
+from app.services.metrics import CONTENT_TYPE, render_metrics
+from app.services.similarity import shutdown_near_duplicate_index
+from app.services.uploads import RequestSizeLimitMiddleware
+
+# uvicorn only configures its own loggers; without a handler the app's
+# INFO lines (preprocessing decisions, job recovery) would be dropped
+app_logger = logging.getLogger("app")
+if not app_logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s: %(message)s"))
+    app_logger.addHandler(handler)
+app_logger.setLevel(settings.log_level.upper())
 
 app = FastAPI(
     title=settings.app_name,
@@ -10,6 +30,7 @@ app = FastAPI(
     version="1.0.0",
 )
 
+app.add_middleware(RequestSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,6 +40,26 @@ app.add_middleware(
 )
 
 app.include_router(verify.router, prefix="/api", tags=["verification"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    start_job_workers(verify.verify_bytes)
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    # Before the OCR pool goes away; unfinished images are re-queued on restart
+    await stop_job_workers()
+
+
+@app.on_event("shutdown")
+def release_ocr_workers():
+    shutdown_pool()
+    shutdown_engine()
+    shutdown_cache()
+    shutdown_near_duplicate_index()
 
 
 @app.get("/")
@@ -29,3 +70,11 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Per-stage latency histograms and counters for Prometheus to scrape."""
+    # The job gauge counts rows in SQLite, so render off the event loop
+    content = await asyncio.to_thread(render_metrics)
+    return Response(content=content, media_type=CONTENT_TYPE)
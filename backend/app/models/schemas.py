@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional, Any
+from typing import Literal, Optional, Any
 from pydantic import BaseModel
 
 
@@ -40,6 +40,11 @@ class ImageResult(BaseModel):
     raw_text: Optional[str] = None
     fields: FieldResults
     summary: Summary
+    cached: bool = False
+    # Result of a near-identical image, matched by perceptual hash
+    reused: bool = False
+    timed_out: bool = False
+    metadata: Optional[dict[str, Any]] = None
 
 
 class BatchSummary(BaseModel):
@@ -53,7 +58,72 @@ class VerifyResponse(BaseModel):
     batch_summary: BatchSummary
 
 
+class StreamResult(BaseModel):
+    """One NDJSON line of /api/verify?stream=true per finished image."""
+
+    type: Literal["result"] = "result"
+    index: int
+    result: ImageResult
+
+
+class StreamError(BaseModel):
+    type: Literal["error"] = "error"
+    index: int
+    filename: str
+    error: Any
+
+
+class StreamSummary(BaseModel):
+    """Last line of /api/verify?stream=true."""
+
+    type: Literal["summary"] = "summary"
+    batch_summary: BatchSummary
+
+
 class ErrorResponse(BaseModel):
     code: str
     message: str
     filename: Optional[str] = None
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+
+
+class JobItemStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: JobStatus
+    total: int
+
+
+class JobItem(BaseModel):
+    position: int
+    filename: str
+    status: JobItemStatus
+    result: Optional[ImageResult] = None
+    error: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    created_at: float
+    finished_at: Optional[float] = None
+    total: int
+    queued: int
+    running: int
+    done: int
+    failed: int
+    batch_summary: BatchSummary
+    offset: int
+    limit: int
+    items: list[JobItem]
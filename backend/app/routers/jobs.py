@@ -0,0 +1,182 @@
+import asyncio
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request
+from typing import List, Optional
+
+from app.models.schemas import (
+    BatchSummary,
+    JobItem,
+    JobResponse,
+    JobStatus,
+    JobSubmitted,
+)
+from app.routers.verify import resolve_options
+from app.services.archives import ArchiveError, iter_archive
+from app.services.jobs import get_job_store, new_job_id, notify_job_workers
+from app.services.preprocessor import PREPROCESS_MODES
+from app.services.responses import (
+    ResponseOptions,
+    encode_data,
+    encoded_response,
+    load_json,
+    response_options,
+)
+from app.services.uploads import max_upload_bytes, too_large
+from app.config import settings
+
+router = APIRouter()
+
+
+@router.post("/jobs", response_model=JobSubmitted, status_code=202)
+async def submit_job(
+    files: List[UploadFile] = File(...),
+    mode: Optional[str] = Query(
+        None,
+        description="Preprocessing: none, auto, or one of "
+        + ", ".join(PREPROCESS_MODES),
+    ),
+    budget_ms: Optional[int] = Query(
+        None,
+        ge=0,
+        description="OCR time budget per image in ms; 0 disables the limit",
+    ),
+):
+    """
+    Queue images for background verification and return at once; poll
+    GET /api/jobs/{job_id} for progress and results.
+    """
+    mode, budget_ms = resolve_options(mode, budget_ms)
+
+    if len(files) > settings.job_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {settings.job_max_files} files allowed per job",
+        )
+
+    if len(files) == 0:
+        raise HTTPException(status_code=400, detail="At least one file is required")
+
+    # The multipart parser records each part's size; reject before storing
+    for file in files:
+        if file.size is None or file.size > max_upload_bytes():
+            raise too_large(file.filename)
+
+    # Writing thousands of images is kept off the event loop; the store
+    # reads each spooled file as it inserts it, so one image is in memory
+    images = [(file.filename or "unknown", file.file) for file in files]
+    job_id = await asyncio.to_thread(get_job_store().submit, images, mode, budget_ms)
+    notify_job_workers()
+    return JobSubmitted(job_id=job_id, status=JobStatus.QUEUED, total=len(images))
+
+
+@router.post("/jobs/archive", response_model=JobSubmitted, status_code=202)
+async def submit_archive(
+    request: Request,
+    mode: Optional[str] = Query(
+        None,
+        description="Preprocessing: none, auto, or one of "
+        + ", ".join(PREPROCESS_MODES),
+    ),
+    budget_ms: Optional[int] = Query(
+        None,
+        ge=0,
+        description="OCR time budget per image in ms; 0 disables the limit",
+    ),
+):
+    """
+    Queue every image in a ZIP, tar or .tar.gz archive sent as the raw
+    request body as one job. Members are decoded as the body arrives and
+    stored one at a time, so neither the archive nor its images are held in
+    memory or extracted to disk; job workers then verify them.
+    """
+    mode, budget_ms = resolve_options(mode, budget_ms)
+
+    store = get_job_store()
+    job_id = new_job_id()
+    total = 0
+    try:
+        async for member in iter_archive(request.stream(), max_upload_bytes()):
+            if total >= settings.archive_max_files:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Maximum {settings.archive_max_files} images "
+                    "allowed per archive",
+                )
+            await asyncio.to_thread(
+                store.stage, job_id, total, member.name, member.content, member.error
+            )
+            total += 1
+
+        if total == 0:
+            raise HTTPException(status_code=400, detail="Archive contains no images")
+        await asyncio.to_thread(store.open_job, job_id, mode, budget_ms, total)
+    except ArchiveError as e:
+        await asyncio.to_thread(store.delete, job_id)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        await asyncio.to_thread(store.delete, job_id)
+        raise
+
+    notify_job_workers()
+    return JobSubmitted(job_id=job_id, status=JobStatus.QUEUED, total=total)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    options: ResponseOptions = Depends(response_options),
+):
+    """Progress counts plus one page of items, in upload order."""
+    job = await asyncio.to_thread(get_job_store().get, job_id, offset, limit)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+
+    counts = job["counts"]
+    if counts["queued"] + counts["running"] == 0:
+        status = JobStatus.COMPLETED
+    elif counts["running"] + counts["done"] + counts["failed"] == 0:
+        status = JobStatus.QUEUED
+    else:
+        status = JobStatus.RUNNING
+
+    response = JobResponse(
+        job_id=job_id,
+        status=status,
+        created_at=job["created_at"],
+        finished_at=job["finished_at"],
+        total=job["total"],
+        **counts,
+        batch_summary=BatchSummary(
+            total_images=counts["done"],
+            fully_compliant=job["compliant"],
+            needs_review=counts["done"] - job["compliant"],
+        ),
+        offset=offset,
+        limit=limit,
+        items=[
+            JobItem(
+                position=position,
+                filename=filename,
+                status=item_status,
+                error=error,
+            )
+            for position, filename, item_status, _, error in job["items"]
+        ],
+    )
+
+    # Stored results are ImageResult JSON this service wrote, so they are
+    # loaded as plain data instead of being rebuilt into models and then
+    # validated again against response_model
+    data = response.model_dump(mode="json")
+    for item, (_, _, _, result, _) in zip(data["items"], job["items"]):
+        item["result"] = options.select(load_json(result)) if result else None
+    return encoded_response(encode_data(data, options), options)
+
+
+@router.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Drop a job, its queued images and its results."""
+    if not await asyncio.to_thread(get_job_store().delete, job_id):
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return {"deleted": True}
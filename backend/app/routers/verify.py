@@ -1,133 +1,346 @@
+import asyncio
+import json
+import logging
 import time
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Union
 
 from app.models.schemas import (
     VerifyResponse,
     ImageResult,
-    FieldResults,
-    FieldResult,
-    FieldStatus,
-    Summary,
     BatchSummary,
     ErrorResponse,
+    StreamError,
+    StreamResult,
+    StreamSummary,
 )
-from app.services.ocr import extract_text
-from app.services.validators import (
-    extract_brand_name,
-    extract_class_type,
-    extract_alcohol_content,
-    extract_net_contents,
-    validate_government_warning,
-    extract_bottler_producer,
-    extract_country_of_origin,
+from app.services.brands import (
+    brand_fingerprint,
+    get_brand_registry,
+    reload_brand_registry,
 )
+from app.services.cache import cache_key, get_cache
+from app.services.executor import run_in_pool, run_with_shared
+from app.services.metrics import (
+    CACHE_LOOKUPS,
+    IMAGE_SECONDS,
+    OCR_FAILURES,
+    observe_stage_timings,
+)
+from app.services.ocr import OcrResult, ocr_fingerprint
+from app.services.pipeline import OCRError, confirm_fields, field_values, verify_image
+from app.services.preprocessor import PREPROCESS_MODES
+from app.services.responses import (
+    STREAM_MEDIA_TYPES,
+    ResponseOptions,
+    encode_model,
+    encoded_response,
+    response_options,
+)
+from app.services.similarity import (
+    NearDuplicateIndex,
+    get_near_duplicate_index,
+    image_dhash,
+)
+from app.services.uploads import SharedUpload, read_upload
+from app.services.validators import validator_fingerprint
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+OCR_MODES = ("none", "auto", *PREPROCESS_MODES)
 
-def process_single_image(file: UploadFile) -> ImageResult:
-    start_time = time.time()
 
-    content = file.file.read()
-
-    if len(content) > settings.max_file_size_mb * 1024 * 1024:
+def resolve_options(mode: Optional[str], budget_ms: Optional[int]) -> Tuple[str, int]:
+    """Apply the configured defaults and reject unknown preprocessing modes."""
+    mode = mode or settings.preprocess_mode
+    if budget_ms is None:
+        budget_ms = settings.ocr_budget_ms
+    if mode not in OCR_MODES:
         raise HTTPException(
-            status_code=413,
-            detail=f"File {file.filename} exceeds maximum size of {settings.max_file_size_mb}MB",
+            status_code=400,
+            detail=f"Unknown mode '{mode}'; expected one of {', '.join(OCR_MODES)}",
         )
+    return mode, budget_ms
 
-    try:
-        raw_text, ocr_time = extract_text(content)
-    except Exception as e:
-        raise HTTPException(
-            status_code=422, detail=f"OCR failed for {file.filename}: {str(e)}"
+
+async def process_single_image(
+    file: UploadFile, mode: str = "none", budget_ms: Optional[int] = None
+) -> ImageResult:
+    with await read_upload(file) as upload:
+        return await verify_content(upload, file.filename or "unknown", mode, budget_ms)
+
+
+async def verify_bytes(
+    content: bytes, filename: str, mode: str = "none", budget_ms: Optional[int] = None
+) -> ImageResult:
+    """verify_content for image bytes already in memory, e.g. a queued job."""
+    with SharedUpload.from_bytes(content) as upload:
+        return await verify_content(upload, filename, mode, budget_ms)
+
+
+async def verify_content(
+    upload: SharedUpload,
+    filename: str,
+    mode: str = "none",
+    budget_ms: Optional[int] = None,
+) -> ImageResult:
+    """Verify one uploaded image through the cache and the OCR pool."""
+    start_time = time.time()
+    cache = get_cache()
+    # Workers validate with the same brand list as this process
+    brands = brand_fingerprint()
+    if cache is None:
+        try:
+            result, _ = await run_with_shared(
+                verify_image,
+                upload.name,
+                upload.size,
+                filename,
+                None,
+                mode,
+                budget_ms,
+                brands,
+            )
+        except OCRError as e:
+            OCR_FAILURES.inc(stage="ocr")
+            raise HTTPException(status_code=422, detail=str(e))
+        observe_stage_timings(result.metadata)
+        log_preprocessing(filename, mode, result.metadata)
+        IMAGE_SECONDS.observe(time.time() - start_time, source="ocr")
+        return result
+
+    # OCR text and field results are cached separately so a validator
+    # change only re-runs the validators, not Tesseract.
+    digest = upload.digest
+    text_key = cache_key("ocr", digest, ocr_fingerprint(mode))
+    result_key = cache_key(
+        "result", digest, ocr_fingerprint(mode), validator_fingerprint()
+    )
+
+    # The cache and index block on SQLite, so they are used off the event loop
+    cached_result = await asyncio.to_thread(cache.get, result_key)
+    if cached_result is not None:
+        CACHE_LOOKUPS.inc(result="hit")
+        IMAGE_SECONDS.observe(time.time() - start_time, source="cached")
+        result = ImageResult.model_validate_json(cached_result)
+        return result.model_copy(
+            update={
+                "filename": filename,
+                "processing_time_ms": int((time.time() - start_time) * 1000),
+                "cached": True,
+            }
         )
 
-    brand_name_val, brand_conf = extract_brand_name(raw_text)
-    class_type_val, class_conf = extract_class_type(raw_text)
-    alc_val, alc_parsed, alc_conf = extract_alcohol_content(raw_text)
-    net_val, net_parsed, net_conf = extract_net_contents(raw_text)
-    warn_val, warn_issues, warn_conf = validate_government_warning(raw_text)
-    bottler_val, bottler_conf = extract_bottler_producer(raw_text)
-    origin_val, origin_conf = extract_country_of_origin(raw_text)
-
-    def make_field_result(
-        value, confidence, parsed_value=None, issues=None
-    ) -> FieldResult:
-        if value is None:
-            return FieldResult(status=FieldStatus.MISSING, confidence=confidence)
-        elif issues and len(issues) > 0:
-            return FieldResult(
-                status=FieldStatus.FORMATTING_ISSUE,
-                value=value,
-                parsed_value=parsed_value,
-                issues=issues,
-                confidence=confidence,
+    cached_ocr = await asyncio.to_thread(cache.get, text_key)
+    index = get_near_duplicate_index()
+    image_hash = done = None
+    if cached_ocr is None and index is not None:
+        try:
+            image_hash = await run_with_shared(image_dhash, upload.name, upload.size)
+        except Exception:
+            # Undecodable; OCR below reports the error
+            pass
+        else:
+            reused, done = await near_duplicate_result(
+                index, image_hash, upload, filename, mode, budget_ms, brands
             )
+            if reused is not None:
+                CACHE_LOOKUPS.inc(result="near_duplicate")
+                IMAGE_SECONDS.observe(time.time() - start_time, source="reused")
+                return reused.model_copy(
+                    update={
+                        "processing_time_ms": int((time.time() - start_time) * 1000)
+                    }
+                )
+
+    CACHE_LOOKUPS.inc(result="miss")
+    try:
+        if cached_ocr is None:
+            result, ocr = await run_with_shared(
+                verify_image,
+                upload.name,
+                upload.size,
+                filename,
+                None,
+                mode,
+                budget_ms,
+                brands,
+                done,
+            )
+            observe_stage_timings(result.metadata)
+            log_preprocessing(filename, mode, result.metadata)
+            IMAGE_SECONDS.observe(time.time() - start_time, source="ocr")
+            if result.timed_out or "preprocess_fallback" in result.metadata:
+                # Partial text, or a cheaper preprocessing mode than asked
+                # for; a later request with more time may do better
+                return result
+            await asyncio.to_thread(cache.set, text_key, json.dumps(asdict(ocr)))
         else:
-            return FieldResult(
-                status=FieldStatus.DETECTED,
-                value=value,
-                parsed_value=parsed_value,
-                confidence=confidence,
+            ocr = OcrResult.from_dict(json.loads(cached_ocr))
+            result, _ = await run_in_pool(
+                verify_image, b"", filename, ocr, mode, None, brands
             )
+            observe_stage_timings(result.metadata, ocr=False)
+            IMAGE_SECONDS.observe(time.time() - start_time, source="validators")
+    except OCRError as e:
+        OCR_FAILURES.inc(stage="ocr")
+        raise HTTPException(status_code=422, detail=str(e))
 
-    brand_result = make_field_result(brand_name_val, brand_conf)
-    class_result = make_field_result(class_type_val, class_conf)
-    alc_result = make_field_result(alc_val, alc_conf, alc_parsed)
-    net_result = make_field_result(net_val, net_conf, net_parsed)
-    warn_result = make_field_result(
-        warn_val, warn_conf, issues=warn_issues if warn_issues else None
-    )
-    bottler_result = make_field_result(bottler_val, bottler_conf)
-    origin_result = make_field_result(origin_val, origin_conf)
-
-    fields = FieldResults(
-        brand_name=brand_result,
-        class_type=class_result,
-        alcohol_content=alc_result,
-        net_contents=net_result,
-        government_warning=warn_result,
-        bottler_producer=bottler_result,
-        country_of_origin=origin_result,
+    # Keyed by the rules the worker actually used, which can differ from
+    # this process's if the registry file changed in between
+    result_key = cache_key(
+        "result",
+        digest,
+        ocr_fingerprint(mode),
+        result.metadata["validator_fingerprint"],
     )
+    await asyncio.to_thread(cache.set, result_key, result.model_dump_json())
+    if image_hash is not None:
+        await asyncio.to_thread(index.add, image_hash, digest)
+    return result
 
-    all_fields = [
-        brand_result,
-        class_result,
-        alc_result,
-        net_result,
-        warn_result,
-        bottler_result,
-        origin_result,
-    ]
 
-    detected = sum(1 for f in all_fields if f.status == FieldStatus.DETECTED)
-    missing = sum(1 for f in all_fields if f.status == FieldStatus.MISSING)
-    formatting_issues = sum(
-        1 for f in all_fields if f.status == FieldStatus.FORMATTING_ISSUE
-    )
+def log_preprocessing(filename: str, mode: str, metadata: dict) -> None:
+    """
+    Log the preprocessing decision and its cost for one image. OCR workers
+    have no logging set up, so this is logged here from the result.
+    """
+    if "preprocess_mode" in metadata:
+        logger.info(
+            "%s: preprocessing mode=%s chosen=%s cost=%dms stats=%s fallback=%s",
+            filename,
+            mode,
+            metadata["preprocess_mode"],
+            metadata["preprocess_ms"],
+            metadata.get("image_stats"),
+            metadata.get("preprocess_fallback"),
+        )
 
-    total_time = int((time.time() - start_time) * 1000)
-
-    return ImageResult(
-        filename=file.filename or "unknown",
-        processing_time_ms=total_time,
-        raw_text=raw_text[:1000] if raw_text else None,
-        fields=fields,
-        summary=Summary(
-            detected=detected,
-            missing=missing,
-            formatting_issues=formatting_issues,
-            is_compliant=(missing == 0 and formatting_issues == 0),
-        ),
-    )
+
+async def near_duplicate_result(
+    index: NearDuplicateIndex,
+    image_hash: int,
+    upload: SharedUpload,
+    filename: str,
+    mode: str,
+    budget_ms: Optional[int] = None,
+    brands: Optional[str] = None,
+) -> Tuple[Optional[ImageResult], Optional[OcrResult]]:
+    """
+    The cached result of the nearest indexed image within the index's
+    distance, verified with the same mode and validators, marked reused.
+    A small hash distance does not rule out a changed ABV or a blanked
+    warning, so the match is only reused once one OCR pass over the upload
+    reads the same field values; otherwise None and the image is verified
+    in full. Also returns that OCR pass, if one ran, for verify_image to
+    continue from instead of starting over.
+    """
+    cache = get_cache()
+    for distance, digest in await asyncio.to_thread(index.find, image_hash):
+        cached_result = await asyncio.to_thread(
+            cache.get,
+            cache_key("result", digest, ocr_fingerprint(mode), validator_fingerprint()),
+        )
+        if cached_result is None:
+            text_key = cache_key("ocr", digest, ocr_fingerprint(mode))
+            if await asyncio.to_thread(cache.get, text_key) is None:
+                # Nothing left to reuse under any mode or validator version
+                await asyncio.to_thread(index.discard, digest)
+            continue
+
+        result = ImageResult.model_validate_json(cached_result)
+        # Only the nearest candidate is confirmed: one pass is the cost cap
+        confirmed, done = await run_with_shared(
+            confirm_fields,
+            upload.name,
+            upload.size,
+            field_values(result.fields),
+            mode,
+            budget_ms,
+            brands,
+        )
+        if not confirmed:
+            return None, done
+        index.record_match()
+        reused = result.model_copy(
+            update={
+                "filename": filename,
+                "cached": True,
+                "reused": True,
+                "metadata": {
+                    **(result.metadata or {}),
+                    "near_duplicate": {
+                        "filename": result.filename,
+                        "distance": distance,
+                    },
+                },
+            }
+        )
+        return reused, None
+    return None, None
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    cache = get_cache()
+    if cache is None:
+        return {"enabled": False}
+    index = get_near_duplicate_index()
+    near_duplicates = index.stats() if index is not None else {"enabled": False}
+    stats = await asyncio.to_thread(cache.stats)
+    return {"enabled": True, **stats, "near_duplicates": near_duplicates}
+
+
+@router.get("/brands/stats")
+async def brand_stats():
+    registry = get_brand_registry()
+    if registry is None:
+        return {"loaded": False}
+    return {"loaded": True, **registry.stats()}
+
+
+@router.post("/brands/reload")
+async def brand_reload():
+    """
+    Rebuild the brand index now instead of waiting for the mtime check.
+    OCR workers see the new fingerprint with their next image and reload too.
+    """
+    try:
+        registry = reload_brand_registry()
+    except (OSError, ValueError, KeyError) as e:
+        raise HTTPException(
+            status_code=422, detail=f"Could not load brand registry: {e}"
+        )
+    return {"loaded": True, **registry.stats()}
 
 
 @router.post("/verify", response_model=VerifyResponse)
-async def verify_labels(files: List[UploadFile] = File(...)):
+async def verify_labels(
+    files: List[UploadFile] = File(...),
+    mode: Optional[str] = Query(
+        None,
+        description="Preprocessing: none, auto, or one of "
+        + ", ".join(PREPROCESS_MODES),
+    ),
+    budget_ms: Optional[int] = Query(
+        None,
+        ge=0,
+        description="OCR time budget per image in ms; 0 disables the limit",
+    ),
+    stream: bool = Query(
+        False,
+        description="Return NDJSON events, one per image as it finishes, "
+        "then the batch summary",
+    ),
+    options: ResponseOptions = Depends(response_options),
+):
+    mode, budget_ms = resolve_options(mode, budget_ms)
+
     if len(files) > settings.max_files:
         raise HTTPException(
             status_code=400, detail=f"Maximum {settings.max_files} files allowed"
@@ -136,28 +349,110 @@ async def verify_labels(files: List[UploadFile] = File(...)):
     if len(files) == 0:
         raise HTTPException(status_code=400, detail="At least one file is required")
 
+    if stream:
+        # Read every upload now: the files are closed once this handler returns
+        images = []
+        for file in files:
+            try:
+                images.append((file.filename or "unknown", await read_upload(file)))
+            except HTTPException as e:
+                images.append((file.filename or "unknown", e.detail))
+        return StreamingResponse(
+            stream_results(images, mode, budget_ms, options),
+            media_type=STREAM_MEDIA_TYPES[options.encoding],
+        )
+
     results = []
     errors = []
 
-    for file in files:
-        try:
-            result = process_single_image(file)
-            results.append(result)
-        except HTTPException as e:
-            errors.append({"filename": file.filename, "error": e.detail})
-        except Exception as e:
-            errors.append({"filename": file.filename, "error": str(e)})
+    # All images are dispatched to the OCR pool at once; gather keeps the
+    # outcomes in upload order so results line up with the request.
+    outcomes = await asyncio.gather(
+        *(process_single_image(file, mode, budget_ms) for file in files),
+        return_exceptions=True,
+    )
+
+    for file, outcome in zip(files, outcomes):
+        if isinstance(outcome, HTTPException):
+            errors.append({"filename": file.filename, "error": outcome.detail})
+        elif isinstance(outcome, Exception):
+            errors.append({"filename": file.filename, "error": str(outcome)})
+        else:
+            results.append(outcome)
 
     if not results and errors:
         raise HTTPException(status_code=422, detail=errors)
 
-    fully_compliant = sum(1 for r in results if r.summary.is_compliant)
-
-    return VerifyResponse(
-        results=results,
-        batch_summary=BatchSummary(
-            total_images=len(results),
-            fully_compliant=fully_compliant,
-            needs_review=len(results) - fully_compliant,
+    response = VerifyResponse(results=results, batch_summary=summarize(results))
+    exclude = options.exclude()
+    return encoded_response(
+        encode_model(
+            response, options, {"results": {"__all__": exclude}} if exclude else None
         ),
+        options,
     )
+
+
+def summarize(results: Sequence[ImageResult]) -> BatchSummary:
+    fully_compliant = sum(1 for r in results if r.summary.is_compliant)
+    return BatchSummary(
+        total_images=len(results),
+        fully_compliant=fully_compliant,
+        needs_review=len(results) - fully_compliant,
+    )
+
+
+async def stream_results(
+    images: Sequence[Tuple[str, Union[SharedUpload, str]]],
+    mode: str,
+    budget_ms: Optional[int],
+    options: ResponseOptions = ResponseOptions(),
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON events in completion order: {"type": "result", "index", "result"}
+    or {"type": "error", "index", "filename", "error"} per image, where index
+    is the upload position, then one {"type": "summary", "batch_summary"}.
+    Images are (filename, upload) pairs, or (filename, error) for uploads
+    that were rejected while reading. With MessagePack, events are
+    consecutive MessagePack maps instead of lines.
+    """
+    exclude = options.exclude()
+    separator = b"\n" if options.encoding == "json" else b""
+
+    async def verify(index: int, filename: str, upload: Union[SharedUpload, str]):
+        if isinstance(upload, str):
+            return index, filename, upload
+        try:
+            with upload:
+                result = await verify_content(upload, filename, mode, budget_ms)
+            return index, filename, result
+        except HTTPException as e:
+            return index, filename, e.detail
+        except Exception as e:
+            return index, filename, str(e)
+
+    tasks = [
+        asyncio.ensure_future(verify(index, filename, upload))
+        for index, (filename, upload) in enumerate(images)
+    ]
+    results = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            index, filename, outcome = await next_done
+            if isinstance(outcome, ImageResult):
+                results.append(outcome)
+                event = StreamResult(index=index, result=outcome)
+                event_exclude = {"result": exclude} if exclude else None
+            else:
+                event = StreamError(index=index, filename=filename, error=outcome)
+                event_exclude = None
+            yield encode_model(event, options, event_exclude) + separator
+        summary = StreamSummary(batch_summary=summarize(results))
+        yield encode_model(summary, options) + separator
+    finally:
+        # The client went away: stop images that have not been read yet
+        for task in tasks:
+            task.cancel()
+        for _, upload in images:
+            if isinstance(upload, SharedUpload):
+                upload.close()
@@ -0,0 +1,334 @@
+import asyncio
+import os
+import struct
+import zlib
+from typing import AsyncIterator, NamedTuple, Optional
+
+# Members with these extensions are treated as label images; others are skipped
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp", ".gif")
+
+# Decompressed bytes produced per step, bounding memory on highly
+# compressed input (e.g. a zip bomb). Decompression yields to the event
+# loop after every step, so one archive cannot stall other requests
+OUTPUT_CHUNK_BYTES = 256 * 1024
+
+# Compressed bytes read per step
+INPUT_CHUNK_BYTES = 64 * 1024
+
+TAR_BLOCK = 512
+ZIP_LOCAL_HEADER = b"PK\x03\x04"
+ZIP_DATA_DESCRIPTOR = b"PK\x07\x08"
+ZIP_END_RECORDS = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06", b"PK\x06\x07")
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class ArchiveError(ValueError):
+    """Raised for archives that are malformed or use unsupported features."""
+
+
+class ArchiveMember(NamedTuple):
+    name: str
+    content: Optional[bytes]  # None when the member was rejected
+    error: Optional[str] = None
+
+
+def is_image_name(name: str) -> bool:
+    base = os.path.basename(name)
+    return (
+        not base.startswith(".")
+        and not name.startswith("__MACOSX/")
+        and base.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+class _Reader:
+    """Buffered reads over an async stream of byte chunks."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._buffer = bytearray()
+        self._eof = False
+
+    async def _fill(self, size: int) -> None:
+        while len(self._buffer) < size and not self._eof:
+            try:
+                self._buffer += await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._eof = True
+
+    async def peek(self, size: int) -> bytes:
+        await self._fill(size)
+        return bytes(self._buffer[:size])
+
+    async def read(self, size: int) -> bytes:
+        """Up to size bytes; fewer only at the end of the stream."""
+        await self._fill(size)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    async def read_exactly(self, size: int) -> bytes:
+        data = await self.read(size)
+        if len(data) < size:
+            raise ArchiveError("Archive is truncated")
+        return data
+
+    async def read_some(self, limit: int = 64 * 1024) -> bytes:
+        """Whatever is buffered (or the next chunk), up to limit bytes."""
+        if not self._buffer:
+            await self._fill(1)
+        return await self.read(min(limit, len(self._buffer)))
+
+    async def skip(self, size: int) -> None:
+        while size > 0:
+            data = await self.read(min(size, 64 * 1024))
+            if not data:
+                raise ArchiveError("Archive is truncated")
+            size -= len(data)
+
+    def unread(self, data: bytes) -> None:
+        self._buffer[:0] = data
+
+
+async def _gunzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    decompressor = zlib.decompressobj(wbits=31)
+    async for chunk in chunks:
+        pending = chunk
+        while pending:
+            out = decompressor.decompress(pending, OUTPUT_CHUNK_BYTES)
+            pending = decompressor.unconsumed_tail
+            if out:
+                yield out
+            if decompressor.eof:
+                return
+            await asyncio.sleep(0)
+    if not decompressor.eof:
+        raise ArchiveError("Gzip stream is truncated")
+
+
+async def iter_archive(
+    chunks: AsyncIterator[bytes], max_member_bytes: int
+) -> AsyncIterator[ArchiveMember]:
+    """
+    Image members of a ZIP, tar or gzip-compressed tar, in archive order,
+    read from a stream without buffering the archive or touching disk.
+    The format is detected from the first bytes. Members over
+    max_member_bytes are skipped and reported with an error.
+    """
+    reader = _Reader(chunks)
+    head = await reader.peek(TAR_BLOCK)
+    if head.startswith(GZIP_MAGIC):
+        reader = _Reader(_gunzip(reader_chunks(reader)))
+        head = await reader.peek(TAR_BLOCK)
+
+    if head.startswith(ZIP_LOCAL_HEADER):
+        members = _iter_zip(reader, max_member_bytes)
+    elif len(head) == TAR_BLOCK and (
+        head[257:262] == b"ustar" or _tar_checksum_ok(head)
+    ):
+        members = _iter_tar(reader, max_member_bytes)
+    else:
+        raise ArchiveError("Expected a ZIP, tar or .tar.gz archive")
+
+    async for member in members:
+        yield member
+
+
+async def reader_chunks(reader: _Reader) -> AsyncIterator[bytes]:
+    while True:
+        data = await reader.read_some()
+        if not data:
+            return
+        yield data
+
+
+def _tar_checksum_ok(header: bytes) -> bool:
+    try:
+        stored = int(header[148:156].strip(b"\0 ") or b"0", 8)
+    except ValueError:
+        return False
+    return stored == sum(header[:148]) + 8 * 32 + sum(header[156:])
+
+
+def _tar_number(field: bytes) -> int:
+    if field and field[0] & 0x80:
+        # GNU base-256 encoding for sizes over 8 GB
+        return int.from_bytes(field[1:], "big")
+    text = field.strip(b"\0 ")
+    try:
+        return int(text, 8) if text else 0
+    except ValueError:
+        raise ArchiveError("Corrupt tar header")
+
+
+def _pax_path(records: bytes) -> Optional[str]:
+    for line in records.decode("utf-8", "replace").split("\n"):
+        _, _, entry = line.partition(" ")
+        key, _, value = entry.partition("=")
+        if key == "path":
+            return value
+    return None
+
+
+async def _iter_tar(reader: _Reader, limit: int) -> AsyncIterator[ArchiveMember]:
+    long_name: Optional[str] = None
+    while True:
+        header = await reader.read(TAR_BLOCK)
+        if len(header) < TAR_BLOCK or not header.strip(b"\0"):
+            return
+        if not _tar_checksum_ok(header):
+            raise ArchiveError("Corrupt tar header")
+
+        size = _tar_number(header[124:136])
+        padded = -(-size // TAR_BLOCK) * TAR_BLOCK
+        kind = header[156:157]
+
+        if kind in (b"L", b"x"):
+            # GNU long name or pax extended header for the next member
+            data = await reader.read_exactly(padded)
+            if kind == b"L":
+                long_name = data[:size].rstrip(b"\0").decode("utf-8", "replace")
+            else:
+                long_name = _pax_path(data[:size]) or long_name
+            continue
+
+        name = header[0:100].rstrip(b"\0").decode("utf-8", "replace")
+        if header[257:262] == b"ustar" and header[345:346] != b"\0":
+            prefix = header[345:500].rstrip(b"\0").decode("utf-8", "replace")
+            name = f"{prefix}/{name}"
+        name, long_name = long_name or name, None
+
+        if kind not in (b"0", b"\0", b"7") or not is_image_name(name):
+            await reader.skip(padded)
+        elif size > limit:
+            await reader.skip(padded)
+            yield ArchiveMember(name, None, _too_large(name, limit))
+        else:
+            content = await reader.read_exactly(size)
+            await reader.skip(padded - size)
+            yield ArchiveMember(name, content)
+
+
+async def _iter_zip(reader: _Reader, limit: int) -> AsyncIterator[ArchiveMember]:
+    while True:
+        signature = await reader.read(4)
+        if not signature or signature in ZIP_END_RECORDS:
+            # The central directory repeats what the local headers said
+            return
+        if signature != ZIP_LOCAL_HEADER:
+            raise ArchiveError("Corrupt ZIP local header")
+
+        _, flags, method, _, _, crc, compressed, size, name_len, extra_len = (
+            struct.unpack("<HHHHHIIIHH", await reader.read_exactly(26))
+        )
+        name = (await reader.read_exactly(name_len)).decode(
+            "utf-8" if flags & 0x800 else "cp437", "replace"
+        )
+        extra = await reader.read_exactly(extra_len)
+        zip64 = 0xFFFFFFFF in (compressed, size)
+        if zip64:
+            size, compressed = _zip64_sizes(extra, size, compressed)
+
+        if flags & 0x1:
+            raise ArchiveError(f"Encrypted ZIP member {name} is not supported")
+        if method not in (0, 8):
+            raise ArchiveError(f"ZIP member {name} uses unsupported compression")
+
+        wanted = is_image_name(name) and not name.endswith("/")
+        if flags & 0x8:
+            # Sizes follow the data; only a deflate stream knows where it ends
+            if method != 8:
+                raise ArchiveError(
+                    f"ZIP member {name} is stored with a data descriptor; "
+                    "re-create the archive with compression"
+                )
+            content, actual_crc, size = await _inflate(reader, limit, name=name)
+            descriptor = await reader.read_exactly(4)
+            if descriptor == ZIP_DATA_DESCRIPTOR:
+                descriptor = await reader.read_exactly(4)
+            crc = struct.unpack("<I", descriptor)[0]
+            await reader.skip(16 if zip64 else 8)
+        elif method == 8 and wanted and size <= limit:
+            content, actual_crc, size = await _inflate(reader, limit, compressed)
+        elif wanted and method == 0 and size <= limit:
+            content = await reader.read_exactly(compressed)
+            actual_crc = zlib.crc32(content)
+        else:
+            await reader.skip(compressed)
+            content, actual_crc = None, crc
+
+        if not wanted:
+            continue
+        if size > limit:
+            yield ArchiveMember(name, None, _too_large(name, limit))
+        elif actual_crc != crc:
+            yield ArchiveMember(name, None, f"{name}: CRC check failed")
+        else:
+            yield ArchiveMember(name, content)
+
+
+def _zip64_sizes(extra: bytes, size: int, compressed: int):
+    offset = 0
+    while offset + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, offset)
+        if tag == 0x0001:
+            values = list(struct.unpack_from(f"<{length // 8}Q", extra, offset + 4))
+            if size == 0xFFFFFFFF and values:
+                size = values.pop(0)
+            if compressed == 0xFFFFFFFF and values:
+                compressed = values.pop(0)
+            break
+        offset += 4 + length
+    return size, compressed
+
+
+async def _inflate(
+    reader: _Reader, limit: int, compressed: Optional[int] = None, name: str = ""
+):
+    """
+    Decompress one raw deflate stream, returning (content, crc, size).
+    Stops as soon as the output passes limit: with the compressed size
+    known from the header the rest of the member is skipped and content is
+    None; without it (data descriptor) the member's end cannot be found
+    without inflating all of it, so the archive is rejected.
+    """
+    decompressor = zlib.decompressobj(wbits=-15)
+    parts, size, crc = [], 0, 0
+    pending = b""
+    remaining = compressed
+    while not decompressor.eof:
+        if not pending:
+            step = (
+                INPUT_CHUNK_BYTES
+                if remaining is None
+                else min(INPUT_CHUNK_BYTES, remaining)
+            )
+            pending = await reader.read_some(step) if step else b""
+            if not pending:
+                raise ArchiveError("ZIP member is truncated")
+            if remaining is not None:
+                remaining -= len(pending)
+        out = decompressor.decompress(pending, OUTPUT_CHUNK_BYTES)
+        pending = decompressor.unconsumed_tail
+        size += len(out)
+        if size > limit:
+            if remaining is None:
+                raise ArchiveError(
+                    f"ZIP member {name} exceeds {limit // (1024 * 1024)}MB and "
+                    "its size is not in its header"
+                )
+            await reader.skip(remaining)
+            return None, 0, size
+        crc = zlib.crc32(out, crc)
+        parts.append(out)
+        await asyncio.sleep(0)
+    if remaining is None:
+        reader.unread(decompressor.unused_data + pending)
+    else:
+        # Anything after the stream still belongs to this member
+        await reader.skip(remaining)
+    return b"".join(parts), crc, size
+
+
+def _too_large(name: str, limit: int) -> str:
+    return f"File {name} exceeds maximum size of {limit // (1024 * 1024)}MB"
@@ -0,0 +1,353 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from app.config import settings
+
+DEFAULT_REGISTRY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "brands.csv"
+)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Minimum fuzz.ratio between a registered name and words of the line.
+# One-word names are never fuzzy matched: at this cutoff "Absolut" matches
+# "absolute" and "Patron" matches "patrons", so they must appear whole
+# (or split in two by OCR, e.g. "Abso lut")
+MATCH_CUTOFF = 85
+
+# Share of a name's trigrams the line must contain to be scored at all
+MIN_GRAM_OVERLAP = 0.5
+
+# Candidates per line passed on to fuzzy scoring
+MAX_CANDIDATES = 20
+
+# Trigrams shared by more names than this (e.g. " th") say little about
+# which brand is meant and are skipped at query time
+MAX_POSTINGS = 5000
+
+
+class BrandMatch(NamedTuple):
+    name: str
+    score: float
+    matched: str
+
+
+class _Index(NamedTuple):
+    """One load of the registry; replaced whole, never modified."""
+
+    names: List[str]
+    keys: List[str]
+    gram_counts: np.ndarray
+    postings: Dict[str, np.ndarray]
+    fingerprint: str
+    brand_count: int
+    loaded_at: float
+    mtime: float
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase and keep only word characters, like LabelDocument.normalized."""
+    return " ".join(TOKEN_PATTERN.findall(text.lower()))
+
+
+def _trigrams(normalized: str) -> set:
+    padded = f" {normalized} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class BrandRegistry:
+    """
+    Registered brand names compiled into a character-trigram inverted index.
+    A lookup only touches the postings of the line's own trigrams, so its
+    cost depends on the line, not on how many brands are registered; the
+    few candidates sharing enough trigrams are then scored with RapidFuzz.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.load()
+
+    def load(self) -> None:
+        """(Re)build the index from the registry file."""
+        # Read before the file, so an edit made while loading is seen as new
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        entries = _parse_entries(self.path, raw.decode("utf-8-sig"))
+
+        names: List[str] = []
+        keys: List[str] = []
+        gram_counts: List[int] = []
+        postings: Dict[str, list] = {}
+        for name, aliases in entries:
+            for variant in (name, *aliases):
+                key = normalize_name(variant)
+                if not key:
+                    continue
+                entry_id = len(keys)
+                names.append(name)
+                keys.append(key)
+                grams = _trigrams(key)
+                gram_counts.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(entry_id)
+
+        # Swap in one step so concurrent lookups and fingerprints see either
+        # the old or the new registry, never the index of one with the
+        # fingerprint of the other
+        self._index = _Index(
+            names,
+            keys,
+            np.array(gram_counts, dtype=np.uint16),
+            {gram: np.array(ids, dtype=np.uint32) for gram, ids in postings.items()},
+            hashlib.sha256(raw).hexdigest()[:16],
+            len(entries),
+            time.time(),
+            mtime,
+        )
+
+    @property
+    def fingerprint(self) -> str:
+        return self._index.fingerprint
+
+    @property
+    def mtime(self) -> float:
+        return self._index.mtime
+
+    def lookup(
+        self, line: str, limit: int = 1, normalized: bool = False
+    ) -> List[BrandMatch]:
+        """
+        Registered brands found in one OCR line, best first. With
+        normalized, the line is already normalize_name() output.
+        """
+        index = self._index
+        gram_counts, postings = index.gram_counts, index.postings
+        text = line if normalized else normalize_name(line)
+        if not text:
+            return []
+
+        hits = [
+            ids
+            for ids in map(postings.get, _trigrams(text))
+            if ids is not None and len(ids) <= MAX_POSTINGS
+        ]
+        if not hits:
+            return []
+
+        # Count shared trigrams per name over the touched postings only
+        entry_ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        overlap = shared / gram_counts[entry_ids]
+        keep = overlap >= MIN_GRAM_OVERLAP
+        entry_ids, overlap = entry_ids[keep], overlap[keep]
+        candidates = entry_ids[np.argsort(-overlap, kind="stable")[:MAX_CANDIDATES]]
+        return _score(index, text, candidates.tolist(), limit)
+
+    def lookup_many(
+        self, lines: Sequence[str], limit: int = 1, normalized: bool = False
+    ) -> List[List[BrandMatch]]:
+        """
+        lookup for many lines at once, with the same results: shared
+        trigrams are counted for all lines in one numpy pass, keyed by
+        (line, name), so a batch pays the numpy overhead once, not per line.
+        """
+        index = self._index
+        keys, gram_counts, postings = index.keys, index.gram_counts, index.postings
+        texts = lines if normalized else [normalize_name(line) for line in lines]
+
+        hits, owners = [], []
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            for ids in map(postings.get, _trigrams(text)):
+                if ids is not None and len(ids) <= MAX_POSTINGS:
+                    hits.append(ids)
+                    owners.append(i)
+
+        candidates: List[List[int]] = [[] for _ in lines]
+        if hits:
+            # Count shared trigrams per (line, name) over the touched postings only
+            line_ids = np.repeat(
+                np.array(owners, dtype=np.int64), [len(h) for h in hits]
+            )
+            pairs = line_ids * len(keys) + np.concatenate(hits)
+            pairs, shared = np.unique(pairs, return_counts=True)
+            line_ids, entry_ids = np.divmod(pairs, len(keys))
+            overlap = shared / gram_counts[entry_ids]
+            keep = overlap >= MIN_GRAM_OVERLAP
+            line_ids, entry_ids, overlap = (
+                line_ids[keep],
+                entry_ids[keep],
+                overlap[keep],
+            )
+            # Per line, highest overlap first (stable, so ties keep index order)
+            order = np.lexsort((-overlap, line_ids))
+            for line_id, entry_id in zip(
+                line_ids[order].tolist(), entry_ids[order].tolist()
+            ):
+                if len(candidates[line_id]) < MAX_CANDIDATES:
+                    candidates[line_id].append(entry_id)
+
+        return [_score(index, text, ids, limit) for text, ids in zip(texts, candidates)]
+
+    def stats(self) -> dict:
+        index = self._index
+        names, keys, gram_counts, postings = index[:4]
+        posting_entries = sum(len(ids) for ids in postings.values())
+        memory = (
+            sys.getsizeof(names)
+            + sys.getsizeof(keys)
+            + gram_counts.nbytes
+            + sys.getsizeof(postings)
+            + sum(sys.getsizeof(k) for k in keys)
+            + sum(sys.getsizeof(n) for n in set(names))
+            + sum(sys.getsizeof(g) + ids.nbytes for g, ids in postings.items())
+        )
+        return {
+            "path": self.path,
+            "brands": index.brand_count,
+            "names": len(keys),
+            "trigrams": len(postings),
+            "postings": posting_entries,
+            "memory_bytes": memory,
+            "fingerprint": index.fingerprint,
+            "loaded_at": index.loaded_at,
+        }
+
+
+def _score(
+    index: _Index, normalized: str, candidates: List[int], limit: int
+) -> List[BrandMatch]:
+    """Fuzzy-score candidate names against the words of one line."""
+    words = normalized.split()
+    # One-word names only match a whole word, or two OCR split apart
+    whole = {word: word for word in words}
+    for pair in zip(words, words[1:]):
+        whole.setdefault("".join(pair), " ".join(pair))
+    best: Dict[str, BrandMatch] = {}
+    for entry_id in candidates:
+        key = index.keys[entry_id]
+        size = len(key.split())
+        if size == 1:
+            found = (whole[key], 100.0) if key in whole else None
+        else:
+            # OCR often merges or splits a word, so try neighbouring lengths
+            windows = [
+                " ".join(words[i : i + n])
+                for n in range(size - 1, size + 2)
+                for i in range(len(words) - n + 1)
+            ]
+            found = process.extractOne(
+                key, windows, scorer=fuzz.ratio, score_cutoff=MATCH_CUTOFF
+            )
+        if found is None:
+            continue
+        match = BrandMatch(index.names[entry_id], round(found[1], 1), found[0])
+        if match.name not in best or match.score > best[match.name].score:
+            best[match.name] = match
+
+    return sorted(best.values(), key=lambda m: -m.score)[:limit]
+
+
+def _parse_entries(path: str, content: str) -> List[Tuple[str, List[str]]]:
+    """
+    Read (name, aliases) pairs. CSV files have a name column and an optional
+    aliases column separated by ";". JSON files hold a list of names or of
+    {"name": ..., "aliases": [...]} objects.
+    """
+    entries = []
+    if path.endswith(".json"):
+        for item in json.loads(content):
+            if isinstance(item, str):
+                entries.append((item, []))
+            else:
+                entries.append((item["name"], list(item.get("aliases") or [])))
+        return entries
+
+    for row in csv.DictReader(content.splitlines()):
+        name = (row.get("name") or "").strip()
+        if not name:
+            continue
+        aliases = [a.strip() for a in (row.get("aliases") or "").split(";")]
+        entries.append((name, [a for a in aliases if a]))
+    return entries
+
+
+_registry: Optional[BrandRegistry] = None
+_registry_lock = threading.Lock()
+_last_check = 0.0
+
+
+def get_brand_registry() -> Optional[BrandRegistry]:
+    """
+    Return the process-wide registry, loading it on first use. The file's
+    modification time is re-checked every BRAND_REGISTRY_CHECK_SECONDS, so
+    an edited registry is picked up by every worker without a restart.
+    Returns None when no registry file is available.
+    """
+    global _registry, _last_check
+    path = settings.brand_registry_path or DEFAULT_REGISTRY_PATH
+    now = time.time()
+    if (
+        _registry is not None
+        and _registry.path == path
+        and now - _last_check < settings.brand_registry_check_seconds
+    ):
+        return _registry
+
+    with _registry_lock:
+        _last_check = now
+        try:
+            if _registry is None or _registry.path != path:
+                _registry = BrandRegistry(path)
+            elif os.path.getmtime(path) != _registry.mtime:
+                _registry.load()
+        except (OSError, ValueError, KeyError):
+            # Keep serving the last good index if the file is mid-edit or bad
+            if _registry is not None and _registry.path != path:
+                _registry = None
+    return _registry
+
+
+def brand_fingerprint() -> Optional[str]:
+    """Fingerprint of this process's registry contents, None without one."""
+    registry = get_brand_registry()
+    return registry.fingerprint if registry is not None else None
+
+
+def sync_brand_registry(fingerprint: Optional[str]) -> None:
+    """
+    Reload this process's registry if it differs from the caller's, e.g. in
+    an OCR worker after the API process reloaded the file. A file replaced
+    with its mtime preserved is never picked up by the periodic check.
+    """
+    if fingerprint is None or brand_fingerprint() == fingerprint:
+        return
+    try:
+        reload_brand_registry()
+    except (OSError, ValueError, KeyError):
+        # Validate with the last good index; the result's fingerprint says so
+        pass
+
+
+def reload_brand_registry() -> Optional[BrandRegistry]:
+    """Force a reload in this process, e.g. after replacing the file."""
+    global _registry, _last_check
+    with _registry_lock:
+        path = settings.brand_registry_path or DEFAULT_REGISTRY_PATH
+        if _registry is not None and _registry.path == path:
+            _registry.load()
+        else:
+            _registry = BrandRegistry(path)
+        _last_check = time.time()
+        return _registry
@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+# Disk hits refresh their accessed_at (for LRU pruning) in batches of this
+# many, or with the next write, rather than committing on every read
+ACCESS_FLUSH_ENTRIES = 64
+
+
+def cache_key(namespace: str, digest: str, *fingerprint: str) -> str:
+    """Build a key from the image digest plus every setting that affects the value."""
+    return ":".join([namespace, digest, *fingerprint])
+
+
+class ResultCache:
+    """
+    Two-tier string cache: a bounded in-memory LRU in front of a SQLite file
+    that survives restarts. Disk entries expire by age and the file is kept
+    under a byte budget by evicting least recently used rows. Both tiers
+    expire entries by age. Calls block on SQLite, so async code runs them
+    in a thread.
+    """
+
+    def __init__(
+        self,
+        memory_entries: int = 256,
+        db_path: Optional[str] = None,
+        max_disk_mb: int = 512,
+        max_age_days: int = 30,
+    ):
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        self.max_age_s = max_age_days * 24 * 3600
+        # key -> (value, created_at)
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # Disk hits whose accessed_at is not written yet
+        self._accessed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            now = time.time()
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.max_age_s:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] <= self.max_age_s:
+                    self._accessed[key] = now
+                    if len(self._accessed) >= ACCESS_FLUSH_ENTRIES:
+                        self._flush_accessed()
+                        self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            now = time.time()
+            self._remember(key, value, now)
+
+            if self._db is not None:
+                self._accessed.pop(key, None)
+                self._flush_accessed()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                self._db.commit()
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= 64:
+                    self._prune_disk()
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _flush_accessed(self) -> None:
+        """Write pending accessed_at updates; the caller commits."""
+        if self._accessed:
+            self._db.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def _prune_disk(self) -> None:
+        self._writes_since_prune = 0
+        cursor = self._db.execute(
+            "DELETE FROM entries WHERE created_at < ?", (time.time() - self.max_age_s,)
+        )
+        self.evictions += cursor.rowcount
+
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if total > self.max_disk_bytes:
+            excess = total - self.max_disk_bytes
+            rows = self._db.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at"
+            ).fetchall()
+            stale = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                stale.append((key,))
+                excess -= size
+            self._db.executemany("DELETE FROM entries WHERE key = ?", stale)
+            self.evictions += len(stale)
+        self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk_entries = disk_bytes = 0
+            if self._db is not None:
+                disk_entries, disk_bytes = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    round((lookups - self.misses) / lookups, 3) if lookups else 0.0
+                ),
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._accessed.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._flush_accessed()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ResultCache]:
+    """Return the process-wide cache, or None when caching is disabled."""
+    global _cache
+    if not settings.cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    memory_entries=settings.cache_memory_entries,
+                    db_path=settings.cache_path or None,
+                    max_disk_mb=settings.cache_max_disk_mb,
+                    max_age_days=settings.cache_max_age_days,
+                )
+    return _cache
+
+
+def shutdown_cache() -> None:
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
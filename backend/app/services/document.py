@@ -0,0 +1,126 @@
+import bisect
+import re
+from itertools import accumulate
+from typing import Any, Dict, List, Sequence, Union
+
+from app.services.gazetteer import Place, get_gazetteer
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Splitting on a captured TOKEN_PATTERN alternates separators and words, so
+# one call yields the words and, from the running length of the pieces,
+# where each one starts and ends
+TOKEN_SPLIT_PATTERN = re.compile(r"(\w+)")
+
+
+def lower_keeping_offsets(text: str) -> str:
+    """
+    text.lower() with every character kept one code point long, so an
+    offset found in the result slices the same characters of text. A few
+    characters lowercase to two ("İ" to "i" plus a combining dot); they
+    keep only the first.
+    """
+    lower = text.lower()
+    if len(lower) == len(text):
+        # Lowercasing never shortens a character, so nothing grew either
+        return lower
+    return "".join(char.lower()[0] for char in text)
+
+
+class LabelDocument:
+    """
+    Everything the field extractors derive from one OCR result, computed
+    once: lowered and normalized text, tokens with offsets and a line index.
+    Offsets into lower are offsets into text.
+    Optional OCR words (with .text, .conf, .height, .line) ride along for
+    extractors that use confidence or position.
+    """
+
+    def __init__(self, text: str, words: Sequence[Any] = ()):
+        self.text = text or ""
+        self.lower = lower_keeping_offsets(self.text)
+        self.words = words
+
+        # Same as validators.normalize_text: punctuation dropped, runs of
+        # whitespace collapsed, lowercase. token_starts and token_ends hold
+        # each word's span in text
+        pieces = TOKEN_SPLIT_PATTERN.split(self.lower)
+        bounds = list(accumulate(map(len, pieces), initial=0))
+        self.norm_words: List[str] = pieces[1::2]
+        self.token_starts: List[int] = bounds[1::2]
+        self.token_ends: List[int] = bounds[2::2]
+        self.normalized = " ".join(self.norm_words)
+
+        # Non-empty stripped lines and where each starts in text
+        self.lines: List[str] = []
+        self.line_starts: List[int] = []
+        offset = 0
+        for raw_line in self.text.split("\n"):
+            stripped = raw_line.strip()
+            if stripped:
+                self.lines.append(stripped)
+                self.line_starts.append(offset + raw_line.index(stripped[0]))
+            offset += len(raw_line) + 1
+
+        self._word_tokens = None
+        self._places = None
+        self._windows: Dict[int, List[str]] = {}
+
+        # Results of fuzzy matching, keyed by the function computing them, so
+        # a batch can score many documents in one RapidFuzz call up front
+        self.memo: Dict[Any, Any] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+    def token_index(self, offset: int) -> int:
+        """Index into norm_words of the first word starting at or after offset."""
+        return bisect.bisect_left(self.token_starts, offset)
+
+    def line_at(self, offset: int) -> int:
+        """Index into lines of the line containing a text offset (-1 if before the first)."""
+        return bisect.bisect_right(self.line_starts, offset) - 1
+
+    def line_words(self, index: int) -> List[str]:
+        """Normalized words of lines[index], sliced from norm_words."""
+        start = self.line_starts[index]
+        first = self.token_index(start)
+        last = self.token_index(start + len(self.lines[index]))
+        return self.norm_words[first:last]
+
+    @property
+    def places(self) -> List[Place]:
+        """Countries, states and cities in norm_words, from one gazetteer scan."""
+        if self._places is None:
+            self._places = get_gazetteer().find(self.norm_words)
+        return self._places
+
+    def windows(self, n: int) -> List[str]:
+        """Every run of n consecutive normalized words, space-joined (cached)."""
+        if n not in self._windows:
+            words = self.norm_words
+            if n == 1:
+                self._windows[n] = words
+            else:
+                self._windows[n] = [
+                    " ".join(words[i : i + n]) for i in range(len(words) - n + 1)
+                ]
+        return self._windows[n]
+
+    def word_tokens(self) -> List[tuple]:
+        """(normalized token set, confidence) per OCR word, built on first use."""
+        if self._word_tokens is None:
+            self._word_tokens = [
+                (frozenset(TOKEN_PATTERN.findall(word.text.lower())), word.conf)
+                for word in self.words
+            ]
+        return self._word_tokens
+
+
+def as_document(
+    text: Union[str, LabelDocument], words: Sequence[Any] = ()
+) -> LabelDocument:
+    """Accept either raw OCR text or an already built document."""
+    if isinstance(text, LabelDocument):
+        return text
+    return LabelDocument(text, words)
@@ -0,0 +1,310 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from app.config import settings
+
+try:
+    import tesserocr
+except ImportError:  # pragma: no cover - optional dependency
+    tesserocr = None
+
+
+class Word(NamedTuple):
+    """One recognised word: pixel box in the OCR'd image and 0-100 confidence."""
+
+    text: str
+    conf: float
+    left: int
+    top: int
+    width: int
+    height: int
+    block: int
+    line: int
+
+
+def words_to_text(words: List[Word]) -> str:
+    """Plain text from words: one output line per OCR line, in order."""
+    lines = []
+    current = None
+    for word in words:
+        if word.line != current:
+            lines.append([])
+            current = word.line
+        lines[-1].append(word.text)
+    return "\n".join(" ".join(line) for line in lines)
+
+
+class OCRTimeout(TimeoutError):
+    """Recognition hit its time limit; partial holds whatever was read by then."""
+
+    def __init__(self, partial=None):
+        super().__init__("OCR timed out")
+        self.partial = partial
+
+
+class TesseractPool:
+    """
+    Pool of long-lived in-process Tesseract instances (via tesserocr).
+    Each instance keeps the language model loaded between calls and
+    reads image buffers directly, so no process spawn or temp file per pass.
+    """
+
+    def __init__(self, size: int, lang: str = "eng", path: Optional[str] = None):
+        self.size = max(1, size)
+        self.lang = lang
+        self.path = path
+        self._apis: "queue.Queue" = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create_api(self):
+        kwargs = {"lang": self.lang}
+        if self.path:
+            kwargs["path"] = self.path
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    @contextmanager
+    def acquire(self) -> Iterator["tesserocr.PyTessBaseAPI"]:
+        """Borrow an instance, creating one lazily while under the pool size."""
+        api = None
+        try:
+            api = self._apis.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    api = self._create_api()
+                    self._created += 1
+            if api is None:
+                api = self._apis.get()
+
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self._apis.put(api)
+
+    def image_to_string(
+        self,
+        image: Union[np.ndarray, Image.Image],
+        psm: int = 6,
+        timeout_ms: Optional[int] = None,
+    ) -> str:
+        """
+        OCR an image. With timeout_ms, Tesseract abandons recognition once
+        the limit is reached and OCRTimeout carries the text read so far.
+        """
+        with self.acquire() as api:
+            api.SetPageSegMode(psm)
+            buffer = _set_image(api, image)
+            completed = api.Recognize(timeout_ms or 0)
+            text = api.GetUTF8Text()
+            del buffer
+            if timeout_ms and not completed:
+                raise OCRTimeout(text)
+            return text
+
+    def image_to_words(
+        self,
+        image: Union[np.ndarray, Image.Image],
+        psm: int = 6,
+        timeout_ms: Optional[int] = None,
+    ) -> List[Word]:
+        """
+        OCR an image once and return its words with boxes and confidences.
+        On timeout, OCRTimeout carries the words recognised so far.
+        """
+        with self.acquire() as api:
+            api.SetPageSegMode(psm)
+            buffer = _set_image(api, image)
+            completed = api.Recognize(timeout_ms or 0)
+            words = _read_words(api)
+            del buffer
+            if timeout_ms and not completed:
+                raise OCRTimeout(words)
+            return words
+
+    def close(self) -> None:
+        while True:
+            try:
+                api = self._apis.get_nowait()
+            except queue.Empty:
+                break
+            api.End()
+        with self._lock:
+            self._created = 0
+
+
+def _set_image(api, image: Union[np.ndarray, Image.Image]):
+    """
+    Hand an image to Tesseract. Arrays go in as raw pixels (a single memcpy
+    into a bytes object, which Tesseract reads without copying); PIL images
+    go through tesserocr's own conversion. Returns the buffer, which must
+    stay alive until recognition has run.
+    """
+    if isinstance(image, np.ndarray):
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        buffer = np.ascontiguousarray(image).tobytes()
+        api.SetImageBytes(buffer, width, height, channels, width * channels)
+        return buffer
+    api.SetImage(image)
+    return None
+
+
+def _read_words(api) -> List[Word]:
+    """Walk tesserocr's result iterator word by word."""
+    words: List[Word] = []
+    iterator = api.GetIterator()
+    if iterator is None:
+        return words
+
+    level = tesserocr.RIL.WORD
+    block = line = -1
+    while True:
+        if iterator.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+            block += 1
+        if iterator.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+            line += 1
+        try:
+            text = iterator.GetUTF8Text(level)
+        except RuntimeError:
+            # Raised for an empty page
+            text = None
+        if text and text.strip():
+            x0, y0, x1, y1 = iterator.BoundingBox(level)
+            words.append(
+                Word(
+                    text.strip(),
+                    round(iterator.Confidence(level), 1),
+                    x0,
+                    y0,
+                    x1 - x0,
+                    y1 - y0,
+                    block,
+                    line,
+                )
+            )
+        if not iterator.Next(level):
+            break
+    return words
+
+
+class PytesseractEngine:
+    """Fallback engine that shells out to the tesseract binary per call."""
+
+    def __init__(self, lang: str = "eng", tesseract_cmd: Optional[str] = None):
+        self.lang = lang
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    def image_to_string(
+        self,
+        image: Union[np.ndarray, Image.Image],
+        psm: int = 6,
+        timeout_ms: Optional[int] = None,
+    ) -> str:
+        try:
+            return pytesseract.image_to_string(
+                image,
+                lang=self.lang,
+                config=f"--psm {psm}",
+                timeout=(timeout_ms or 0) / 1000,
+            )
+        except RuntimeError as e:
+            # pytesseract kills the process and reports the timeout this way
+            if "timeout" in str(e).lower():
+                raise OCRTimeout("")
+            raise
+
+    def image_to_words(
+        self,
+        image: Union[np.ndarray, Image.Image],
+        psm: int = 6,
+        timeout_ms: Optional[int] = None,
+    ) -> List[Word]:
+        try:
+            data = pytesseract.image_to_data(
+                image,
+                lang=self.lang,
+                config=f"--psm {psm}",
+                output_type=pytesseract.Output.DICT,
+                timeout=(timeout_ms or 0) / 1000,
+            )
+        except RuntimeError as e:
+            if "timeout" in str(e).lower():
+                raise OCRTimeout([])
+            raise
+
+        words: List[Word] = []
+        blocks: dict = {}
+        lines: dict = {}
+        for i, text in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            if conf < 0 or not text.strip():
+                continue
+            block_key = data["block_num"][i]
+            line_key = (block_key, data["par_num"][i], data["line_num"][i])
+            words.append(
+                Word(
+                    text.strip(),
+                    round(conf, 1),
+                    int(data["left"][i]),
+                    int(data["top"][i]),
+                    int(data["width"][i]),
+                    int(data["height"][i]),
+                    blocks.setdefault(block_key, len(blocks)),
+                    lines.setdefault(line_key, len(lines)),
+                )
+            )
+        return words
+
+    def close(self) -> None:
+        pass
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _build_engine():
+    if settings.ocr_engine != "pytesseract" and tesserocr is not None:
+        pool = TesseractPool(
+            settings.ocr_pool_size, lang=settings.ocr_lang, path=settings.tessdata_path
+        )
+        try:
+            # Fail fast on a missing model so we can fall back to the binary
+            with pool.acquire():
+                pass
+            return pool
+        except Exception:
+            pool.close()
+            if settings.ocr_engine == "tesserocr":
+                raise
+
+    return PytesseractEngine(
+        lang=settings.ocr_lang, tesseract_cmd=settings.tesseract_cmd
+    )
+
+
+def get_engine():
+    """Return the process-wide OCR engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _build_engine()
+    return _engine
+
+
+def shutdown_engine() -> None:
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+            _engine = None
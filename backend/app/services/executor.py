@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from multiprocessing import shared_memory
+from typing import Any, Callable, Optional
+
+from app.config import settings
+from app.services.metrics import OCR_QUEUE_DEPTH
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    return settings.ocr_workers or os.cpu_count() or 1
+
+
+def _init_worker() -> None:
+    # Images already run in parallel across processes, so stop each
+    # Tesseract from also spreading over every core via OpenMP.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    # Ctrl-C reaches the whole process group; the parent shuts the pool
+    # down, so a worker must not die mid-Tesseract call on its own
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared OCR process pool, creating it on first use.
+    Workers are spawned rather than forked so they never inherit the
+    parent's threads or a half-initialised Tesseract instance.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=pool_size(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+    return _pool
+
+
+async def run_in_pool(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run a picklable function in the OCR pool without blocking the event loop."""
+    global _pool
+    pool = get_pool()
+    loop = asyncio.get_running_loop()
+    OCR_QUEUE_DEPTH.inc()
+    try:
+        return await loop.run_in_executor(pool, partial(fn, *args, **kwargs))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge image); start a fresh pool for
+        # the next request instead of failing every call from now on.
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        OCR_QUEUE_DEPTH.dec()
+
+
+def _call_with_shared_buffer(fn: Callable, name: str, size: int, *args: Any) -> Any:
+    """Worker side of run_with_shared: attach and hand fn a view, not a copy."""
+    shm = shared_memory.SharedMemory(name=name)
+    view = shm.buf[:size]
+    try:
+        return fn(view, *args)
+    finally:
+        try:
+            view.release()
+            shm.close()
+        except BufferError:
+            # An array still points into the block (e.g. held by a traceback);
+            # the mapping is dropped when that reference is collected.
+            pass
+
+
+async def run_with_shared(fn: Callable, name: str, size: int, *args: Any) -> Any:
+    """
+    Run fn(buffer, *args) in the OCR pool on the first size bytes of an
+    existing shared memory block, e.g. an upload read straight into one.
+    """
+    return await run_in_pool(_call_with_shared_buffer, fn, name, size, *args)
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,194 @@
+import csv
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+DEFAULT_GAZETTEER_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.csv"
+)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Single-character OCR confusions used to generate typo variants of place
+# names, e.g. "EVANSV1LLE", "TENNE5SEE"
+OCR_CONFUSIONS = {"o": "0", "i": "1", "l": "1", "s": "5", "m": "rn"}
+
+# Names shorter than this get no generated typo variants
+MIN_VARIANT_LENGTH = 5
+
+
+class Place(NamedTuple):
+    """One gazetteer hit, spanning norm_words[start:end]."""
+
+    kind: str  # "country", "state" or "city"
+    name: str  # canonical name, e.g. "USA", "Kentucky"
+    start: int
+    end: int
+    abbreviation: bool  # matched a short code such as "KY"
+    exact: bool  # False when matched through an OCR typo variant
+
+
+class _Pattern(NamedTuple):
+    kind: str
+    name: str
+    length: int
+    abbreviation: bool
+    exact: bool
+
+
+def normalize_place(text: str) -> str:
+    """Lowercase words joined by single spaces, like LabelDocument.normalized."""
+    return " ".join(TOKEN_PATTERN.findall(text.lower()))
+
+
+def typo_variants(name: str) -> List[str]:
+    """Names with one common OCR confusion applied."""
+    if len(name) < MIN_VARIANT_LENGTH:
+        return []
+    variants = []
+    for i, char in enumerate(name):
+        wrong = OCR_CONFUSIONS.get(char)
+        if wrong:
+            variants.append(name[:i] + wrong + name[i + 1 :])
+    return variants
+
+
+class Gazetteer:
+    """
+    Countries, states and cities compiled into one Aho-Corasick automaton
+    whose alphabet is normalized words. A document is scanned once, word
+    by word, whatever the number of names and variants, so matches always
+    fall on word boundaries ("arkansas" never yields "kansas"); overlapping
+    hits resolve leftmost-longest, so "kansas city" wins over "kansas".
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, List[str], List[str]]]):
+        # goto[state][word] -> state; fail[state]; out[state] -> pattern ids
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[int]] = [[]]
+        self._patterns: List[_Pattern] = []
+        seen = set()
+
+        for kind, name, aliases, codes in entries:
+            keys = []
+            for alias in (name, *aliases):
+                key = normalize_place(alias)
+                if key:
+                    keys.append((key, False, True))
+                    keys.extend((v, False, False) for v in typo_variants(key))
+            keys.extend(
+                (normalize_place(c), True, True) for c in codes if normalize_place(c)
+            )
+            for key, abbreviation, exact in keys:
+                if (key, kind, name) in seen:
+                    continue
+                seen.add((key, kind, name))
+                words = key.split()
+                self._add(words, _Pattern(kind, name, len(words), abbreviation, exact))
+
+        self._build_failure_links()
+
+    def _add(self, words: List[str], pattern: _Pattern) -> None:
+        state = 0
+        for word in words:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][word] = nxt
+                self._goto.append({})
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(self._patterns))
+        self._patterns.append(pattern)
+
+    def _build_failure_links(self) -> None:
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(word, 0)
+                # Inherit the matches of the longest proper suffix
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    @property
+    def size(self) -> int:
+        return len(self._patterns)
+
+    def find(self, words: Sequence[str]) -> List[Place]:
+        """Non-overlapping place names in normalized words, in reading order."""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        hits: List[Tuple[int, int, int]] = []
+        state = 0
+        for i, word in enumerate(words):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for pattern_id in out[state]:
+                hits.append((i + 1 - patterns[pattern_id].length, -(i + 1), pattern_id))
+
+        places: List[Place] = []
+        last_end = -1
+        for start, neg_end, pattern_id in sorted(hits):
+            if start < last_end:
+                continue
+            pattern = patterns[pattern_id]
+            places.append(
+                Place(
+                    pattern.kind,
+                    pattern.name,
+                    start,
+                    -neg_end,
+                    pattern.abbreviation,
+                    pattern.exact,
+                )
+            )
+            last_end = -neg_end
+        return places
+
+
+def load_entries(path: str) -> List[Tuple[str, str, List[str], List[str]]]:
+    """
+    Read (kind, name, aliases, codes) rows. Aliases (other spellings and
+    known OCR misreads) and codes (abbreviations only trusted next to a
+    city, e.g. "KY") are separated by ";".
+    """
+    entries = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("name") or "").strip()
+            if not name:
+                continue
+            entries.append(
+                (
+                    row["kind"].strip(),
+                    name,
+                    _split_list(row.get("aliases")),
+                    _split_list(row.get("codes")),
+                )
+            )
+    return entries
+
+
+def _split_list(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in (value or "").split(";") if v.strip()]
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide gazetteer, compiling it on first use."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer(load_entries(DEFAULT_GAZETTEER_PATH))
+    return _gazetteer
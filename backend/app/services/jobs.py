@@ -0,0 +1,472 @@
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import (
+    Any,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from app.config import settings
+from app.services.executor import pool_size
+from app.services.metrics import REGISTRY, Gauge
+
+logger = logging.getLogger(__name__)
+
+# Idle workers re-check the queue this often, so work queued by another
+# process sharing the file is picked up even without a wake-up
+JOB_POLL_SECONDS = 1.0
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+class JobStore:
+    """
+    Queued verification jobs in a SQLite file. Each job is a list of
+    images (items) processed independently; an item's image bytes are kept
+    only until it finishes and its ImageResult JSON replaces them. Items
+    can also be staged one by one before their job exists; workers only
+    claim them once open_job() inserts the job row.
+
+    Several processes may share the file. A claimed item is leased to this
+    store's worker_id until lease_until, and renew() extends the lease while
+    it is verified. An item whose lease ran out (its process stopped) is
+    claimable again; items still leased to a live process are left alone.
+    """
+
+    def __init__(self, db_path: str, max_age_days: int = 7, lease_seconds: int = 60):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_age_s = max_age_days * 24 * 3600
+        self.lease_s = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{new_job_id()[:8]}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, mode TEXT NOT NULL, budget_ms INTEGER NOT NULL, "
+            "total INTEGER NOT NULL, created_at REAL NOT NULL, finished_at REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "job_id TEXT NOT NULL, position INTEGER NOT NULL, "
+            "filename TEXT NOT NULL, status TEXT NOT NULL, image BLOB, "
+            "result TEXT, error TEXT, compliant INTEGER, updated_at REAL NOT NULL, "
+            "worker TEXT, lease_until REAL, PRIMARY KEY (job_id, position))"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(items)")}
+        if "worker" not in columns:
+            # Files created before leases; their running items count as expired
+            self._db.execute("ALTER TABLE items ADD COLUMN worker TEXT")
+            self._db.execute("ALTER TABLE items ADD COLUMN lease_until REAL")
+        # Queued items are claimed oldest first, in insertion (rowid) order
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_status ON items (status)")
+        self._db.commit()
+
+    def submit(
+        self, images: Sequence[Tuple[str, BinaryIO]], mode: str, budget_ms: int
+    ) -> str:
+        """
+        Queue (filename, file) pairs as one job and return its id. Files are
+        read one at a time as their rows are inserted.
+        """
+        job_id = new_job_id()
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, NULL)",
+                    (job_id, mode, budget_ms, len(images), now),
+                )
+                self._db.executemany(
+                    "INSERT INTO items "
+                    "VALUES (?, ?, ?, 'queued', ?, NULL, NULL, NULL, ?, NULL, NULL)",
+                    (
+                        (job_id, position, filename, source.read(), now)
+                        for position, (filename, source) in enumerate(images)
+                    ),
+                )
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        return job_id
+
+    def stage(
+        self,
+        job_id: str,
+        position: int,
+        filename: str,
+        content: Optional[bytes],
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Store one image of a job that is still being received, or record it
+        as failed when error is given. Nothing is claimed before open_job().
+        """
+        status = "failed" if error is not None else "queued"
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO items VALUES (?, ?, ?, ?, ?, NULL, ?, NULL, ?, NULL, NULL)",
+                (job_id, position, filename, status, content, error, time.time()),
+            )
+            self._db.commit()
+
+    def open_job(self, job_id: str, mode: str, budget_ms: int, total: int) -> None:
+        """Make a job's staged items claimable."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, NULL)",
+                (job_id, mode, budget_ms, total, now),
+            )
+            # Every staged item may already have failed
+            self._db.execute(
+                "UPDATE jobs SET finished_at = ? WHERE id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM items WHERE job_id = ? AND status = 'queued')",
+                (now, job_id, job_id),
+            )
+            self._db.commit()
+
+    def claim(self) -> Optional[Tuple[str, int, str, bytes, str, int]]:
+        """
+        Lease the oldest queued item (or running item whose lease expired)
+        to this worker and return (job_id, position, filename, content,
+        mode, budget_ms), or None when the queue is empty.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE items SET status = 'running', updated_at = ?, worker = ?, "
+                "lease_until = ? WHERE rowid = (SELECT rowid FROM items "
+                "WHERE (status = 'queued' OR (status = 'running' "
+                "AND COALESCE(lease_until, 0) < ?)) "
+                "AND job_id IN (SELECT id FROM jobs) ORDER BY rowid LIMIT 1) "
+                "RETURNING job_id, position, filename, image",
+                (now, self.worker_id, now + self.lease_s, now),
+            ).fetchone()
+            self._db.commit()
+            if row is None:
+                return None
+            mode, budget_ms = self._db.execute(
+                "SELECT mode, budget_ms FROM jobs WHERE id = ?", (row[0],)
+            ).fetchone()
+        return (*row, mode, budget_ms)
+
+    def renew(self, job_id: str, position: int) -> bool:
+        """Extend this worker's lease on an item; False if it no longer holds it."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE items SET lease_until = ? WHERE job_id = ? AND position = ? "
+                "AND status = 'running' AND worker = ?",
+                (time.time() + self.lease_s, job_id, position, self.worker_id),
+            )
+            self._db.commit()
+        return cursor.rowcount > 0
+
+    def complete(
+        self, job_id: str, position: int, result_json: str, compliant: bool
+    ) -> None:
+        self._finish(job_id, position, "done", result_json, None, int(compliant))
+
+    def fail(self, job_id: str, position: int, error: str) -> None:
+        self._finish(job_id, position, "failed", None, error, None)
+
+    def _finish(
+        self,
+        job_id: str,
+        position: int,
+        status: str,
+        result: Optional[str],
+        error: Optional[str],
+        compliant: Optional[int],
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            # Only while this worker holds the item; if its lease lapsed and
+            # another worker took it over, that worker records the result
+            self._db.execute(
+                "UPDATE items SET status = ?, result = ?, error = ?, compliant = ?, "
+                "image = NULL, updated_at = ?, lease_until = NULL "
+                "WHERE job_id = ? AND position = ? AND status = 'running' "
+                "AND worker = ?",
+                (
+                    status,
+                    result,
+                    error,
+                    compliant,
+                    now,
+                    job_id,
+                    position,
+                    self.worker_id,
+                ),
+            )
+            self._db.execute(
+                "UPDATE jobs SET finished_at = ? WHERE id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM items WHERE job_id = ? "
+                "AND status IN ('queued', 'running'))",
+                (now, job_id, job_id),
+            )
+            self._db.commit()
+
+    def get(
+        self, job_id: str, offset: int = 0, limit: int = 100
+    ) -> Optional[Dict[str, Any]]:
+        """Job progress plus items [offset, offset + limit) in upload order."""
+        with self._lock:
+            job = self._db.execute(
+                "SELECT total, created_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(
+                self._db.execute(
+                    "SELECT status, COUNT(*) FROM items WHERE job_id = ? "
+                    "GROUP BY status",
+                    (job_id,),
+                ).fetchall()
+            )
+            compliant = self._db.execute(
+                "SELECT COALESCE(SUM(compliant), 0) FROM items WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()[0]
+            items = self._db.execute(
+                "SELECT position, filename, status, result, error FROM items "
+                "WHERE job_id = ? AND position >= ? ORDER BY position LIMIT ?",
+                (job_id, offset, limit),
+            ).fetchall()
+
+        total, created_at, finished_at = job
+        return {
+            "job_id": job_id,
+            "total": total,
+            "created_at": created_at,
+            "finished_at": finished_at,
+            "counts": {
+                status: counts.get(status, 0)
+                for status in ("queued", "running", "done", "failed")
+            },
+            "compliant": compliant,
+            "items": items,
+        }
+
+    def status_counts(self) -> Dict[str, int]:
+        """Items of every job by status, e.g. how many are still queued."""
+        with self._lock:
+            counts = dict(
+                self._db.execute(
+                    "SELECT status, COUNT(*) FROM items GROUP BY status"
+                ).fetchall()
+            )
+        return {
+            status: counts.get(status, 0)
+            for status in ("queued", "running", "done", "failed")
+        }
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._db.execute("DELETE FROM items WHERE job_id = ?", (job_id,))
+            self._db.commit()
+        return cursor.rowcount > 0
+
+    def recover(self) -> int:
+        """
+        Re-queue items whose lease expired, i.e. left running by a process
+        that stopped; items leased to live processes are left alone.
+        Returns how many.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE items SET status = 'queued', updated_at = ?, worker = NULL, "
+                "lease_until = NULL WHERE status = 'running' "
+                "AND COALESCE(lease_until, 0) < ?",
+                (now, now),
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def release(self) -> int:
+        """Re-queue this worker's running items at once, e.g. on shutdown."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE items SET status = 'queued', updated_at = ?, worker = NULL, "
+                "lease_until = NULL WHERE status = 'running' AND worker = ?",
+                (time.time(), self.worker_id),
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def prune(self) -> int:
+        """
+        Delete finished jobs older than max_age_days, and items staged that
+        long ago for a job that was never opened; returns how many jobs.
+        """
+        cutoff = time.time() - self.max_age_s
+        with self._lock:
+            stale = self._db.execute(
+                "SELECT id FROM jobs WHERE finished_at < ?", (cutoff,)
+            ).fetchall()
+            self._db.executemany("DELETE FROM items WHERE job_id = ?", stale)
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", stale)
+            self._db.execute(
+                "DELETE FROM items WHERE updated_at < ? "
+                "AND job_id NOT IN (SELECT id FROM jobs)",
+                (cutoff,),
+            )
+            self._db.commit()
+        return len(stale)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Return the process-wide job store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore(
+                    settings.jobs_path,
+                    settings.job_max_age_days,
+                    settings.job_lease_seconds,
+                )
+    return _store
+
+
+def _job_item_counts() -> Dict[Tuple[str, ...], float]:
+    # Only while this process serves jobs; a scrape never opens the store
+    store = _store
+    if store is None:
+        return {}
+    return {(status,): count for status, count in store.status_counts().items()}
+
+
+JOB_ITEMS = REGISTRY.register(
+    Gauge(
+        "label_verifier_job_items",
+        "Images of background jobs by status; queued is the job queue depth",
+        ["status"],
+        callback=_job_item_counts,
+    )
+)
+
+VerifyFn = Callable[[bytes, str, str, Optional[int]], Awaitable[Any]]
+
+_workers: List[asyncio.Task] = []
+# One per worker: a shared event cleared by one worker could swallow a
+# wake-up another worker has not seen yet
+_wakes: List[asyncio.Event] = []
+
+
+def job_worker_count() -> int:
+    return settings.job_workers or pool_size()
+
+
+def start_job_workers(verify: VerifyFn) -> None:
+    """
+    Start the background workers on the running event loop. Each takes one
+    queued image at a time and awaits verify(content, filename, mode,
+    budget_ms), so job_worker_count() images are in the OCR pool at once.
+    """
+    store = get_job_store()
+    recovered = store.recover()
+    pruned = store.prune()
+    if recovered or pruned:
+        logger.info("jobs: re-queued %d images, pruned %d jobs", recovered, pruned)
+
+    for _ in range(job_worker_count()):
+        wake = asyncio.Event()
+        _wakes.append(wake)
+        _workers.append(asyncio.create_task(_work(store, verify, wake)))
+
+
+def notify_job_workers() -> None:
+    """Wake idle workers after new work was queued."""
+    for wake in _wakes:
+        wake.set()
+
+
+async def _work(store: JobStore, verify: VerifyFn, wake: asyncio.Event) -> None:
+    while True:
+        # Cleared before claiming: work queued after this is either claimed
+        # now or leaves the event set for the wait below
+        wake.clear()
+        # SQLite calls (and the claimed image BLOB) stay off the event loop
+        item = await asyncio.to_thread(store.claim)
+        if item is None:
+            try:
+                await asyncio.wait_for(wake.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        job_id, position, filename, content, mode, budget_ms = item
+        renewal = asyncio.create_task(_renew_lease(store, job_id, position))
+        try:
+            result = await verify(content, filename, mode, budget_ms or None)
+        except asyncio.CancelledError:
+            # Shutting down; stop_job_workers() re-queues the item
+            raise
+        except Exception as e:
+            await asyncio.to_thread(
+                store.fail, job_id, position, str(getattr(e, "detail", "") or e)
+            )
+        else:
+            await asyncio.to_thread(
+                store.complete,
+                job_id,
+                position,
+                result.model_dump_json(),
+                result.summary.is_compliant,
+            )
+        finally:
+            renewal.cancel()
+
+
+async def _renew_lease(store: JobStore, job_id: str, position: int) -> None:
+    """Keep an item leased while it is verified, however long that takes."""
+    while True:
+        await asyncio.sleep(store.lease_s / 3)
+        if not await asyncio.to_thread(store.renew, job_id, position):
+            return
+
+
+async def stop_job_workers() -> None:
+    global _store
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _wakes.clear()
+    with _store_lock:
+        if _store is not None:
+            # Items cut short here are picked up at once, not after the lease
+            _store.release()
+            _store.close()
+            _store = None
@@ -0,0 +1,299 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a cached lookup to a full OCR pass
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Starlette appends "; charset=utf-8" to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        # A metric without labels is reported from the start, at zero
+        self._values: Dict[LabelValues, float] = {} if labels else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. With a callback, the value is read when
+    metrics are rendered, as {label values: value}.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, help_text, labels)
+        # A metric without labels is reported from the start, at zero
+        self._values: Dict[LabelValues, float] = {} if labels else {(): 0.0}
+        self.callback = callback
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        if self.callback is not None:
+            values = self.callback()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set, in seconds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._series: Dict[LabelValues, list] = {}
+        if not labels:
+            self._series[()] = [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            series = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._series.items()
+            )
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(
+                    (*self.label_names, "le"), (*key, _format_value(bound))
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+UPLOAD_READ_SECONDS = REGISTRY.register(
+    Histogram(
+        "label_verifier_upload_read_seconds",
+        "Time to copy one upload into shared memory",
+    )
+)
+DECODE_SECONDS = REGISTRY.register(
+    Histogram(
+        "label_verifier_decode_seconds",
+        "Time to decode and normalize one image for OCR",
+    )
+)
+PREPROCESS_SECONDS = REGISTRY.register(
+    Histogram(
+        "label_verifier_preprocess_seconds",
+        "Time spent preprocessing one image, by chosen mode",
+        ["mode"],
+    )
+)
+OCR_PASS_SECONDS = REGISTRY.register(
+    Histogram(
+        "label_verifier_ocr_pass_seconds",
+        "Time of one Tesseract pass over one image, by pass",
+        ["ocr_pass"],
+    )
+)
+VALIDATOR_SECONDS = REGISTRY.register(
+    Histogram(
+        "label_verifier_validator_seconds",
+        "Time of one field validator over one image, by field",
+        ["field"],
+    )
+)
+IMAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "label_verifier_image_seconds",
+        "Time to verify one image, by how its result was obtained",
+        ["source"],
+    )
+)
+SERIALIZE_SECONDS = REGISTRY.register(
+    Histogram(
+        "label_verifier_serialize_seconds",
+        "Time to encode one response body or stream event, by format",
+        ["format"],
+    )
+)
+CACHE_LOOKUPS = REGISTRY.register(
+    Counter(
+        "label_verifier_cache_lookups_total",
+        "Result cache lookups by outcome: hit, near_duplicate or miss",
+        ["result"],
+    )
+)
+OCR_FAILURES = REGISTRY.register(
+    Counter(
+        "label_verifier_ocr_failures_total",
+        "Images that could not be read, by stage: decode or ocr",
+        ["stage"],
+    )
+)
+OCR_TIMEOUTS = REGISTRY.register(
+    Counter(
+        "label_verifier_ocr_timeouts_total",
+        "Images whose OCR stopped at the time budget",
+    )
+)
+OCR_QUEUE_DEPTH = REGISTRY.register(
+    Gauge(
+        "label_verifier_ocr_queue_depth",
+        "Calls submitted to the OCR process pool and not yet finished",
+    )
+)
+
+
+def observe_stage_timings(metadata: Optional[dict], ocr: bool = True) -> None:
+    """
+    Record the stage timings an OCR worker returned in a result's metadata.
+    Workers are separate processes, so their timings reach the metrics
+    here rather than where they were measured. With ocr=False only the
+    validators ran, over OCR text (and its old timings) from the cache.
+    """
+    if not metadata:
+        return
+    for field, ms in (metadata.get("validator_ms") or {}).items():
+        VALIDATOR_SECONDS.observe(ms / 1000, field=field)
+    if not ocr:
+        return
+    if metadata.get("decode_failed"):
+        OCR_FAILURES.inc(stage="decode")
+    if "decode_ms" in metadata:
+        DECODE_SECONDS.observe(metadata["decode_ms"] / 1000)
+    if "preprocess_ms" in metadata:
+        PREPROCESS_SECONDS.observe(
+            metadata["preprocess_ms"] / 1000, mode=metadata.get("preprocess_mode", "")
+        )
+    for name, ms in (metadata.get("pass_ms") or {}).items():
+        OCR_PASS_SECONDS.observe(ms / 1000, ocr_pass=name)
+    if metadata.get("timed_out"):
+        OCR_TIMEOUTS.inc()
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -1,74 +1,372 @@
-import pytesseract
-from PIL import Image
-from io import BytesIO
-from typing import Optional, Tuple, List
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional, Tuple, List
 import time
-import re
 
+from app.config import settings
+from app.services.engine import OCRTimeout, Word, get_engine, words_to_text
+from app.services.preprocessor import (
+    MODE_FALLBACK,
+    ImageBuffer,
+    compute_image_stats,
+    crop_region,
+    detect_text_regions,
+    estimate_preprocess_ms,
+    load_for_ocr,
+    preprocess_array,
+    select_preprocess_mode,
+)
 
-def extract_text(image_bytes: bytes, preprocess: bool = True) -> Tuple[str, int]:
+# Bump whenever a change alters the text produced for the same image,
+# so cached OCR output from older code is not reused.
+OCR_VERSION = "6"
+
+# OCR passes, cheapest first. "regions" reads only detected text blocks,
+# "psmN" is a full-page pass in that page segmentation mode and "standard"
+# is a full-page PSM 6 pass over a denoised, binarized copy.
+OCR_PASSES = ("regions", "psm6", "psm3", "standard")
+
+# Above this share of the image, region OCR saves little over a full-page pass
+MAX_REGION_COVERAGE = 0.85
+
+# Preprocessing may use at most this share of the time left, so OCR
+# passes still get the rest
+PREPROCESS_BUDGET_SHARE = 0.5
+
+# Tesseract's LSTM model reads best with glyphs roughly this many pixels tall;
+# large display type is shrunk towards it before recognition.
+TARGET_TEXT_HEIGHT = 32
+
+
+def ocr_fingerprint(mode: str = "none") -> str:
+    """Identify the OCR code and every setting that changes its output."""
+    return "-".join(
+        str(part)
+        for part in (
+            OCR_VERSION,
+            mode,
+            settings.ocr_lang,
+            int(settings.ocr_text_regions),
+            settings.ocr_max_side,
+            settings.ocr_min_text_height,
+            settings.ocr_retry_confidence,
+        )
+    )
+
+
+@dataclass
+class OcrResult:
+    text: str
+    processing_time_ms: int
+    metadata: dict = field(default_factory=dict)
+    # Word boxes are in the coordinates of the OCR'd image, i.e. the original
+    # scaled by metadata["scale"].
+    words: List[Word] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OcrResult":
+        """Rebuild a result from asdict() output, e.g. after a JSON round trip."""
+        data = dict(data)
+        data["words"] = [Word(*word) for word in data.get("words", [])]
+        return cls(**data)
+
+
+def run_ocr(
+    image_bytes: ImageBuffer, mode: str = "none", deadline: Optional[float] = None
+) -> OcrResult:
+    """
+    Run every OCR pass on one image and return the combined text.
+    See iter_ocr_passes to stop as soon as the text is good enough.
+    """
+    result = None
+    for result in iter_ocr_passes(image_bytes, mode, deadline):
+        pass
+    return result
+
+
+def iter_ocr_passes(
+    image_bytes: ImageBuffer,
+    mode: str = "none",
+    deadline: Optional[float] = None,
+    wanted: Optional[Callable[[str], bool]] = None,
+    done: Optional[OcrResult] = None,
+) -> Iterator[OcrResult]:
     """
-    Extract text using fast multi-strategy OCR.
-    Target: <5 seconds per image.
+    Decode, normalize resolution, optionally preprocess, then OCR the image
+    in increasingly expensive passes (OCR_PASSES), yielding the combined
+    text after each one. Callers stop iterating once they have what they
+    need, so later passes never run on easy images.
+    mode is "none", "auto" or one of preprocessor.PREPROCESS_MODES.
+    deadline is a time.time() value; work still running then is abandoned
+    and the last result is marked timed_out in its metadata.
+    wanted(pass name) is asked before each pass after the first; passes it
+    declines are skipped (see iter_array_passes).
+    done is the result of earlier passes over the same image with the same
+    mode (e.g. confirm_fields): it is yielded first, and the image is only
+    decoded again if the caller asks for more; its passes are not re-run.
     """
     start_time = time.time()
+    if done is not None:
+        start_time -= done.processing_time_ms / 1000
+        yield done
+        if done.metadata.get("timed_out") or done.metadata.get("decode_failed"):
+            return
 
     try:
-        pil_image = Image.open(BytesIO(image_bytes))
-        if pil_image.mode != "RGB":
-            pil_image = pil_image.convert("RGB")
+        gray, metadata = load_for_ocr(
+            image_bytes,
+            max_side=settings.ocr_max_side,
+            min_text_height=settings.ocr_min_text_height,
+        )
     except Exception:
-        return "", int((time.time() - start_time) * 1000)
+        yield OcrResult(
+            "", int((time.time() - start_time) * 1000), {"decode_failed": True}
+        )
+        return
+    metadata["decode_ms"] = int((time.time() - start_time) * 1000)
+
+    if mode != "none" and _remaining_ms(deadline) != 0:
+        gray = _preprocess(gray, mode, metadata, deadline)
+
+    yield from iter_array_passes(gray, metadata, start_time, deadline, wanted, done)
 
-    results = []
 
+def _preprocess(
+    gray: np.ndarray, mode: str, metadata: dict, deadline: Optional[float] = None
+) -> np.ndarray:
+    """
+    Apply the requested (or, for "auto", the selected) preprocessing mode.
+    With a deadline, a mode expected to take more than its share of the
+    time left is replaced by a cheaper one (MODE_FALLBACK, else none) and
+    recorded in metadata["preprocess_fallback"]; a denoising step that
+    would still overrun is skipped.
+    """
+    start_time = time.time()
+
+    chosen = mode
+    if mode == "auto":
+        stats = compute_image_stats(gray)
+        chosen = select_preprocess_mode(stats)
+        metadata["image_stats"] = stats
+
+    remaining = _remaining_ms(deadline)
+    while (
+        chosen != "none"
+        and remaining is not None
+        and estimate_preprocess_ms(gray.shape, chosen)
+        > remaining * PREPROCESS_BUDGET_SHARE
+    ):
+        metadata.setdefault("preprocess_fallback", []).append(chosen)
+        chosen = MODE_FALLBACK.get(chosen, "none")
+
+    if chosen != "none":
+        gray, details = preprocess_array(gray, chosen, deadline)
+        if details.get("denoise_skipped"):
+            metadata["denoise_skipped"] = True
+
+    metadata["preprocess_mode"] = chosen
+    metadata["preprocess_ms"] = int((time.time() - start_time) * 1000)
+    return gray
+
+
+def iter_array_passes(
+    gray: np.ndarray,
+    metadata: Optional[dict] = None,
+    start_time: Optional[float] = None,
+    deadline: Optional[float] = None,
+    wanted: Optional[Callable[[str], bool]] = None,
+    done: Optional[OcrResult] = None,
+) -> Iterator[OcrResult]:
+    """
+    OCR an already decoded grayscale image pass by pass. The array is handed
+    to the engine as-is; no intermediate image files or re-encoding.
+    Each yielded result holds the words and text of all passes so far, merged.
+    metadata["pass_ms"] records how long each pass that ran took. Once one
+    pass has run, a later pass is only run if wanted(name) allows it, e.g.
+    when it can recover the fields still missing; skipped passes are listed
+    in metadata["skipped_passes"] and yield nothing. Passes already run in
+    done (see iter_ocr_passes) are merged in and neither re-run nor yielded.
+    """
+    start_time = start_time or time.time()
+    metadata = dict(metadata or {})
+    metadata["pass_ms"] = dict(done.metadata.get("pass_ms") or {}) if done else {}
+    engine = get_engine()
+
+    passes = [
+        name
+        for name in OCR_PASSES
+        if (name != "regions" or settings.ocr_text_regions)
+        and (name != "standard" or metadata.get("preprocess_mode", "none") == "none")
+    ]
+
+    results = [done.words] if done is not None and done.words else []
+    completed = list(done.metadata.get("passes") or ()) if done is not None else []
+    for name in passes:
+        if name in completed:
+            continue
+        if completed and wanted is not None and not wanted(name):
+            metadata.setdefault("skipped_passes", []).append(name)
+            continue
+        if _remaining_ms(deadline) == 0:
+            timed_out = True
+        else:
+            pass_start = time.time()
+            words, timed_out = _run_pass(engine, gray, name, deadline)
+            metadata["pass_ms"][name] = int((time.time() - pass_start) * 1000)
+            completed.append(name)
+            if words:
+                results.append(words)
+
+        metadata["passes"] = list(completed)
+        if timed_out:
+            metadata["timed_out"] = True
+        combined = _combine_results(results)
+        processing_time = int((time.time() - start_time) * 1000)
+        yield OcrResult(
+            words_to_text(combined),
+            processing_time,
+            {**metadata, "pass_ms": dict(metadata["pass_ms"])},
+            combined,
+        )
+        if timed_out:
+            return
+
+
+def _remaining_ms(deadline: Optional[float]) -> Optional[int]:
+    """Milliseconds left before deadline: None without one, 0 once it has passed."""
+    if deadline is None:
+        return None
+    remaining = int((deadline - time.time()) * 1000)
+    return remaining if remaining > 0 else 0
+
+
+def _run_pass(
+    engine, gray: np.ndarray, name: str, deadline: Optional[float] = None
+) -> Tuple[List[Word], bool]:
+    """Run one named pass; returns its words and whether it ran out of time."""
     try:
-        text_psm6 = pytesseract.image_to_string(pil_image, lang="eng", config="--psm 6")
-        if text_psm6.strip():
-            results.append(text_psm6)
+        if name == "regions":
+            return _extract_words_from_regions(engine, gray, deadline)
+        if name == "standard":
+            gray, _ = preprocess_array(gray.copy(), "standard")
+            psm = 6
+        else:
+            psm = int(name[3:])
+        timeout_ms = _remaining_ms(deadline)
+        if timeout_ms == 0:
+            return [], True
+        return engine.image_to_words(gray, psm=psm, timeout_ms=timeout_ms), False
+    except OCRTimeout as e:
+        return e.partial or [], True
     except Exception:
-        pass
+        return [], False
 
+
+def extract_text(image_bytes: bytes, preprocess: bool = True) -> Tuple[str, int]:
+    """Extract text and OCR time in ms; see run_ocr for the full result."""
+    result = run_ocr(image_bytes)
+    return result.text, result.processing_time_ms
+
+
+def _extract_words_from_regions(
+    engine, gray: np.ndarray, deadline: Optional[float] = None
+) -> Tuple[List[Word], bool]:
+    """
+    OCR only the detected text blocks, in parallel, in reading order, with
+    word boxes mapped back to full-image coordinates (one block per region).
+    Returns no words when detection finds nothing useful so the caller can
+    fall back to full-page OCR. The flag reports blocks cut short by the
+    deadline.
+    """
     try:
-        text_psm3 = pytesseract.image_to_string(pil_image, lang="eng", config="--psm 3")
-        if text_psm3.strip():
-            results.append(text_psm3)
+        regions = detect_text_regions(gray)
     except Exception:
-        pass
+        return [], False
 
-    if not results:
-        processing_time = int((time.time() - start_time) * 1000)
-        return "", processing_time
+    if not regions:
+        return [], False
+    covered = sum(r.w * r.h for r in regions) / float(gray.size)
+    if covered > MAX_REGION_COVERAGE:
+        return [], False
+
+    def read_region(region) -> Tuple[List[Word], bool]:
+        timeout_ms = _remaining_ms(deadline)
+        if timeout_ms == 0:
+            return [], True
+        crop, factor, pad = crop_region(gray, region, TARGET_TEXT_HEIGHT)
+        timed_out = False
+        try:
+            words = engine.image_to_words(crop, psm=6, timeout_ms=timeout_ms)
+        except OCRTimeout as e:
+            words, timed_out = e.partial or [], True
+        except Exception:
+            words = []
+        return [
+            word._replace(
+                left=region.x + int((word.left - pad) / factor),
+                top=region.y + int((word.top - pad) / factor),
+                width=int(word.width / factor),
+                height=int(word.height / factor),
+            )
+            for word in words
+        ], timed_out
 
-    combined_text = _combine_results(results)
+    with ThreadPoolExecutor(max_workers=max(1, settings.ocr_pool_size)) as pool:
+        outcomes = list(pool.map(read_region, regions))
 
-    processing_time = int((time.time() - start_time) * 1000)
+    words = []
+    for block, (region_words, _) in enumerate(outcomes):
+        words.extend(_renumber(region_words, block, len({w.line for w in words})))
+    return words, any(timed_out for _, timed_out in outcomes)
 
-    return combined_text, processing_time
+
+def _renumber(words: List[Word], block: Optional[int], first_line: int) -> List[Word]:
+    """Give words fresh line ids starting at first_line (and a block id if set)."""
+    lines: dict = {}
+    return [
+        word._replace(
+            block=word.block if block is None else block,
+            line=first_line + lines.setdefault(word.line, len(lines)),
+        )
+        for word in words
+    ]
 
 
-def _combine_results(results: List[str]) -> str:
-    """Combine multiple OCR results, keeping the best parts of each."""
+def _combine_results(results: List[List[Word]]) -> List[Word]:
+    """Combine multiple OCR passes, keeping the best lines of each."""
     if not results:
-        return ""
-    if len(results) == 1:
-        return results[0]
+        return []
 
-    combined = results[0]
+    combined = list(results[0])
+    combined_text = words_to_text(combined)
+    next_line = len({w.line for w in combined})
+    next_block = max((w.block for w in combined), default=-1) + 1
 
     for other in results[1:]:
-        for line in other.split("\n"):
-            line = line.strip()
-            if not line:
-                continue
-
-            if line not in combined:
-                if _is_quality_line(line):
-                    combined += "\n" + line
+        kept = []
+        for line_words in _group_lines(other):
+            line = " ".join(w.text for w in line_words)
+            if line not in combined_text and _is_quality_line(line):
+                kept.extend(line_words)
+                combined_text += "\n" + line
+        renumbered = _renumber(kept, None, next_line)
+        combined.extend(w._replace(block=w.block + next_block) for w in renumbered)
+        next_line += len({w.line for w in kept})
+        next_block = max((w.block for w in combined), default=-1) + 1
 
     return combined
 
 
+def _group_lines(words: List[Word]) -> List[List[Word]]:
+    lines: List[List[Word]] = []
+    for word in words:
+        if not lines or lines[-1][0].line != word.line:
+            lines.append([])
+        lines[-1].append(word)
+    return lines
+
+
 def _is_quality_line(line: str) -> bool:
     """Check if a line appears to be quality OCR output."""
     if len(line) < 3:
@@ -86,24 +384,26 @@ def _is_quality_line(line: str) -> bool:
 
 
 def get_text_with_confidence(image_bytes: bytes) -> Tuple[str, float]:
-    """Extract text with confidence score."""
+    """
+    Extract text with a mean word confidence (0-1) from a single PSM 6 pass;
+    the text is built from the same words, so no second OCR run is needed.
+    """
     try:
-        pil_image = Image.open(BytesIO(image_bytes))
-        if pil_image.mode != "RGB":
-            pil_image = Image.convert("RGB")
-
-        data = pytesseract.image_to_data(
-            pil_image, output_type=pytesseract.Output.DICT, lang="eng"
-        )
-
-        confidences = [int(c) for c in data["conf"] if int(c) > 0]
-        avg_confidence = (
-            sum(confidences) / len(confidences) / 100 if confidences else 0.5
+        gray, _ = load_for_ocr(
+            image_bytes,
+            max_side=settings.ocr_max_side,
+            min_text_height=settings.ocr_min_text_height,
         )
+        words = get_engine().image_to_words(gray, psm=6)
+    except Exception as e:
+        raise RuntimeError(f"OCR extraction failed: {str(e)}")
 
-        text = pytesseract.image_to_string(pil_image, lang="eng", config="--psm 6")
+    return words_to_text(words), mean_confidence(words)
 
-        return text.strip(), round(avg_confidence, 2)
 
-    except Exception as e:
-        raise RuntimeError(f"OCR extraction failed: {str(e)}")
+def mean_confidence(words: List[Word]) -> float:
+    """Average word confidence as 0-1; 0.5 when nothing was recognised."""
+    confidences = [w.conf for w in words if w.conf > 0]
+    if not confidences:
+        return 0.5
+    return round(sum(confidences) / len(confidences) / 100, 2)
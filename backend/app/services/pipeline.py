@@ -0,0 +1,296 @@
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.models.schemas import (
+    ImageResult,
+    FieldResults,
+    FieldResult,
+    FieldStatus,
+    Summary,
+)
+from app.config import settings
+from app.services.brands import sync_brand_registry
+from app.services.document import LabelDocument
+from app.services.engine import Word
+from app.services.ocr import OcrResult, iter_ocr_passes
+from app.services.preprocessor import ImageBuffer
+from app.services.validators import (
+    apply_word_confidence,
+    extract_brand_name,
+    extract_class_type,
+    extract_alcohol_content,
+    extract_net_contents,
+    validate_government_warning,
+    extract_bottler_producer,
+    extract_country_of_origin,
+    validator_fingerprint,
+)
+
+
+class OCRError(RuntimeError):
+    """Raised when OCR cannot be run on an uploaded image."""
+
+
+def make_field_result(value, confidence, parsed_value=None, issues=None) -> FieldResult:
+    if value is None:
+        return FieldResult(status=FieldStatus.MISSING, confidence=confidence)
+    elif issues and len(issues) > 0:
+        return FieldResult(
+            status=FieldStatus.FORMATTING_ISSUE,
+            value=value,
+            parsed_value=parsed_value,
+            issues=issues,
+            confidence=confidence,
+        )
+    else:
+        return FieldResult(
+            status=FieldStatus.DETECTED,
+            value=value,
+            parsed_value=parsed_value,
+            confidence=confidence,
+        )
+
+
+def extract_fields(
+    raw_text: str,
+    words: Sequence[Word] = (),
+    timings: Optional[Dict[str, float]] = None,
+) -> FieldResults:
+    """
+    Run every field validator over the OCR text. With OCR words, each
+    field's confidence also reflects how confidently its words were read.
+    With timings, each validator's milliseconds are added to it by field
+    name. Validators share the document's lazy analysis, so the first one
+    to need a view (words, lines, places) is charged for building it.
+    """
+    doc = LabelDocument(raw_text, words)
+
+    def run(name: str, extractor: Callable) -> tuple:
+        if timings is None:
+            return extractor(doc)
+        start = time.perf_counter()
+        output = extractor(doc)
+        elapsed = (time.perf_counter() - start) * 1000
+        timings[name] = round(timings.get(name, 0.0) + elapsed, 3)
+        return output
+
+    brand_name_val, brand_conf = run("brand_name", extract_brand_name)
+    class_type_val, class_conf = run("class_type", extract_class_type)
+    alc_val, alc_parsed, alc_conf = run("alcohol_content", extract_alcohol_content)
+    net_val, net_parsed, net_conf = run("net_contents", extract_net_contents)
+    warn_val, warn_parsed, warn_issues, warn_conf = run(
+        "government_warning", validate_government_warning
+    )
+    bottler_val, bottler_conf = run("bottler_producer", extract_bottler_producer)
+    origin_val, origin_conf = run("country_of_origin", extract_country_of_origin)
+
+    def conf(confidence: float, value: Optional[str]) -> float:
+        return apply_word_confidence(confidence, value, doc)
+
+    return FieldResults(
+        brand_name=make_field_result(brand_name_val, conf(brand_conf, brand_name_val)),
+        class_type=make_field_result(class_type_val, conf(class_conf, class_type_val)),
+        alcohol_content=make_field_result(alc_val, conf(alc_conf, alc_val), alc_parsed),
+        net_contents=make_field_result(net_val, conf(net_conf, net_val), net_parsed),
+        government_warning=make_field_result(
+            warn_val,
+            conf(warn_conf, warn_val),
+            warn_parsed,
+            issues=warn_issues if warn_issues else None,
+        ),
+        bottler_producer=make_field_result(
+            bottler_val, conf(bottler_conf, bottler_val)
+        ),
+        country_of_origin=make_field_result(origin_val, conf(origin_conf, origin_val)),
+    )
+
+
+# Fields every label must show. Country of origin only appears on imports
+# and the bottler line is not always printed, so those two never keep
+# further OCR passes running on their own.
+REQUIRED_FIELDS = (
+    "brand_name",
+    "class_type",
+    "alcohol_content",
+    "net_contents",
+    "government_warning",
+)
+
+# Fields each later pass can recover when earlier passes missed them. On
+# the sample labels the full-page passes read body text well but never
+# recovered a class/type the region pass missed (large display type; only
+# the binarized "standard" pass did), and PSM 3 reads brand names at about
+# 0.5 confidence, below OCR_RETRY_CONFIDENCE. Passes not listed can
+# recover any field.
+PASS_FIELDS = {
+    "psm6": frozenset(REQUIRED_FIELDS) - {"class_type"},
+    "psm3": frozenset(REQUIRED_FIELDS) - {"class_type", "brand_name"},
+}
+
+
+def fields_needing_retry(fields: FieldResults) -> List[str]:
+    """Required fields that are missing or read with low confidence."""
+    return [
+        name
+        for name, result in fields
+        if name in REQUIRED_FIELDS
+        and (
+            result.status == FieldStatus.MISSING
+            or result.confidence < settings.ocr_retry_confidence
+        )
+    ]
+
+
+def _ocr_until_complete(
+    content: ImageBuffer,
+    mode: str,
+    deadline: Optional[float] = None,
+    timings: Optional[Dict[str, float]] = None,
+    done: Optional[OcrResult] = None,
+) -> Tuple[OcrResult, FieldResults]:
+    """
+    Run OCR passes cheapest first, validating after each, and stop as soon
+    as every required field is found with enough confidence or the deadline
+    passes. Later passes only run if they can recover a field still
+    needed (PASS_FIELDS). Passes already run in done are not repeated.
+    """
+    retry: List[str] = []
+
+    def wanted(name: str) -> bool:
+        targets = PASS_FIELDS.get(name)
+        return targets is None or any(field in targets for field in retry)
+
+    ocr = fields = None
+    for ocr in iter_ocr_passes(content, mode, deadline, wanted, done):
+        fields = extract_fields(ocr.text, ocr.words, timings)
+        retry[:] = fields_needing_retry(fields)
+        if retry:
+            ocr.metadata["retry_fields"] = list(retry)
+        else:
+            ocr.metadata.pop("retry_fields", None)
+            break
+    return ocr, fields
+
+
+def _normalized(value: Optional[str]) -> Optional[str]:
+    return " ".join(value.casefold().split()) if value is not None else None
+
+
+def field_values(fields: FieldResults) -> Dict[str, tuple]:
+    """
+    What each field says, for comparing two readings of a label: its status
+    and parsed value (e.g. 47.0 for both "47% Alc./Vol." and "94 Proof"),
+    else its normalized text. The warning is compared by status and issues,
+    since OCR noise around it changes its text between readings.
+    """
+    values = {}
+    for name, result in fields:
+        if name == "government_warning":
+            values[name] = (result.status.value, tuple(result.issues or ()))
+        elif result.parsed_value is not None:
+            values[name] = (result.status.value, result.parsed_value)
+        else:
+            values[name] = (result.status.value, _normalized(result.value))
+    return values
+
+
+def confirm_fields(
+    content: ImageBuffer,
+    expected: Dict[str, tuple],
+    mode: str = "none",
+    budget_ms: Optional[int] = None,
+    brands: Optional[str] = None,
+) -> Tuple[bool, Optional[OcrResult]]:
+    """
+    Whether one OCR pass over the image reads the same field values as
+    another image's result (see field_values), e.g. before reusing the
+    result of a perceptually similar label. A different ABV, net contents
+    or a missing warning shows up here however close the images look.
+    Runs in a worker process; any doubt (no text, time out) means False.
+    Also returns the pass, so an unconfirmed image can be verified without
+    running it again (verify_image's done).
+    brands is the caller's brand registry fingerprint, as in verify_image.
+    """
+    sync_brand_registry(brands)
+    deadline = time.time() + budget_ms / 1000 if budget_ms else None
+    try:
+        ocr = next(iter_ocr_passes(content, mode, deadline))
+    except Exception:
+        return False, None
+    if not ocr.text or ocr.metadata.get("timed_out"):
+        return False, ocr
+    return field_values(extract_fields(ocr.text, ocr.words)) == expected, ocr
+
+
+def verify_image(
+    content: ImageBuffer,
+    filename: str,
+    ocr: Optional[OcrResult] = None,
+    mode: str = "none",
+    budget_ms: Optional[int] = None,
+    brands: Optional[str] = None,
+    done: Optional[OcrResult] = None,
+) -> Tuple[ImageResult, OcrResult]:
+    """
+    Run OCR and all field validators on one image.
+    Pure function of its arguments so it can run in a worker process.
+    Pass ocr to skip OCR when the text is already known (e.g. cached).
+    With budget_ms, OCR stops when the budget is spent and the result is
+    built from whatever text was read by then (timed_out=True).
+    Returns the result and the full, untruncated OCR output.
+    The result metadata carries per-stage timings: decode_ms, preprocess_ms
+    and pass_ms from OCR, and validator_ms summed over every validation
+    round (one per OCR pass).
+    brands is the caller's brand registry fingerprint: a worker holding a
+    different registry reloads it first. metadata["validator_fingerprint"]
+    identifies the rules and brands actually used, for the cache key.
+    done holds OCR passes already run over the image (see confirm_fields);
+    they count against budget_ms and are not repeated.
+    """
+    sync_brand_registry(brands)
+    start_time = time.time()
+    if done is not None:
+        start_time -= done.processing_time_ms / 1000
+    validator_ms: Dict[str, float] = {}
+
+    if ocr is None:
+        deadline = start_time + budget_ms / 1000 if budget_ms else None
+        try:
+            ocr, fields = _ocr_until_complete(
+                content, mode, deadline, validator_ms, done
+            )
+        except Exception as e:
+            raise OCRError(f"OCR failed for {filename}: {str(e)}")
+    else:
+        fields = extract_fields(ocr.text, ocr.words, validator_ms)
+    raw_text = ocr.text
+
+    all_fields = [result for _, result in fields]
+
+    detected = sum(1 for f in all_fields if f.status == FieldStatus.DETECTED)
+    missing = sum(1 for f in all_fields if f.status == FieldStatus.MISSING)
+    formatting_issues = sum(
+        1 for f in all_fields if f.status == FieldStatus.FORMATTING_ISSUE
+    )
+
+    total_time = int((time.time() - start_time) * 1000)
+
+    result = ImageResult(
+        filename=filename,
+        processing_time_ms=total_time,
+        raw_text=raw_text[:1000] if raw_text else None,
+        fields=fields,
+        summary=Summary(
+            detected=detected,
+            missing=missing,
+            formatting_issues=formatting_issues,
+            is_compliant=(missing == 0 and formatting_issues == 0),
+        ),
+        timed_out=ocr.metadata.get("timed_out", False),
+        metadata={
+            **ocr.metadata,
+            "validator_ms": validator_ms,
+            "validator_fingerprint": validator_fingerprint(),
+        },
+    )
+    return result, ocr
@@ -1,8 +1,170 @@
+import time
+
 import cv2
 import numpy as np
 from PIL import Image
 from io import BytesIO
-from typing import Optional, Tuple
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+# Encoded image data: bytes from an upload, or a view into shared memory
+ImageBuffer = Union[bytes, bytearray, memoryview]
+
+# Enough to hold the header (and any EXIF block) of common image formats
+HEADER_PEEK_BYTES = 256 * 1024
+
+
+class TextRegion(NamedTuple):
+    """A candidate text block in full-resolution pixel coordinates."""
+
+    x: int
+    y: int
+    w: int
+    h: int
+    text_height: int
+
+
+PREPROCESS_MODES = ("standard", "high_contrast", "upscale", "adaptive", "aggressive")
+
+
+def preprocess_array(
+    gray: np.ndarray, mode: str = "standard", deadline: Optional[float] = None
+) -> Tuple[np.ndarray, dict]:
+    """
+    Apply a preprocessing mode to a decoded grayscale image.
+    Works in place where the operation allows it, so pass a copy if the
+    input must be kept. Returns the processed array and metadata.
+    With a deadline (time.time() value), the denoising step of "upscale"
+    and "aggressive" is left out when it would not finish in time
+    (metadata["denoise_skipped"]).
+    """
+    if not gray.flags.writeable:
+        gray = gray.copy()
+
+    height, width = gray.shape
+    metadata = {"original_size": (width, height), "mode": mode}
+
+    if mode == "high_contrast":
+        processed = _high_contrast_preprocess(gray)
+    elif mode == "upscale":
+        processed = _upscale_preprocess(gray, deadline, metadata)
+    elif mode == "adaptive":
+        processed = _adaptive_preprocess(gray)
+    elif mode == "aggressive":
+        processed = _aggressive_preprocess(gray, deadline, metadata)
+    else:
+        processed = _standard_preprocess(gray)
+
+    metadata["processed_size"] = processed.shape[::-1]
+    return processed, metadata
+
+
+# Each mode first enlarges images whose long side is below this
+MODE_MIN_SIDE = {
+    "standard": 2000,
+    "high_contrast": 2500,
+    "upscale": 3000,
+    "adaptive": 2000,
+    "aggressive": 3000,
+}
+
+# Measured cost per megapixel of output on one core (sample labels, upper
+# end); "none" OCRs the normalized grayscale image as-is. Non-local means
+# denoising makes "upscale" and "aggressive" about 100x dearer than the
+# rest: 6-9 s on a 3000 px label, more than the default OCR budget.
+DENOISE_MS_PER_MEGAPIXEL = 1600
+MODE_MS_PER_MEGAPIXEL = {
+    "none": 0,
+    "adaptive": 10,
+    "standard": 12,
+    "high_contrast": 12,
+    "upscale": DENOISE_MS_PER_MEGAPIXEL,
+    "aggressive": DENOISE_MS_PER_MEGAPIXEL,
+}
+
+# Cheaper stand-in for a mode that cannot finish within the time left
+MODE_FALLBACK = {"upscale": "standard", "aggressive": "high_contrast"}
+
+
+def estimate_preprocess_ms(shape: Tuple[int, int], mode: str) -> float:
+    """Expected milliseconds for a mode on an image of this (height, width)."""
+    height, width = shape
+    scale = max(1.0, MODE_MIN_SIDE.get(mode, 0) / max(height, width))
+    megapixels = height * width * scale * scale / 1e6
+    return megapixels * MODE_MS_PER_MEGAPIXEL.get(mode, 0)
+
+
+def _denoise(
+    gray: np.ndarray, strength: int, deadline: Optional[float], metadata: dict
+) -> np.ndarray:
+    """fastNlMeansDenoising, unless it would run past the deadline."""
+    if deadline is not None:
+        height, width = gray.shape
+        expected_s = height * width / 1e6 * DENOISE_MS_PER_MEGAPIXEL / 1000
+        if time.time() + expected_s > deadline:
+            metadata["denoise_skipped"] = True
+            return gray
+    return cv2.fastNlMeansDenoising(gray, None, strength, 7, 21)
+
+
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], np.float32)
+
+
+def compute_image_stats(gray: np.ndarray, work_size: int = 500) -> dict:
+    """
+    Cheap statistics used to choose a preprocessing mode: global contrast
+    and illumination spread on a thumbnail, noise (Immerkaer's estimator)
+    and text stroke width on a full-resolution centre tile.
+    """
+    height, width = gray.shape
+    scale = min(1.0, work_size / max(height, width))
+    if scale < 1.0:
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+
+    p5, p95 = np.percentile(small, (5, 95))
+    blocks = cv2.resize(small, (8, 8), interpolation=cv2.INTER_AREA)
+
+    tile = gray[
+        max(0, height // 2 - 256) : height // 2 + 256,
+        max(0, width // 2 - 256) : width // 2 + 256,
+    ]
+    conv = cv2.filter2D(tile.astype(np.float32), -1, NOISE_KERNEL)
+    inner = conv[1:-1, 1:-1]
+    noise = (
+        float(np.abs(inner).sum()) * np.sqrt(0.5 * np.pi) / (6.0 * max(1, inner.size))
+    )
+
+    _, binary = cv2.threshold(tile, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) > binary.size / 2:
+        cv2.bitwise_not(binary, dst=binary)
+    dist = cv2.distanceTransform(binary, cv2.DIST_L2, 3)
+    ridge = dist[dist > 0]
+    stroke = 2 * float(np.median(ridge)) if ridge.size else 0.0
+
+    return {
+        "contrast": round(float(p95 - p5) / 255, 3),
+        "illumination_spread": round(float(blocks.std()) / 255, 3),
+        "noise": round(noise, 2),
+        "stroke_width": round(stroke, 2),
+        "size": max(height, width),
+    }
+
+
+def select_preprocess_mode(stats: dict) -> str:
+    """
+    Pick the cheapest mode whose fix matches the image's weakness.
+    Expensive denoising modes are only chosen for measurably noisy images.
+    """
+    if stats["noise"] > 8:
+        return "aggressive" if stats["contrast"] < 0.35 else "upscale"
+    if stats["contrast"] < 0.35:
+        return "high_contrast"
+    if stats["illumination_spread"] > 0.2:
+        return "adaptive"
+    if stats["size"] < 1000 or stats["stroke_width"] < 2:
+        return "standard"
+    return "none"
 
 
 def preprocess_for_ocr(
@@ -11,34 +173,11 @@ def preprocess_for_ocr(
     """
     Multiple preprocessing modes for different label styles.
     Returns processed image bytes and metadata about processing.
+    Prefer preprocess_array inside the pipeline; this re-encodes to PNG.
     """
     try:
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        if img is None:
-            pil_img = Image.open(BytesIO(image_bytes))
-            img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        height, width = gray.shape
-
-        metadata = {"original_size": (width, height), "mode": mode}
-
-        if mode == "standard":
-            processed = _standard_preprocess(gray)
-        elif mode == "high_contrast":
-            processed = _high_contrast_preprocess(gray)
-        elif mode == "upscale":
-            processed = _upscale_preprocess(gray)
-        elif mode == "adaptive":
-            processed = _adaptive_preprocess(gray)
-        elif mode == "aggressive":
-            processed = _aggressive_preprocess(gray)
-        else:
-            processed = _standard_preprocess(gray)
-
-        metadata["processed_size"] = processed.shape[::-1]
+        gray, _ = decode_grayscale(image_bytes, max_side=1 << 30)
+        processed, metadata = preprocess_array(gray, mode)
 
         pil_processed = Image.fromarray(processed)
         output_buffer = BytesIO()
@@ -52,54 +191,58 @@ def preprocess_for_ocr(
 
 def _standard_preprocess(gray: np.ndarray) -> np.ndarray:
     height, width = gray.shape
-    if max(height, width) < 2000:
-        scale = 2000 / max(height, width)
+    if max(height, width) < MODE_MIN_SIDE["standard"]:
+        scale = MODE_MIN_SIDE["standard"] / max(height, width)
         gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
 
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(gray)
-    _, binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    clahe.apply(gray, dst=gray)
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=gray)
 
-    return binary
+    return gray
 
 
 def _high_contrast_preprocess(gray: np.ndarray) -> np.ndarray:
     height, width = gray.shape
-    if max(height, width) < 2500:
-        scale = 2500 / max(height, width)
+    if max(height, width) < MODE_MIN_SIDE["high_contrast"]:
+        scale = MODE_MIN_SIDE["high_contrast"] / max(height, width)
         gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
 
     clahe = cv2.createCLAHE(clipLimit=4.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(gray)
+    clahe.apply(gray, dst=gray)
 
-    _, binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=gray)
 
     kernel = np.ones((2, 2), np.uint8)
-    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+    cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel, dst=gray)
 
-    return binary
+    return gray
 
 
-def _upscale_preprocess(gray: np.ndarray) -> np.ndarray:
+def _upscale_preprocess(
+    gray: np.ndarray, deadline: Optional[float], metadata: dict
+) -> np.ndarray:
     height, width = gray.shape
-    if max(height, width) < 3000:
-        scale = 3000 / max(height, width)
+    if max(height, width) < MODE_MIN_SIDE["upscale"]:
+        scale = MODE_MIN_SIDE["upscale"] / max(height, width)
         gray = cv2.resize(
             gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_LANCZOS4
         )
 
-    denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-    _, binary = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    denoised = _denoise(gray, 10, deadline, metadata)
+    cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=denoised)
 
-    return binary
+    return denoised
 
 
 def _adaptive_preprocess(gray: np.ndarray) -> np.ndarray:
     height, width = gray.shape
-    if max(height, width) < 2000:
-        scale = 2000 / max(height, width)
+    if max(height, width) < MODE_MIN_SIDE["adaptive"]:
+        scale = MODE_MIN_SIDE["adaptive"] / max(height, width)
         gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
 
+    # adaptiveThreshold reads a neighbourhood around each pixel, so it
+    # cannot write over its own input
     binary = cv2.adaptiveThreshold(
         gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
     )
@@ -107,26 +250,290 @@ def _adaptive_preprocess(gray: np.ndarray) -> np.ndarray:
     return binary
 
 
-def _aggressive_preprocess(gray: np.ndarray) -> np.ndarray:
+def _aggressive_preprocess(
+    gray: np.ndarray, deadline: Optional[float], metadata: dict
+) -> np.ndarray:
     height, width = gray.shape
-    scale = 3000 / max(height, width) if max(height, width) < 3000 else 1.0
-    if scale > 1:
+    if max(height, width) < MODE_MIN_SIDE["aggressive"]:
+        scale = MODE_MIN_SIDE["aggressive"] / max(height, width)
         gray = cv2.resize(
             gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_LANCZOS4
         )
 
-    denoised = cv2.fastNlMeansDenoising(gray, None, 15, 7, 21)
+    denoised = _denoise(gray, 15, deadline, metadata)
 
     clahe = cv2.createCLAHE(clipLimit=5.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(denoised)
+    clahe.apply(denoised, dst=denoised)
 
-    _, binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=denoised)
 
     kernel = np.ones((1, 1), np.uint8)
-    binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-    binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+    cv2.morphologyEx(denoised, cv2.MORPH_CLOSE, kernel, dst=denoised)
+    cv2.morphologyEx(denoised, cv2.MORPH_OPEN, kernel, dst=denoised)
 
-    return binary
+    return denoised
+
+
+REDUCED_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def _open_lazy(image_bytes: ImageBuffer) -> Image.Image:
+    """
+    Open an image for its header only. Bytes are shared with BytesIO as-is;
+    other buffers (e.g. shared memory views) copy just a header-sized prefix.
+    """
+    if isinstance(image_bytes, bytes):
+        return Image.open(BytesIO(image_bytes))
+    try:
+        return Image.open(BytesIO(image_bytes[:HEADER_PEEK_BYTES]))
+    except Exception:
+        return Image.open(BytesIO(image_bytes))
+
+
+def decode_grayscale(
+    image_bytes: ImageBuffer, max_side: int = 3000
+) -> Tuple[np.ndarray, dict]:
+    """
+    Decode straight to grayscale at the largest power-of-two reduction that
+    still leaves the long side at or above max_side. JPEGs use PIL's draft
+    mode so the reduction happens inside the DCT decoder; other formats use
+    OpenCV's IMREAD_REDUCED_* flags, reading the caller's buffer in place.
+    """
+    with _open_lazy(image_bytes) as header:
+        width, height = header.size
+        image_format = header.format
+
+    factor = 1
+    while factor < 8 and max(width, height) / (factor * 2) >= max_side:
+        factor *= 2
+
+    gray = None
+    if image_format != "JPEG":
+        gray = cv2.imdecode(
+            np.frombuffer(image_bytes, np.uint8), REDUCED_GRAYSCALE_FLAGS[factor]
+        )
+
+    if gray is None:
+        with Image.open(BytesIO(image_bytes)) as pil_img:
+            pil_img.draft("L", (width // factor, height // factor))
+            gray = np.asarray(pil_img.convert("L"))
+        if gray.shape[1] > width // factor * 1.5:
+            gray = cv2.resize(
+                gray, (width // factor, height // factor), interpolation=cv2.INTER_AREA
+            )
+
+    metadata = {
+        "format": image_format,
+        "original_size": [width, height],
+        "decode_scale": round(gray.shape[1] / width, 4),
+    }
+    return gray, metadata
+
+
+def estimate_text_height(gray: np.ndarray, work_size: int = 1000) -> Optional[float]:
+    """
+    Estimate the height in pixels of the smallest common text on the image
+    (25th percentile of glyph-like connected components), or None when
+    nothing glyph-like is found.
+    """
+    height, width = gray.shape
+    scale = min(1.0, work_size / max(height, width))
+    if scale < 1.0:
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+
+    binary = cv2.adaptiveThreshold(
+        small, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15
+    )
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    w = stats[1:, cv2.CC_STAT_WIDTH]
+    h = stats[1:, cv2.CC_STAT_HEIGHT]
+    area = stats[1:, cv2.CC_STAT_AREA]
+
+    glyphs = (
+        (h >= 5)
+        & (h <= small.shape[0] * 0.1)
+        & (w <= h * 2)
+        & (w >= h * 0.15)
+        & (area >= 0.15 * w * h)
+    )
+    if np.count_nonzero(glyphs) < 20:
+        return None
+    return float(np.percentile(h[glyphs], 25)) / scale
+
+
+def normalize_resolution(
+    gray: np.ndarray, min_text_height: int = 20
+) -> Tuple[np.ndarray, float, Optional[float]]:
+    """
+    Downsample so the smallest text sits near min_text_height pixels, which
+    is all Tesseract needs. Never upsamples. Returns the image, the scale
+    applied and the text height estimated before scaling.
+    """
+    text_height = estimate_text_height(gray)
+    if not text_height:
+        return gray, 1.0, None
+
+    scale = min_text_height / text_height
+    if scale > 0.8:
+        return gray, 1.0, text_height
+
+    resized = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return resized, scale, text_height
+
+
+def load_for_ocr(
+    image_bytes: bytes, max_side: int = 3000, min_text_height: int = 20
+) -> Tuple[np.ndarray, dict]:
+    """
+    Decode once to grayscale at an OCR-appropriate resolution.
+    Metadata records the total scale so coordinates can be mapped back.
+    """
+    gray, metadata = decode_grayscale(image_bytes, max_side)
+    gray, scale, text_height = normalize_resolution(gray, min_text_height)
+
+    metadata["scale"] = round(metadata["decode_scale"] * scale, 4)
+    metadata["ocr_size"] = [gray.shape[1], gray.shape[0]]
+    if text_height:
+        metadata["text_height_px"] = round(text_height / metadata["decode_scale"], 1)
+    return gray, metadata
+
+
+def detect_text_regions(gray: np.ndarray, work_size: int = 1000) -> List[TextRegion]:
+    """
+    Find candidate text blocks, returned in reading order. MSER picks up
+    character-shaped blobs on a downscaled copy; a horizontal closing joins
+    them into lines and blobs that don't group into lines (artwork, texture)
+    are dropped. Each region carries its median character height so the
+    OCR stage can rescale oversized display type.
+    """
+    height, width = gray.shape
+    scale = min(1.0, work_size / max(height, width))
+    if scale < 1.0:
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        small = gray
+    small_h, small_w = small.shape
+
+    mser = cv2.MSER_create(5, 20, 4000)
+    mser.setMaxVariation(0.25)
+    _, char_boxes = mser.detectRegions(small)
+
+    mask = np.zeros(small.shape, np.uint8)
+    centers = np.zeros(small.shape, np.uint16)
+    for x, y, w, h in char_boxes:
+        if h < 6 or h > small_h * 0.12:
+            continue
+        aspect = w / float(h)
+        if aspect > 2.5 or aspect < 0.1:
+            continue
+        mask[y : y + h, x : x + w] = 255
+        centers[y + h // 2, x + w // 2] = h
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < 2 * h or h < 8:
+            continue
+        # A line of text holds several characters; lone blobs are artwork
+        if np.count_nonzero(centers[y : y + h, x : x + w]) < 4:
+            continue
+        pad = max(4, h // 4)
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(small_w, x + w + pad), min(small_h, y + h + pad)
+        boxes.append((x0, y0, x1, y1))
+
+    regions = []
+    for x0, y0, x1, y1 in _merge_overlapping(boxes):
+        heights = centers[y0:y1, x0:x1]
+        text_height = float(np.median(heights[heights > 0]))
+        regions.append(
+            TextRegion(
+                int(x0 / scale),
+                int(y0 / scale),
+                int((x1 - x0) / scale),
+                int((y1 - y0) / scale),
+                int(text_height / scale),
+            )
+        )
+    return _reading_order(regions)
+
+
+def crop_region(
+    gray: np.ndarray, region: TextRegion, target_text_height: int = 32
+) -> Tuple[np.ndarray, float, int]:
+    """
+    Cut a region out for OCR: shrink oversized display type towards the
+    target glyph height and pad with replicated edges, since Tesseract
+    often drops lines whose glyphs touch the crop boundary.
+    Returns the crop, its scale factor and the padding, so positions in
+    the crop map back as region.x + (x - pad) / factor.
+    """
+    crop = gray[region.y : region.y + region.h, region.x : region.x + region.w]
+    factor = 1.0
+    if region.text_height > target_text_height * 1.5:
+        factor = target_text_height / region.text_height
+        crop = cv2.resize(
+            crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA
+        )
+    pad = max(4, min(crop.shape) // 6)
+    crop = cv2.copyMakeBorder(crop, pad, pad, pad, pad, cv2.BORDER_REPLICATE)
+    return crop, factor, pad
+
+
+def _merge_overlapping(boxes: List[Tuple[int, int, int, int]]) -> list:
+    """Merge (x0, y0, x1, y1) boxes that overlap so no text is read twice."""
+    merged = list(boxes)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                ix = min(a[2], b[2]) - max(a[0], b[0])
+                iy = min(a[3], b[3]) - max(a[1], b[1])
+                if ix <= 0 or iy <= 0:
+                    continue
+                smaller = min(
+                    (a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1])
+                )
+                if ix * iy < smaller * 0.5:
+                    continue
+                merged[i] = (
+                    min(a[0], b[0]),
+                    min(a[1], b[1]),
+                    max(a[2], b[2]),
+                    max(a[3], b[3]),
+                )
+                del merged[j]
+                changed = True
+                break
+            if changed:
+                break
+    return merged
+
+
+def _reading_order(regions: List[TextRegion]) -> List[TextRegion]:
+    """Sort regions top-to-bottom, grouping those on one line left-to-right."""
+    rows: List[list] = []
+    for region in sorted(regions, key=lambda r: r.y + r.h / 2):
+        center = region.y + region.h / 2
+        if rows and rows[-1][0] <= center <= rows[-1][1]:
+            rows[-1][2].append(region)
+            rows[-1][1] = max(rows[-1][1], region.y + region.h)
+        else:
+            rows.append([region.y, region.y + region.h, [region]])
+    return [region for row in rows for region in sorted(row[2], key=lambda r: r.x)]
 
 
 def preprocess_image(image_bytes: bytes, enhance_level: str = "medium") -> bytes:
@@ -0,0 +1,139 @@
+import json
+import time
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional
+
+from fastapi import HTTPException, Query
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.models.schemas import FieldResults
+from app.services.metrics import SERIALIZE_SECONDS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MEDIA_TYPES = {"json": "application/json", "msgpack": "application/x-msgpack"}
+STREAM_MEDIA_TYPES = {
+    "json": "application/x-ndjson",
+    "msgpack": "application/x-msgpack",
+}
+
+FIELD_NAMES = tuple(FieldResults.model_fields)
+
+
+class ResponseOptions(NamedTuple):
+    """Which parts of each ImageResult to send, and how to encode them."""
+
+    fields: Optional[FrozenSet[str]] = None  # None sends every field
+    raw_text: bool = True
+    metadata: bool = True
+    encoding: str = "json"
+
+    def exclude(self) -> Optional[Dict[str, Any]]:
+        """model_dump exclude for an ImageResult, or None to send it whole."""
+        exclude: Dict[str, Any] = {}
+        if not self.raw_text:
+            exclude["raw_text"] = True
+        if not self.metadata:
+            exclude["metadata"] = True
+        if self.fields is not None:
+            exclude["fields"] = set(FIELD_NAMES) - self.fields
+        return exclude or None
+
+    def select(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """The same selection applied to an ImageResult already loaded as a dict."""
+        if self.exclude() is None:
+            return result
+        result = dict(result)
+        if not self.raw_text:
+            result.pop("raw_text", None)
+        if not self.metadata:
+            result.pop("metadata", None)
+        if self.fields is not None:
+            result["fields"] = {
+                name: value
+                for name, value in result["fields"].items()
+                if name in self.fields
+            }
+        return result
+
+
+def response_options(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return, of "
+        + ", ".join(FIELD_NAMES)
+        + " (default: all)",
+    ),
+    raw_text: bool = Query(True, description="Include each image's OCR text"),
+    metadata: bool = Query(True, description="Include per-stage timings"),
+    encoding: str = Query(
+        "json", alias="format", description="Response encoding: json or msgpack"
+    ),
+) -> ResponseOptions:
+    """Parse the response-shaping query parameters shared by result endpoints."""
+    selected = None
+    if fields is not None:
+        selected = frozenset(name.strip() for name in fields.split(",") if name.strip())
+        unknown = selected - set(FIELD_NAMES)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields {', '.join(sorted(unknown))}; "
+                f"expected {', '.join(FIELD_NAMES)}",
+            )
+    if encoding not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{encoding}'; expected json or msgpack",
+        )
+    if encoding == "msgpack" and msgpack is None:
+        raise HTTPException(
+            status_code=400, detail="MessagePack responses need the msgpack package"
+        )
+    return ResponseOptions(selected, raw_text, metadata, encoding)
+
+
+def encode_model(
+    model: BaseModel, options: ResponseOptions, exclude: Optional[Dict] = None
+) -> bytes:
+    """
+    Serialize a response model once, straight from pydantic-core. Models
+    built by this service are trusted, so FastAPI's re-validation against
+    response_model is skipped.
+    """
+    start = time.perf_counter()
+    if options.encoding == "msgpack":
+        body = msgpack.packb(model.model_dump(mode="json", exclude=exclude))
+    else:
+        body = model.model_dump_json(exclude=exclude).encode()
+    SERIALIZE_SECONDS.observe(time.perf_counter() - start, format=options.encoding)
+    return body
+
+
+def encode_data(data: Any, options: ResponseOptions) -> bytes:
+    """Serialize plain JSON-compatible data, e.g. results loaded from storage."""
+    start = time.perf_counter()
+    if options.encoding == "msgpack":
+        body = msgpack.packb(data)
+    elif orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, separators=(",", ":")).encode()
+    SERIALIZE_SECONDS.observe(time.perf_counter() - start, format=options.encoding)
+    return body
+
+
+def load_json(text: str) -> Any:
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def encoded_response(content: bytes, options: ResponseOptions) -> Response:
+    return Response(content=content, media_type=MEDIA_TYPES[options.encoding])
@@ -0,0 +1,223 @@
+import os
+import sqlite3
+import threading
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.services.preprocessor import ImageBuffer, decode_grayscale
+
+# dHash compares each pixel of a (HASH_SIZE + 1) x HASH_SIZE thumbnail
+# with its right neighbour, giving a HASH_SIZE**2 bit hash. 64 bits cannot
+# tell apart labels printed from one template; 256 bits can.
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# Images are decoded at the largest power-of-two reduction that keeps the
+# long side at or above this, which is plenty for the thumbnail
+HASH_DECODE_SIDE = 256
+
+# Multi-index hashing splits hashes into this many substrings
+INDEX_CHUNKS = 16
+
+
+def dhash(gray: np.ndarray) -> int:
+    """
+    Difference hash of a grayscale image: stable under re-encoding,
+    rescaling, blur and mild brightness or contrast changes.
+    """
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def image_dhash(content: ImageBuffer) -> int:
+    """Decode an image cheaply and hash it. Runs in a worker process."""
+    gray, _ = decode_grayscale(content, max_side=HASH_DECODE_SIDE)
+    return dhash(gray)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """
+    Hamming-distance search by multi-index hashing: each hash is split into
+    chunks and every chunk is a key in its own table. Two hashes within r
+    bits differ by at most r // chunks bits in at least one chunk, so only
+    chunk values that close to the query's are looked up and the few
+    candidates found are checked in full. Lookups cost the same however
+    many hashes are stored, where a BK-tree with a radius of an eighth of
+    the bits degrades to a scan of the whole tree.
+    """
+
+    def __init__(self, bits: int = HASH_BITS, chunks: int = INDEX_CHUNKS):
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self._tables: List[Dict[int, Set[str]]] = [{} for _ in range(chunks)]
+        self._values: Dict[str, int] = {}
+        self._masks: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._values
+
+    def _split(self, value: int) -> List[int]:
+        mask = (1 << self.chunk_bits) - 1
+        return [(value >> (i * self.chunk_bits)) & mask for i in range(self.chunks)]
+
+    def _flip_masks(self, radius: int) -> List[int]:
+        """Every chunk-sized mask with at most radius bits set."""
+        if radius not in self._masks:
+            self._masks[radius] = [
+                sum(1 << bit for bit in bits)
+                for count in range(radius + 1)
+                for bits in combinations(range(self.chunk_bits), count)
+            ]
+        return self._masks[radius]
+
+    def add(self, value: int, key: str) -> None:
+        self.remove(key)
+        self._values[key] = value
+        for table, chunk in zip(self._tables, self._split(value)):
+            table.setdefault(chunk, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        value = self._values.pop(key, None)
+        if value is None:
+            return
+        for table, chunk in zip(self._tables, self._split(value)):
+            table[chunk].discard(key)
+            if not table[chunk]:
+                del table[chunk]
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, str]]:
+        """(distance, key) for every key within max_distance, nearest first."""
+        masks = self._flip_masks(max_distance // self.chunks)
+        candidates: Set[str] = set()
+        for table, chunk in zip(self._tables, self._split(value)):
+            for mask in masks:
+                keys = table.get(chunk ^ mask)
+                if keys:
+                    candidates.update(keys)
+
+        found = []
+        for key in candidates:
+            distance = hamming(value, self._values[key])
+            if distance <= max_distance:
+                found.append((distance, key))
+        found.sort()
+        return found
+
+
+class NearDuplicateIndex:
+    """
+    Perceptual hashes of verified images, keyed by their content digest, so
+    a re-photographed or re-exported label can be matched to one already
+    verified. Hashes are kept in a SQLite table (next to the result cache)
+    and loaded into a multi-index hash on first use.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_distance: int = 32):
+        self.max_distance = max_distance
+        self._hashes = MultiIndexHash()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.matches = 0
+
+        self._db = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS dhashes ("
+                "digest TEXT PRIMARY KEY, hash BLOB NOT NULL)"
+            )
+            self._db.commit()
+            for digest, value in self._db.execute("SELECT digest, hash FROM dhashes"):
+                if len(value) * 8 == HASH_BITS:
+                    self._hashes.add(int.from_bytes(value, "big"), digest)
+
+    def add(self, value: int, digest: str) -> None:
+        with self._lock:
+            if digest in self._hashes:
+                return
+            self._hashes.add(value, digest)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO dhashes VALUES (?, ?)",
+                    (digest, value.to_bytes(HASH_BITS // 8, "big")),
+                )
+                self._db.commit()
+
+    def find(self, value: int) -> List[Tuple[int, str]]:
+        """(distance, digest) of indexed images within max_distance, nearest first."""
+        with self._lock:
+            self.lookups += 1
+            return self._hashes.search(value, self.max_distance)
+
+    def discard(self, digest: str) -> None:
+        """Forget an image whose cached results have expired."""
+        with self._lock:
+            self._hashes.remove(digest)
+            if self._db is not None:
+                self._db.execute("DELETE FROM dhashes WHERE digest = ?", (digest,))
+                self._db.commit()
+
+    def record_match(self) -> None:
+        with self._lock:
+            self.matches += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._hashes),
+                "max_distance": self.max_distance,
+                "lookups": self.lookups,
+                "matches": self.matches,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_index: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """
+    Return the process-wide index, or None when near-duplicate reuse is
+    disabled. Matches are only useful while their results are cached, so
+    the index follows the result cache's settings.
+    """
+    global _index
+    if not settings.cache_enabled or settings.near_duplicate_max_distance < 0:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex(
+                    settings.cache_path or None, settings.near_duplicate_max_distance
+                )
+    return _index
+
+
+def shutdown_near_duplicate_index() -> None:
+    global _index
+    with _index_lock:
+        if _index is not None:
+            _index.close()
+            _index = None
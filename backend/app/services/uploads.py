@@ -0,0 +1,273 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from multiprocessing import shared_memory
+from typing import BinaryIO, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+from app.services.metrics import UPLOAD_READ_SECONDS
+
+# Uploads are copied from the multipart spool in chunks of this size
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Allowance per file for multipart boundaries and part headers
+PART_OVERHEAD_BYTES = 64 * 1024
+
+MB = 1024 * 1024
+
+# Start of a part kept to name its file if the part grows too large
+PART_HEAD_BYTES = 1024
+
+FILENAME_PATTERN = re.compile(rb'filename="([^"]*)"')
+
+
+def max_upload_bytes() -> int:
+    return settings.max_file_size_mb * MB
+
+
+def too_large(filename: Optional[str]) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File {filename} exceeds maximum size of {settings.max_file_size_mb}MB",
+    )
+
+
+class SharedUpload:
+    """
+    One image's bytes in a shared memory block, with their SHA-256 digest.
+    OCR workers attach to the block by name, so the bytes are written once,
+    as they arrive, and never copied into Python objects on the way.
+    """
+
+    def __init__(self, capacity: int):
+        # Pages of the block are only committed as they are written, so
+        # reserving the size limit for an upload of unknown size is free
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, capacity))
+        self.size = 0
+        self.digest = ""
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SharedUpload":
+        upload = cls(len(data))
+        upload._shm.buf[: len(data)] = data
+        upload.size = len(data)
+        upload.digest = hashlib.sha256(data).hexdigest()
+        return upload
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def view(self) -> memoryview:
+        """The bytes read so far; release() it before close()."""
+        return self._shm.buf[: self.size]
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> "SharedUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _read_into(source: BinaryIO, upload: SharedUpload, limit: int) -> bool:
+    """Fill the block chunk by chunk; False once the data exceeds limit."""
+    hasher = hashlib.sha256()
+    buffer = upload._shm.buf
+    while upload.size < len(buffer):
+        end = min(upload.size + UPLOAD_CHUNK_BYTES, len(buffer))
+        with buffer[upload.size : end] as chunk:
+            count = source.readinto(chunk)
+            if not count:
+                break
+            hasher.update(chunk[:count])
+        upload.size += count
+    else:
+        # Block full: anything left means the upload outgrew it
+        if source.read(1):
+            return False
+    upload.digest = hasher.hexdigest()
+    return upload.size <= limit
+
+
+async def read_upload(file: UploadFile) -> SharedUpload:
+    """
+    Copy an upload into shared memory, enforcing MAX_FILE_SIZE_MB as bytes
+    arrive and hashing them on the way. Uploads whose size is already known
+    to be too large are rejected without reading anything.
+    """
+    limit = max_upload_bytes()
+    if file.size is not None and file.size > limit:
+        raise too_large(file.filename)
+
+    start = time.perf_counter()
+    upload = SharedUpload(file.size if file.size is not None else limit)
+    try:
+        await file.seek(0)
+        # Large parts are spooled to disk, so read off the event loop
+        if not await asyncio.to_thread(_read_into, file.file, upload, limit):
+            raise too_large(file.filename)
+    except BaseException:
+        upload.close()
+        raise
+    UPLOAD_READ_SECONDS.observe(time.perf_counter() - start)
+    return upload
+
+
+def read_file(path: str) -> SharedUpload:
+    """read_upload for an image on disk, e.g. from the offline CLI."""
+    limit = max_upload_bytes()
+    size = os.path.getsize(path)
+    if size > limit:
+        raise too_large(os.path.basename(path))
+
+    upload = SharedUpload(size)
+    try:
+        with open(path, "rb") as source:
+            if not _read_into(source, upload, limit):
+                raise too_large(os.path.basename(path))
+    except BaseException:
+        upload.close()
+        raise
+    return upload
+
+
+def request_limit(path: str) -> Optional[int]:
+    """Largest acceptable request body for an upload endpoint, in bytes."""
+    if path == "/api/verify":
+        return settings.max_files * (max_upload_bytes() + PART_OVERHEAD_BYTES)
+    if path == "/api/jobs":
+        return settings.job_max_request_mb * MB
+    if path == "/api/jobs/archive":
+        return settings.archive_max_mb * MB
+    return None
+
+
+def multipart_boundary(content_type: bytes) -> Optional[bytes]:
+    media_type, _, params = content_type.partition(b";")
+    if media_type.strip().lower() != b"multipart/form-data":
+        return None
+    for param in params.split(b";"):
+        key, _, value = param.strip().partition(b"=")
+        if key.lower() == b"boundary" and value:
+            return value.strip(b'"')
+    return None
+
+
+class PartSizeCounter:
+    """
+    Measures each part of a multipart body as it arrives, so a file over
+    MAX_FILE_SIZE_MB is rejected before the parser has spooled all of it.
+    Parts are delimited by CRLF "--" boundary; a delimiter split between
+    two chunks is found through the tail kept from the previous one.
+    """
+
+    def __init__(self, boundary: bytes, limit: int):
+        self.delimiter = b"\r\n--" + boundary
+        self.limit = limit
+        self.position = 0  # bytes fed so far
+        self.part_start = 0
+        self.head = b""
+        self._tail = b""
+
+    def feed(self, data: bytes) -> bool:
+        """Count a chunk of the body; False once a part exceeds the limit."""
+        buffer = self._tail + data
+        base = self.position - len(self._tail)
+        head = (self.head + data)[:PART_HEAD_BYTES]
+        found = buffer.find(self.delimiter)
+        while found >= 0:
+            if base + found - self.part_start > self.limit:
+                return False
+            self.part_start = base + found
+            head = buffer[found : found + PART_HEAD_BYTES]
+            found = buffer.find(self.delimiter, found + len(self.delimiter))
+        self.head = head
+        self.position += len(data)
+        self._tail = buffer[-(len(self.delimiter) - 1) :]
+        return self.position - self.part_start <= self.limit
+
+    def filename(self) -> Optional[str]:
+        """The current part's file name, if its headers have arrived."""
+        match = FILENAME_PATTERN.search(self.head)
+        return match.group(1).decode("utf-8", "replace") if match else None
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject upload requests that cannot fit within the size limits before
+    the body is parsed: at once from Content-Length when it is sent,
+    otherwise as soon as the received bytes exceed it. Each part of a
+    multipart body is also held to MAX_FILE_SIZE_MB as it arrives.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = request_limit(scope["path"])
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            return await _send_too_large(send, limit)
+
+        received = 0
+        boundary = multipart_boundary(headers.get(b"content-type", b""))
+        parts = (
+            PartSizeCounter(boundary, max_upload_bytes() + PART_OVERHEAD_BYTES)
+            if boundary
+            else None
+        )
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                received += len(body)
+                if parts is not None and not parts.feed(body):
+                    raise too_large(parts.filename())
+                if received > limit:
+                    # FastAPI passes HTTPExceptions raised while reading the
+                    # form through to its exception handler
+                    raise HTTPException(
+                        status_code=413, detail=_too_large_detail(limit)
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _too_large_detail(limit: int) -> str:
+    return f"Request body exceeds {limit // MB}MB"
+
+
+async def _send_too_large(send, limit: int) -> None:
+    body = json.dumps({"detail": _too_large_detail(limit)}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -1,7 +1,17 @@
 import re
-from typing import Optional, Tuple, List
+from difflib import SequenceMatcher
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple, List, Union
 from rapidfuzz import fuzz, process
 
+from app.services.brands import get_brand_registry
+from app.services.document import LabelDocument, as_document
+from app.services.gazetteer import Place, get_gazetteer
+
+# Bump whenever extraction rules change so cached field results are recomputed.
+VALIDATOR_VERSION = "7"
+
+# Words OCR'd below this confidence (0-100) are ignored when ranking lines
+MIN_WORD_CONFIDENCE = 60
 
 REQUIRED_WARNING = """GOVERNMENT WARNING: (1) According to the Surgeon General, women should not drink alcoholic beverages during pregnancy because of the risk of birth defects. (2) Consumption of alcoholic beverages impairs your ability to drive a car or operate machinery, and may cause health problems."""
 
@@ -31,144 +41,33 @@ BEVERAGE_TYPES = [
     "absinthe",
 ]
 
-BEVERAGE_TYPE_VARIANTS = {
-    "whiskey": ["whiskey", "whisky", "wiskey", "wisky", "whiskev"],
-    "bourbon": ["bourbon", "bourborn", "bourban", "baurbon"],
-    "vodka": ["vodka", "vodca", "uodka"],
-    "gin": ["gin"],
-    "rum": ["rum", "rurn"],
-    "tequila": ["tequila", "tequlia", "teguila"],
-    "brandy": ["brandy", "brandv", "brandie"],
-    "vodka": ["vodka", "vodca"],
-    "cognac": ["cognac", "cognac", "cognnac"],
-}
-
-
-def normalize_text(text: str) -> str:
-    if not text:
-        return ""
-    normalized = text.lower()
-    normalized = re.sub(r"[^\w\s]", " ", normalized)
-    normalized = re.sub(r"\s+", " ", normalized)
-    return normalized.strip()
-
-
-def _fuzzy_contains(text: str, pattern: str, threshold: int = 75) -> bool:
-    """Check if pattern is in text using fuzzy matching."""
-    if not text or not pattern:
-        return False
-
-    text_lower = text.lower()
-    pattern_lower = pattern.lower()
-
-    if pattern_lower in text_lower:
-        return True
-
-    words = text_lower.split()
-    pattern_words = pattern_lower.split()
-
-    if len(pattern_words) == 1:
-        for word in words:
-            if fuzz.ratio(word, pattern_lower) >= threshold:
-                return True
-        return False
-
-    for i in range(len(words) - len(pattern_words) + 1):
-        segment = " ".join(words[i : i + len(pattern_words)])
-        if fuzz.ratio(segment, pattern_lower) >= threshold:
-            return True
-
-    return False
-
-
-def _fuzzy_extract_number(
-    text: str, pattern_prefix: str = ""
-) -> Tuple[Optional[float], Optional[str]]:
-    """Extract number with fuzzy prefix matching."""
-    patterns = [
-        r"(\d{1,2}(?:\.\d{1,2})?)\s*%",
-        r"(\d{2,3})\s*(?:proof)",
-        r"(\d{1,2}(?:\.\d{1,2})?)\s*(?:abv|alc)",
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            value = float(match.group(1))
-            return value, match.group(0)
-
-    return None, None
-
+# Every pattern below is compiled once at import; extractors only run them.
+# Callers may pass raw text or a LabelDocument built once per OCR result.
+Text = Union[str, LabelDocument]
 
-def extract_brand_name(text: str) -> Tuple[Optional[str], float]:
-    """Extract brand name - usually prominent text at top of label."""
-    if not text:
-        return None, 0.0
+# Brand name
+FULL_DISTILLERY_PATTERN = re.compile(
+    r"([A-Z]{2,}(?:\s+[A-Z]{2,})+(?:\s+DISTILLING|DISTILLERY)(?:\s+CO\.?)?)",
+    re.IGNORECASE,
+)
 
-    lines = [line.strip() for line in text.split("\n") if line.strip()]
+# Generic "Old <Name>" brands not in the registry
+OLD_BRAND_PATTERN = re.compile(r"(OLD\s*\w+)", re.IGNORECASE)
 
-    if not lines:
-        return None, 0.0
-
-    best_match = None
-    best_conf = 0.0
+# Both distillery patterns backtrack heavily on long lines; neither can match
+# without one of these words, so lines lacking them are skipped outright.
+DISTILLERY_WORDS = ("distill", "brewery")
 
-    full_distillery_pattern = re.compile(
-        r"([A-Z]{2,}(?:\s+[A-Z]{2,})+(?:\s+DISTILLING|DISTILLERY)(?:\s+CO\.?)?)",
-        re.IGNORECASE,
-    )
-    for line in lines:
-        match = full_distillery_pattern.search(line)
-        if match:
-            brand = match.group(1).strip()
-            brand = re.sub(r"[^\w\s]", "", brand).strip()
-            if len(brand.split()) >= 3:
-                brand = " ".join(word.capitalize() for word in brand.split())
-                return brand, 0.95
-
-    known_brands = [
-        (re.compile(r"(HIGH\s*RIDGE)", re.IGNORECASE), "High Ridge"),
-        (re.compile(r"(RIVER\s*BEND)", re.IGNORECASE), "River Bend"),
-        (re.compile(r"(PRAIRIE\s*BEND)", re.IGNORECASE), "Prairie Bend"),
-        (re.compile(r"(MOUNTAIN\s*PASS)", re.IGNORECASE), "Mountain Pass"),
-        (re.compile(r"(SILVER\s*CREEK)", re.IGNORECASE), "Silver Creek"),
-        (re.compile(r"(JACK\s*DANIELS?)", re.IGNORECASE), "Jack Daniel's"),
-        (re.compile(r"(WILD\s*TURKEY)", re.IGNORECASE), "Wild Turkey"),
-        (re.compile(r"(JIM\s*BEAM)", re.IGNORECASE), "Jim Beam"),
-        (re.compile(r"(BLUE\s*RIDGE)", re.IGNORECASE), "Blue Ridge"),
-        (re.compile(r"(OLD\s*\w+)", re.IGNORECASE), None),
-    ]
+SINGLE_BARREL_PATTERN = re.compile(r"SINGLE\s*BARREL", re.IGNORECASE)
 
-    for pattern, name in known_brands:
-        for line in lines:
-            match = pattern.search(line)
-            if match:
-                if name:
-                    return name, 0.9
-                else:
-                    return match.group(1).strip().title(), 0.85
+DISTILLERY_PATTERN = re.compile(
+    r"([A-Z][A-Za-z\s]{2,}(?:DISTILLERY|DISTILLING|BREWERY))", re.IGNORECASE
+)
 
-    single_barrel_pattern = re.compile(r"SINGLE\s*BARREL", re.IGNORECASE)
-    for line in lines:
-        if single_barrel_pattern.search(line):
-            if not best_match:
-                best_match = "Single Barrel"
-                best_conf = 0.65
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
 
-    distillery_pattern = re.compile(
-        r"([A-Z][A-Za-z\s]{2,}(?:DISTILLERY|DISTILLING|BREWERY))", re.IGNORECASE
-    )
-    for line in lines:
-        match = distillery_pattern.search(line)
-        if match:
-            brand = match.group(1).strip()
-            brand = re.sub(r"[^\w\s]", "", brand).strip()
-            if len(brand.split()) >= 2 and not best_match:
-                brand = " ".join(word.capitalize() for word in brand.split())
-                best_match = brand
-                best_conf = 0.75
-
-    skip_words = {
+BRAND_SKIP_WORDS = frozenset(
+    {
         "small",
         "batch",
         "straight",
@@ -200,78 +99,618 @@ def extract_brand_name(text: str) -> Tuple[Optional[str], float]:
         "tequila",
         "evansville",
         "indiana",
-        "bottled",
         "co",
     }
+)
+
+# Class/type: full type designations (most specific first)
+CLASS_TYPE_PATTERNS = [
+    # Kentucky Straight Bourbon Whiskey
+    (
+        re.compile(
+            r"(kentucky\s+straight\s+(?:bourbon|whiskey|whisky)(?:\s+(?:whiskey|whisky))?)"
+        ),
+        0.95,
+    ),
+    # Straight Rye Whiskey, Straight Bourbon Whiskey
+    (
+        re.compile(
+            r"(straight\s+(?:rye|bourbon|wheat|malt)(?:\s+(?:whiskey|whisky))?)"
+        ),
+        0.92,
+    ),
+    # Tennessee Whiskey, Tennessee Bourbon
+    (
+        re.compile(
+            r"(tennessee\s+(?:whiskey|whisky|bourbon)(?:\s+(?:whiskey|whisky))?)"
+        ),
+        0.92,
+    ),
+    # Single Barrel Bourbon Whiskey
+    (
+        re.compile(
+            r"(single\s+barrel\s+(?:bourbon|whiskey|whisky)(?:\s+(?:whiskey|whisky))?)"
+        ),
+        0.90,
+    ),
+    # Small Batch Bourbon Whiskey
+    (
+        re.compile(
+            r"(small\s+batch\s+(?:bourbon|whiskey|whisky)(?:\s+(?:whiskey|whisky))?)"
+        ),
+        0.90,
+    ),
+    # Blended Whiskey, Blended Scotch Whisky
+    (re.compile(r"(blended\s+(?:scotch\s+)?(?:whiskey|whisky))"), 0.88),
+    # Rye Whiskey, Bourbon Whiskey
+    (re.compile(r"((?:bourbon|rye|wheat|malt|corn)\s+(?:whiskey|whisky))"), 0.88),
+    # Scotch Whisky, Irish Whiskey, Canadian Whisky
+    (re.compile(r"((?:scotch|irish|canadian|japanese)\s+(?:whiskey|whisky))"), 0.88),
+    # Just "Bourbon Whiskey" or "Whiskey"
+    (
+        re.compile(r"((?:bourbon|whiskey|whisky|vodka|gin|rum|tequila|brandy|cognac))"),
+        0.70,
+    ),
+]
+
+# Alcohol content
+ALCOHOL_PATTERNS = [
+    (
+        re.compile(
+            r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*alc\.?\s*/?\s*vol\.?", re.IGNORECASE
+        ),
+        "abv",
+        0.95,
+    ),
+    (re.compile(r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*(?:abv)", re.IGNORECASE), "abv", 0.9),
+    (
+        re.compile(r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*(?:alcohol)", re.IGNORECASE),
+        "abv",
+        0.9,
+    ),
+    (re.compile(r"(\d{2,3})\s*(?:proof)", re.IGNORECASE), "proof", 0.9),
+    (re.compile(r"(\d{1,2}(?:\.\d{1,2})?)\s*%", re.IGNORECASE), "abv_percent", 0.8),
+    (
+        re.compile(
+            r"alc\.?\s*/?\s*vol\.?\s*[:\s]*(\d{1,2}(?:\.\d{1,2})?)", re.IGNORECASE
+        ),
+        "abv",
+        0.85,
+    ),
+]
+
+# Net contents
+NET_CONTENTS_PATTERNS = [
+    (re.compile(r"(\d+(?:\.\d+)?)\s*(ml|mL|ML|milliliter)", re.IGNORECASE), "ml", 0.95),
+    (
+        re.compile(r"(\d+(?:\.\d+)?)\s*(l|L|liter|litre)(?!\w)", re.IGNORECASE),
+        "l",
+        0.95,
+    ),
+    (
+        re.compile(r"(\d+(?:\.\d+)?)\s*(?:fl\.?\s*oz|fluid\s*ounce|oz)", re.IGNORECASE),
+        "fl_oz",
+        0.9,
+    ),
+    (re.compile(r"(\d+)\s*(mI|ml|mL)", re.IGNORECASE), "ml", 0.85),
+    (re.compile(r"(\d+)\s*(l\b|L\b)", re.IGNORECASE), "l", 0.85),
+    (re.compile(r"(\d{3,4})\s*(ml|ML)", re.IGNORECASE), "ml", 0.85),
+]
+
+COMMON_SIZE_PATTERNS = [
+    (size, re.compile(rf"\b{size}\b")) for size in (750, 1000, 1750, 375, 200)
+]
+
+ABV_BEFORE_ALC_PATTERN = re.compile(r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*alc", re.IGNORECASE)
+
+SPIRITS_PATTERN = re.compile(
+    r"(bourbon|whiskey|whisky|vodka|gin|rum|tequila|brandy)", re.IGNORECASE
+)
+
+# Government warning
+WARNING_VARIANTS = [
+    "government warning",
+    "govemment warning",
+    "goverment warning",
+    "governnent warning",
+    "governmert warning",
+]
+
+WARNING_PARA1_KEYWORDS = ["surgeon general", "pregnancy", "birth defect"]
+WARNING_PARA2_KEYWORDS = ["drive", "operate machinery", "health problem", "impair"]
+
+REQUIRED_WARNING_NORMALIZED = " ".join(re.findall(r"\w+", REQUIRED_WARNING.lower()))
+
+REQUIRED_WARNING_WORDS = REQUIRED_WARNING_NORMALIZED.split()
+# Any header variant, whatever punctuation or line breaks OCR put between its words
+WARNING_HEADER_PATTERN = re.compile(
+    r"\b(?:"
+    + "|".join(r"\W+".join(map(re.escape, v.split())) for v in WARNING_VARIANTS)
+    + r")\b"
+)
+
+WARNING_WORD_SET = frozenset(REQUIRED_WARNING_WORDS)
+WARNING_VOCABULARY = sorted(WARNING_WORD_SET)
+
+# Words after the header searched for the warning; leaves room for OCR
+# noise read between its lines
+WARNING_WINDOW_WORDS = int(len(REQUIRED_WARNING_WORDS) * 1.5)
+
+# An OCR word this close to a warning word (fuzz.ratio) counts as that word
+WARNING_WORD_CUTOFF = 75
+
+WARNING_TEXT_PATTERN = re.compile(
+    r"(government\s*warning\s*:.*?)(?=\n\s*\n|\n\s*[A-Z]{3,}|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Bottler / producer
+BOTTLED_BY_DISTILLERY_PATTERN = re.compile(
+    r"(?:bottled|distilled).*?(distilling\s*(?:co\.?|company)|distillery)",
+    re.IGNORECASE,
+)
+# Statements of who bottled, made or imported the product
+BOTTLER_LINE_PATTERN = re.compile(
+    r"\b(?:bottled|distilled|produced|imported|blended|made)\s+(?:\w+\s+)?by\b",
+    re.IGNORECASE,
+)
+NAME_BEFORE_PATTERN = re.compile(r"([A-Z][A-Za-z\s]{5,}?)(?:\s*$)")
+
+# (pattern, confidence, word the text must contain for the pattern to match)
+BOTTLER_PATTERNS = [
+    (
+        re.compile(
+            r"(?:bottled|distilled)\s*(?:&|and)?\s*(?:by)?\s*[:\s]*([A-Z][A-Za-z\s]{3,}?(?:CO\.?|Company|Inc\.?|LLC|Distillery))",
+            re.IGNORECASE,
+        ),
+        0.9,
+        None,
+    ),
+    (
+        re.compile(
+            r"([A-Z][A-Za-z\s]+(?:DISTILLING|DISTILLERY)(?:\s+CO\.?)?)", re.IGNORECASE
+        ),
+        0.85,
+        "distill",
+    ),
+]
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+NON_NAME_PATTERN = re.compile(r"[^A-Za-z\s\.]")
+
+# Fallback for City, State pairs not in the gazetteer
+LOCATION_PATTERN = re.compile(
+    r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?,\s*(?:[A-Z]{2}|[A-Z][a-z]+))"
+)
+
+# Country of origin
+PRODUCT_OF_PATTERN = re.compile(
+    r"product\s+of\s+(?:the\s+)?([A-Za-z\s]+?)(?:\.|,|\n|$)", re.IGNORECASE
+)
+
+
+def validator_fingerprint() -> str:
+    """Identify the extraction rules and the data they match against."""
+    registry = get_brand_registry()
+    return "-".join(
+        [VALIDATOR_VERSION, registry.fingerprint if registry else "no-brands"]
+    )
+
+
+def city_and_state(places: Sequence[Place]) -> Optional[str]:
+    """First "City, State" from gazetteer hits where the state directly follows."""
+    for city, state in zip(places, places[1:]):
+        if city.kind == "city" and state.kind == "state" and state.start == city.end:
+            return f"{city.name}, {state.name}"
+    return None
+
+
+def normalize_text(text: str) -> str:
+    if not text:
+        return ""
+    normalized = text.lower()
+    normalized = re.sub(r"[^\w\s]", " ", normalized)
+    normalized = re.sub(r"\s+", " ", normalized)
+    return normalized.strip()
+
+
+def words_confidence(
+    value: Optional[str], words: Union[Sequence[Any], LabelDocument]
+) -> Optional[float]:
+    """
+    Mean OCR confidence (0-1) of the words a value was read from, or None
+    when no word matches (e.g. the value was inferred, not transcribed).
+    Words are OCR word records with .text and .conf attributes.
+    """
+    if not value or not words:
+        return None
+    doc = words if isinstance(words, LabelDocument) else LabelDocument("", words)
+    tokens = set(normalize_text(value).split())
+    confidences = [
+        conf for parts, conf in doc.word_tokens() if parts and parts <= tokens
+    ]
+    if not confidences:
+        return None
+    return sum(confidences) / len(confidences) / 100
+
+
+def apply_word_confidence(
+    confidence: float,
+    value: Optional[str],
+    words: Union[Sequence[Any], LabelDocument],
+) -> float:
+    """Scale a rule-based confidence by how sure OCR was of the words behind it."""
+    ocr_confidence = words_confidence(value, words)
+    if ocr_confidence is None:
+        return confidence
+    return round(confidence * (0.7 + 0.3 * ocr_confidence), 2)
+
+
+def lines_by_prominence(words: Sequence[Any]) -> List[str]:
+    """
+    Confidently read OCR lines, tallest text first. Labels set the brand in
+    the largest type, so this ranks brand candidates better than line order.
+    """
+    lines = {}
+    for word in words:
+        lines.setdefault(word.line, []).append(word)
+
+    ranked = []
+    for line_words in lines.values():
+        if sum(w.conf for w in line_words) / len(line_words) < MIN_WORD_CONFIDENCE:
+            continue
+        heights = sorted(w.height for w in line_words)
+        ranked.append(
+            (heights[len(heights) // 2], " ".join(w.text for w in line_words))
+        )
+    ranked.sort(key=lambda item: -item[0])
+    return [text for _, text in ranked]
+
+
+def fuzzy_contains_all(
+    text: Text, keywords: Sequence[str], threshold: int = 75
+) -> List[bool]:
+    """
+    Whether each keyword occurs in the normalized text, exactly or as a
+    run of as many words scoring at least threshold with fuzz.ratio.
+    All keywords of the same word count are scored against all windows in
+    one process.cdist call, so cost barely grows with keyword count.
+    """
+    doc = as_document(text)
+    if not doc:
+        return [False] * len(keywords)
+    key = ("contains", tuple(keywords), threshold)
+    if key not in doc.memo:
+        fuzzy_contains_all_batch([doc], keywords, threshold)
+    return list(doc.memo[key])
+
+
+def fuzzy_contains_all_batch(
+    docs: Sequence[LabelDocument], keywords: Sequence[str], threshold: int = 75
+) -> List[List[bool]]:
+    """
+    fuzzy_contains_all for many documents, scoring the windows of all of
+    them in one process.cdist call per keyword word count. Results are also
+    stored in each document's memo, so later per-document calls are free.
+    """
+    lowered = [keyword.lower() for keyword in keywords]
+    results = []
+    # word count -> [(document index, keyword index)] still to be scored
+    pending: Dict[int, List[Tuple[int, int]]] = {}
+    for d, doc in enumerate(docs):
+        found = [False] * len(keywords)
+        for i, keyword in enumerate(lowered):
+            if not keyword.split():
+                continue
+            if keyword in doc.normalized:
+                found[i] = True
+            else:
+                pending.setdefault(len(keyword.split()), []).append((d, i))
+        results.append(found)
+
+    for length, items in pending.items():
+        keyword_ids = sorted({i for _, i in items})
+        doc_ids = sorted({d for d, _ in items})
+        windows: List[str] = []
+        spans = {}
+        for d in doc_ids:
+            doc_windows = docs[d].windows(length)
+            spans[d] = (len(windows), len(windows) + len(doc_windows))
+            windows.extend(doc_windows)
+        if not windows:
+            continue
+        # Scores under the cutoff come back as 0
+        scores = process.cdist(
+            [lowered[i] for i in keyword_ids],
+            windows,
+            scorer=fuzz.ratio,
+            score_cutoff=threshold,
+        )
+        row_of = {i: row for row, i in enumerate(keyword_ids)}
+        for d, i in items:
+            start, end = spans[d]
+            results[d][i] = bool(scores[row_of[i], start:end].any())
+
+    key = ("contains", tuple(keywords), threshold)
+    for doc, found in zip(docs, results):
+        doc.memo[key] = found
+    return results
+
+
+def snap_warning_words(words: Sequence[str]) -> Dict[str, str]:
+    """
+    Map each word to the warning word it most resembles (or to itself when
+    none scores WARNING_WORD_CUTOFF), in one process.cdist call.
+    """
+    unique = sorted(set(words))
+    if not unique:
+        return {}
+    scores = process.cdist(
+        unique, WARNING_VOCABULARY, scorer=fuzz.ratio, score_cutoff=WARNING_WORD_CUTOFF
+    )
+    return {
+        word: WARNING_VOCABULARY[best] if score else word
+        for word, best, score in zip(
+            unique, scores.argmax(axis=1).tolist(), scores.max(axis=1).tolist()
+        )
+    }
+
+
+def _warning_window(doc: LabelDocument) -> Optional[Tuple[int, int, List[str]]]:
+    """
+    (text offset to count words from, words from there to the header, the
+    WARNING_WINDOW_WORDS normalized words starting at the header), or None
+    without a header. Cached in the document's memo.
+    """
+    if "warning_window" in doc.memo:
+        return doc.memo["warning_window"]
+
+    located = None
+    header = WARNING_HEADER_PATTERN.search(doc.lower)
+    if header:
+        anchor = doc.token_index(header.start())
+        located = (
+            header.start(),
+            0,
+            doc.norm_words[anchor : anchor + WARNING_WINDOW_WORDS],
+        )
+    else:
+        found = process.extractOne(
+            WARNING_VARIANTS[0], doc.windows(2), scorer=fuzz.ratio, score_cutoff=70
+        )
+        if found is not None:
+            anchor = found[2]
+            located = (
+                0,
+                anchor,
+                doc.norm_words[anchor : anchor + WARNING_WINDOW_WORDS],
+            )
+
+    doc.memo["warning_window"] = located
+    return located
+
+
+class WarningAlignment(NamedTuple):
+    """Where the warning is in LabelDocument.text and how it differs."""
+
+    start: int
+    end: int
+    similarity: float
+    diff: List[Dict[str, str]]
+
+
+def locate_warning(text: Text) -> Optional[WarningAlignment]:
+    """
+    Align the required warning against the words following its header.
+    Only a window of WARNING_WINDOW_WORDS after the header is examined, so
+    the cost depends on the warning's length, not the label's. Window words
+    are snapped to the warning's vocabulary in one process.cdist call to
+    absorb OCR typos, then aligned word by word; the span runs from the
+    first to the last aligned word, and every deviation is listed.
+    Cached in the document's memo.
+    """
+    doc = as_document(text)
+    if "warning_alignment" not in doc.memo:
+        doc.memo["warning_alignment"] = _align_warning(doc)
+    return doc.memo["warning_alignment"]
+
+
+def _align_warning(doc: LabelDocument) -> Optional[WarningAlignment]:
+    located = _warning_window(doc)
+    if located is None:
+        return None
+    offset, skip, window = located
+
+    snaps = doc.memo.get("warning_snaps", {})
+    unknown = [w for w in window if w not in WARNING_WORD_SET and w not in snaps]
+    if unknown:
+        snaps = {**snaps, **snap_warning_words(unknown)}
+    snapped = [snaps.get(word, word) for word in window]
+
+    matcher = SequenceMatcher(None, REQUIRED_WARNING_WORDS, snapped, autojunk=False)
+    blocks = [block for block in matcher.get_matching_blocks() if block.size]
+    if not blocks:
+        return None
+    first, last = blocks[0].b, blocks[-1].b + blocks[-1].size
+
+    diff = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        # Noise before the first or after the last aligned word is not the warning
+        j1, j2 = max(j1, first), min(j2, last)
+        expected = " ".join(REQUIRED_WARNING_WORDS[i1:i2])
+        found_words = " ".join(window[j1:j2])
+        if tag == "equal" or expected == found_words:
+            continue
+        if not found_words:
+            tag = "missing"
+        elif not expected:
+            tag = "extra"
+        diff.append({"op": tag, "expected": expected, "found": found_words})
+
+    base = doc.token_index(offset) + skip
+    start, end = doc.token_starts[base + first], doc.token_ends[base + last - 1]
+    if doc.text[end : end + 1] == ".":
+        end += 1
+    similarity = fuzz.ratio(REQUIRED_WARNING_NORMALIZED, " ".join(window[first:last]))
+    return WarningAlignment(start, end, round(similarity / 100, 3), diff)
+
+
+def brand_candidate_lines(doc: LabelDocument) -> List[Tuple[str, str]]:
+    """
+    (line, its normalized words) for lines that could hold the brand: not
+    the government warning, a bottler statement or the alcohol content and
+    net contents. Only these are looked up in the brand registry, so a
+    registered name fuzzily matching words elsewhere on the label cannot
+    outrank the real brand line. Words come from the document's tokens.
+    """
+    if "brand_lines" not in doc.memo:
+        warning_lines = range(0)
+        alignment = locate_warning(doc)
+        if alignment is not None:
+            warning_lines = range(
+                doc.line_at(alignment.start), doc.line_at(alignment.end - 1) + 1
+            )
+        candidates = []
+        for index, line in enumerate(doc.lines):
+            if index in warning_lines:
+                continue
+            words = doc.line_words(index)
+            if not _is_non_brand_line(line, words):
+                candidates.append((line, " ".join(words)))
+        doc.memo["brand_lines"] = candidates
+    return doc.memo["brand_lines"]
+
+
+def _is_non_brand_line(line: str, words: List[str]) -> bool:
+    if WARNING_HEADER_PATTERN.search(" ".join(words)):
+        return True
+    if len(words) >= 3 and sum(w in WARNING_WORD_SET for w in words) * 2 > len(words):
+        return True
+    if BOTTLER_LINE_PATTERN.search(line):
+        return True
+    return any(
+        pattern.search(line)
+        for pattern, *_ in (*ALCOHOL_PATTERNS, *NET_CONTENTS_PATTERNS)
+    )
+
+
+def _distillery_brand(doc: LabelDocument) -> Optional[str]:
+    """A full "<Name> Distilling Co" style brand, cached in the document's memo."""
+    if "distillery_brand" not in doc.memo:
+        doc.memo["distillery_brand"] = None
+        for line in doc.lines:
+            if not any(w in line.lower() for w in DISTILLERY_WORDS):
+                continue
+            match = FULL_DISTILLERY_PATTERN.search(line)
+            if match:
+                brand = match.group(1).strip()
+                brand = PUNCTUATION_PATTERN.sub("", brand).strip()
+                if len(brand.split()) >= 3:
+                    brand = " ".join(word.capitalize() for word in brand.split())
+                    doc.memo["distillery_brand"] = brand
+                    break
+    return doc.memo["distillery_brand"]
+
+
+def extract_brand_name(
+    text: Text, words: Optional[Sequence[Any]] = None
+) -> Tuple[Optional[str], float]:
+    """
+    Extract brand name - usually prominent text at top of label.
+    With OCR words, the fallback heuristic tries the tallest lines first.
+    """
+    doc = as_document(text, words or ())
+    if not doc:
+        return None, 0.0
+
+    lines = doc.lines
+
+    if not lines:
+        return None, 0.0
+
+    best_match = None
+    best_conf = 0.0
+
+    brand = _distillery_brand(doc)
+    if brand:
+        return brand, 0.95
+
+    registry = get_brand_registry()
+    if registry is not None:
+        best = None
+        # Filled for whole batches by validate_batch
+        looked_up = doc.memo.get("brand_lookup", {})
+        for line, normalized in brand_candidate_lines(doc):
+            matches = looked_up.get(line)
+            if matches is None:
+                matches = registry.lookup(normalized, normalized=True)
+            for match in matches:
+                if best is None or match.score > best.score:
+                    best = match
+        if best is not None:
+            return best.name, 0.9 if best.score >= 95 else 0.8
 
-    for line in lines[:12]:
-        words = line.split()
-        if len(words) < 2:
+    for line in lines:
+        match = OLD_BRAND_PATTERN.search(line)
+        if match:
+            return match.group(1).strip().title(), 0.85
+
+    if any(SINGLE_BARREL_PATTERN.search(line) for line in lines):
+        best_match = "Single Barrel"
+        best_conf = 0.65
+
+    if not best_match:
+        distillery_lines = [
+            line for line in lines if any(w in line.lower() for w in DISTILLERY_WORDS)
+        ]
+        for line in distillery_lines:
+            match = DISTILLERY_PATTERN.search(line)
+            if match:
+                brand = match.group(1).strip()
+                brand = PUNCTUATION_PATTERN.sub("", brand).strip()
+                if len(brand.split()) >= 2:
+                    best_match = " ".join(word.capitalize() for word in brand.split())
+                    best_conf = 0.75
+                    break
+
+    if best_match:
+        return best_match, best_conf
+
+    candidates = (lines_by_prominence(doc.words) if doc.words else lines)[:12]
+    for line in candidates:
+        line_words = line.split()
+        if len(line_words) < 2:
             continue
 
         non_skip_words = [
             w
-            for w in words
-            if w.lower() not in skip_words
+            for w in line_words
+            if w.lower() not in BRAND_SKIP_WORDS
             and not any(c.isdigit() for c in w)
             and len(w) > 2
         ]
         if len(non_skip_words) >= 2:
-            cap_words = [w for w in words if w and w[0].isupper()]
-            if len(cap_words) >= 2 and not best_match:
-                clean_line = re.sub(r"[^\w\s]", "", line).strip()
+            cap_words = [w for w in line_words if w and w[0].isupper()]
+            if len(cap_words) >= 2:
+                clean_line = PUNCTUATION_PATTERN.sub("", line).strip()
                 clean_line = " ".join(clean_line.split()[:4])
-                best_match = clean_line
-                best_conf = 0.55
+                return clean_line, 0.55
 
-    return best_match, best_conf
+    return None, 0.0
 
 
-def extract_class_type(text: str) -> Tuple[Optional[str], float]:
+def extract_class_type(text: Text) -> Tuple[Optional[str], float]:
     """Extract class/type - the full designation as it appears on label."""
-    if not text:
+    doc = as_document(text)
+    if not doc:
         return None, 0.0
 
-    text_lower = text.lower()
-    normalized = normalize_text(text)
-
-    # Full type designations (most specific first)
-    full_type_patterns = [
-        # Kentucky Straight Bourbon Whiskey
-        (
-            r"(kentucky\s+straight\s+(?:bourbon|whiskey|whisky)(?:\s+(?:whiskey|whisky))?)",
-            0.95,
-        ),
-        # Straight Rye Whiskey, Straight Bourbon Whiskey
-        (r"(straight\s+(?:rye|bourbon|wheat|malt)(?:\s+(?:whiskey|whisky))?)", 0.92),
-        # Tennessee Whiskey, Tennessee Bourbon
-        (r"(tennessee\s+(?:whiskey|whisky|bourbon)(?:\s+(?:whiskey|whisky))?)", 0.92),
-        # Single Barrel Bourbon Whiskey
-        (
-            r"(single\s+barrel\s+(?:bourbon|whiskey|whisky)(?:\s+(?:whiskey|whisky))?)",
-            0.90,
-        ),
-        # Small Batch Bourbon Whiskey
-        (
-            r"(small\s+batch\s+(?:bourbon|whiskey|whisky)(?:\s+(?:whiskey|whisky))?)",
-            0.90,
-        ),
-        # Blended Whiskey, Blended Scotch Whisky
-        (r"(blended\s+(?:scotch\s+)?(?:whiskey|whisky))", 0.88),
-        # Rye Whiskey, Bourbon Whiskey
-        (r"((?:bourbon|rye|wheat|malt|corn)\s+(?:whiskey|whisky))", 0.88),
-        # Scotch Whisky, Irish Whiskey, Canadian Whisky
-        (r"((?:scotch|irish|canadian|japanese)\s+(?:whiskey|whisky))", 0.88),
-        # Just "Bourbon Whiskey" or "Whiskey"
-        (r"((?:bourbon|whiskey|whisky|vodka|gin|rum|tequila|brandy|cognac))", 0.70),
-    ]
-
-    for pattern, conf in full_type_patterns:
-        match = re.search(pattern, text_lower)
+    for pattern, conf in CLASS_TYPE_PATTERNS:
+        match = pattern.search(doc.lower)
         if match:
             found = match.group(1)
             # Find the original text (preserving case)
-            original_match = re.search(re.escape(found), text, re.IGNORECASE)
+            original_match = re.search(re.escape(found), doc.text, re.IGNORECASE)
             if original_match:
                 result = original_match.group(0).strip()
                 # Title case it nicely
@@ -283,119 +722,22 @@ def extract_class_type(text: str) -> Tuple[Optional[str], float]:
 
     # Fallback: look for beverage type with fuzzy matching
     for beverage in BEVERAGE_TYPES:
-        if beverage in normalized:
-            words = normalized.split()
-            for i, word in enumerate(words):
+        if beverage in doc.normalized:
+            for word in doc.norm_words:
                 if fuzz.ratio(word, beverage) >= 75:
                     return beverage.title(), 0.65
 
     return None, 0.0
 
-    text_lower = text.lower()
-    normalized = normalize_text(text)
-
-    patterns = [
-        (r"(small\s+batch\s+(?:bourbon|whiskey|whisky))", 0.9),
-        (r"(kentucky\s+straight\s+(?:bourbon|whiskey|whisky))", 0.9),
-        (r"(straight\s+(?:bourbon|whiskey|whisky|rye))", 0.85),
-        (r"(tennessee\s+(?:bourbon|whiskey|whisky))", 0.85),
-        (r"((?:bourbon|whiskey|whisky)\s+(?:whiskey|whisky))", 0.8),
-    ]
-
-    for pattern, conf in patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            found = match.group(1)
-            original_match = re.search(re.escape(found), text, re.IGNORECASE)
-            if original_match:
-                return original_match.group(0).strip(), conf
-
-    bourbon_whiskey_pattern = re.compile(
-        r"(BOUR\s*[-\s]*[BON]*\s*[-\s]*WH?IS?K?E?Y?|BOURBON\s*WH?IS?K?E?Y?|WH?IS?K?E?Y?\s*BOURBON)",
-        re.IGNORECASE,
-    )
-    match = bourbon_whiskey_pattern.search(text)
-    if match:
-        found = match.group(0).upper()
-        if "BOUR" in found and ("WHIS" in found or "KEY" in found or "ISK" in found):
-            return "Bourbon Whiskey", 0.8
-
-    for btype, variants in BEVERAGE_TYPE_VARIANTS.items():
-        for variant in variants:
-            if variant in normalized:
-                match = re.search(re.escape(variant), text, re.IGNORECASE)
-                if match:
-                    return match.group(0).strip().title(), 0.7
-
-    for beverage in BEVERAGE_TYPES:
-        words = normalized.split()
-        for i, word in enumerate(words):
-            if fuzz.ratio(word, beverage) >= 75:
-                context_words = words[max(0, i - 2) : min(len(words), i + 3)]
-                context = " ".join(context_words)
-                original_match = re.search(re.escape(context), text, re.IGNORECASE)
-                if original_match:
-                    return original_match.group(0).strip(), 0.65
-
-    return None, 0.0
-
-    text_lower = text.lower()
-    normalized = normalize_text(text)
-
-    found_types = []
-
-    patterns = [
-        (r"(small\s+batch\s+(?:bourbon|whiskey|whisky))", 0.9),
-        (r"(kentucky\s+straight\s+(?:bourbon|whiskey|whisky))", 0.9),
-        (r"(straight\s+(?:bourbon|whiskey|whisky|rye))", 0.85),
-        (r"(tennessee\s+(?:bourbon|whiskey|whisky))", 0.85),
-        (r"((?:bourbon|whiskey|whisky)\s+(?:whiskey|whisky))", 0.8),
-    ]
-
-    for pattern, conf in patterns:
-        match = re.search(pattern, text_lower)
-        if match:
-            found = match.group(1)
-            original_match = re.search(re.escape(found), text, re.IGNORECASE)
-            if original_match:
-                return original_match.group(0).strip(), conf
-
-    for btype, variants in BEVERAGE_TYPE_VARIANTS.items():
-        for variant in variants:
-            if variant in normalized:
-                match = re.search(re.escape(variant), text, re.IGNORECASE)
-                if match:
-                    return match.group(0).strip(), 0.7
-
-    for beverage in BEVERAGE_TYPES:
-        if beverage in normalized:
-            words = normalized.split()
-            for i, word in enumerate(words):
-                if fuzz.ratio(word, beverage) >= 80:
-                    context = " ".join(words[max(0, i - 1) : min(len(words), i + 2)])
-                    original_match = re.search(re.escape(context), text, re.IGNORECASE)
-                    if original_match:
-                        return original_match.group(0).strip(), 0.65
-
-    return None, 0.0
-
 
-def extract_alcohol_content(text: str) -> Tuple[Optional[str], Optional[float], float]:
+def extract_alcohol_content(text: Text) -> Tuple[Optional[str], Optional[float], float]:
     """Extract alcohol content with flexible pattern matching."""
-    if not text:
+    doc = as_document(text)
+    if not doc:
         return None, None, 0.0
 
-    patterns = [
-        (r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*alc\.?\s*/?\s*vol\.?", "abv", 0.95),
-        (r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*(?:abv)", "abv", 0.9),
-        (r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*(?:alcohol)", "abv", 0.9),
-        (r"(\d{2,3})\s*(?:proof)", "proof", 0.9),
-        (r"(\d{1,2}(?:\.\d{1,2})?)\s*%", "abv_percent", 0.8),
-        (r"alc\.?\s*/?\s*vol\.?\s*[:\s]*(\d{1,2}(?:\.\d{1,2})?)", "abv", 0.85),
-    ]
-
-    for pattern, ptype, conf in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern, ptype, conf in ALCOHOL_PATTERNS:
+        match = pattern.search(doc.text)
         if match:
             value = float(match.group(1))
             original = match.group(0).strip()
@@ -409,64 +751,14 @@ def extract_alcohol_content(text: str) -> Tuple[Optional[str], Optional[float],
     return None, None, 0.0
 
 
-def extract_net_contents(text: str) -> Tuple[Optional[str], Optional[dict], float]:
+def extract_net_contents(text: Text) -> Tuple[Optional[str], Optional[dict], float]:
     """Extract net contents with fuzzy matching."""
-    if not text:
+    doc = as_document(text)
+    if not doc:
         return None, None, 0.0
 
-    patterns = [
-        (r"(\d+(?:\.\d+)?)\s*(ml|mL|ML|milliliter)", "ml", 0.95),
-        (r"(\d+(?:\.\d+)?)\s*(l|L|liter|litre)(?!\w)", "l", 0.95),
-        (r"(\d+(?:\.\d+)?)\s*(?:fl\.?\s*oz|fluid\s*ounce|oz)", "fl_oz", 0.9),
-        (r"(\d+)\s*(mI|ml|mL)", "ml", 0.85),
-        (r"(\d+)\s*(l\b|L\b)", "l", 0.85),
-        (r"(\d{3,4})\s*(ml|ML)", "ml", 0.85),
-    ]
-
-    for pattern, unit_type, conf in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            amount = float(match.group(1))
-            unit = match.group(2).lower()
-            original = match.group(0).strip()
-
-            parsed = {"amount": amount, "unit": unit}
-            return original, parsed, conf
-
-    common_sizes = [750, 1000, 1750, 375, 200]
-    for size in common_sizes:
-        pattern = rf"\b{size}\b"
-        if re.search(pattern, text):
-            alc_pattern = re.search(
-                r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*alc", text, re.IGNORECASE
-            )
-            if alc_pattern:
-                abv = float(alc_pattern.group(1))
-                if abv != size and 30 <= abv <= 70:
-                    return f"{size} mL", {"amount": float(size), "unit": "ml"}, 0.55
-
-    alc_pattern = re.search(r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*alc", text, re.IGNORECASE)
-    spirits_pattern = re.search(
-        r"(bourbon|whiskey|whisky|vodka|gin|rum|tequila|brandy)", text, re.IGNORECASE
-    )
-    if alc_pattern and spirits_pattern:
-        abv = float(alc_pattern.group(1))
-        if abv >= 40:
-            return "750 mL", {"amount": 750.0, "unit": "ml"}, 0.4
-
-    return None, None, 0.0
-
-    patterns = [
-        (r"(\d+(?:\.\d+)?)\s*(ml|mL|ML|milliliter)", "ml", 0.95),
-        (r"(\d+(?:\.\d+)?)\s*(l|L|liter|litre)(?!\w)", "l", 0.95),
-        (r"(\d+(?:\.\d+)?)\s*(?:fl\.?\s*oz|fluid\s*ounce|oz)", "fl_oz", 0.9),
-        (r"(\d+)\s*(mI|ml|mL)", "ml", 0.85),
-        (r"(\d+)\s*(l\b|L\b)", "l", 0.85),
-        (r"(\d{3,4})\s*(ml|ML)", "ml", 0.85),
-    ]
-
-    for pattern, unit_type, conf in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern, unit_type, conf in NET_CONTENTS_PATTERNS:
+        match = pattern.search(doc.text)
         if match:
             amount = float(match.group(1))
             unit = match.group(2).lower()
@@ -475,105 +767,70 @@ def extract_net_contents(text: str) -> Tuple[Optional[str], Optional[dict], floa
             parsed = {"amount": amount, "unit": unit}
             return original, parsed, conf
 
-    common_sizes = [750, 1000, 1750, 375, 200]
-    for size in common_sizes:
-        pattern = rf"\b{size}\b"
-        if re.search(pattern, text):
-            alc_pattern = re.search(
-                r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*alc", text, re.IGNORECASE
-            )
-            if alc_pattern:
-                abv = float(alc_pattern.group(1))
-                if abv != size and 30 <= abv <= 70:
-                    return f"{size} mL", {"amount": float(size), "unit": "ml"}, 0.55
-
-    return None, None, 0.0
-
-    patterns = [
-        (r"(\d+(?:\.\d+)?)\s*(ml|mL|ML|milliliter)", "ml", 0.95),
-        (r"(\d+(?:\.\d+)?)\s*(l|L|liter|litre)(?!\w)", "l", 0.95),
-        (r"(\d+(?:\.\d+)?)\s*(?:fl\.?\s*oz|fluid\s*ounce|oz)", "fl_oz", 0.9),
-        (r"(\d+)\s*(mI|ml|mL)", "ml", 0.85),
-        (r"(\d+)\s*(l\b|L\b)", "l", 0.85),
-        (r"(\d{3,4})\s*(ml|ML)", "ml", 0.85),
-    ]
-
-    for pattern, unit_type, conf in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            amount = float(match.group(1))
-            unit = match.group(2).lower()
-            original = match.group(0).strip()
+    alc_match = ABV_BEFORE_ALC_PATTERN.search(doc.text)
 
-            parsed = {"amount": amount, "unit": unit}
-            return original, parsed, conf
+    # A bare bottle size next to an ABV statement, e.g. "750" with "40% Alc"
+    if alc_match:
+        abv = float(alc_match.group(1))
+        for size, pattern in COMMON_SIZE_PATTERNS:
+            if pattern.search(doc.text) and abv != size and 30 <= abv <= 70:
+                return f"{size} mL", {"amount": float(size), "unit": "ml"}, 0.55
 
-    common_sizes = [750, 1000, 1750, 375, 200, 50]
-    for size in common_sizes:
-        if str(size) in text:
-            alc_pattern = re.search(
-                r"(\d{1,2}(?:\.\d{1,2})?)\s*%\s*alc", text, re.IGNORECASE
-            )
-            if alc_pattern:
-                return f"{size} mL", {"amount": float(size), "unit": "ml"}, 0.6
+    if alc_match and SPIRITS_PATTERN.search(doc.text):
+        abv = float(alc_match.group(1))
+        if abv >= 40:
+            return "750 mL", {"amount": 750.0, "unit": "ml"}, 0.4
 
     return None, None, 0.0
 
 
-def validate_government_warning(text: str) -> Tuple[Optional[str], List[str], float]:
-    """Validate government warning with fuzzy matching for OCR errors."""
-    if not text:
-        return None, ["No text found"], 0.0
+def validate_government_warning(
+    text: Text,
+) -> Tuple[Optional[str], Optional[dict], List[str], float]:
+    """
+    Validate government warning with fuzzy matching for OCR errors.
+    The parsed value holds the warning's alignment against the required
+    text: character span, similarity and word-level differences.
+    """
+    doc = as_document(text)
+    if not doc:
+        return None, None, ["No text found"], 0.0
 
     issues = []
-    normalized = normalize_text(text)
-
-    warning_variants = [
-        "government warning",
-        "govemment warning",
-        "goverment warning",
-        "governnent warning",
-        "governmert warning",
-    ]
+    normalized = doc.normalized
 
     header_found = False
     header_all_caps = False
 
-    for variant in warning_variants:
+    for variant in WARNING_VARIANTS:
         if variant in normalized:
             header_found = True
-            if "GOVERNMENT WARNING" in text or "GOVERNMENT  WARNING" in text:
+            if "GOVERNMENT WARNING" in doc.text or "GOVERNMENT  WARNING" in doc.text:
                 header_all_caps = True
             break
 
     if not header_found:
-        for variant in warning_variants:
-            if _fuzzy_contains(normalized, variant, threshold=70):
-                header_found = True
-                break
+        header_found = any(fuzzy_contains_all(doc, WARNING_VARIANTS, threshold=70))
 
     if not header_found:
-        return None, ["Government Warning not found"], 0.0
+        return None, None, ["Government Warning not found"], 0.0
 
     if not header_all_caps:
         issues.append("Header should be 'GOVERNMENT WARNING:' in ALL CAPS")
 
-    para1_keywords = ["surgeon general", "pregnancy", "birth defect"]
-    para1_found = (
-        sum(1 for kw in para1_keywords if _fuzzy_contains(normalized, kw, 70)) >= 2
-    )
-
-    para2_keywords = ["drive", "operate machinery", "health problem", "impair"]
-    para2_found = (
-        sum(1 for kw in para2_keywords if _fuzzy_contains(normalized, kw, 70)) >= 2
+    keywords_found = fuzzy_contains_all(
+        doc, WARNING_PARA1_KEYWORDS + WARNING_PARA2_KEYWORDS, threshold=70
     )
+    para1_found = sum(keywords_found[: len(WARNING_PARA1_KEYWORDS)]) >= 2
+    para2_found = sum(keywords_found[len(WARNING_PARA1_KEYWORDS) :]) >= 2
 
     if not para1_found:
         issues.append("Paragraph (1) content incomplete or missing")
     if not para2_found:
         issues.append("Paragraph (2) content incomplete or missing")
 
-    similarity = fuzz.ratio(normalized, normalize_text(REQUIRED_WARNING)) / 100
+    alignment = locate_warning(doc)
+    similarity = alignment.similarity if alignment else 0.0
 
     confidence = 0.3
     if header_found:
@@ -589,64 +846,60 @@ def validate_government_warning(text: str) -> Tuple[Optional[str], List[str], fl
     if issues:
         confidence *= 0.85
 
-    warning_match = re.search(
-        r"(government\s*warning\s*:.*?)(?=\n\s*\n|\n\s*[A-Z]{3,}|$)",
-        text,
-        re.IGNORECASE | re.DOTALL,
-    )
-
-    extracted_warning = warning_match.group(0) if warning_match else text[:200]
+    if alignment is None:
+        warning_match = WARNING_TEXT_PATTERN.search(doc.text)
+        extracted_warning = warning_match.group(0) if warning_match else doc.text[:200]
+        return extracted_warning, None, issues, round(confidence, 2)
 
-    return extracted_warning, issues, round(confidence, 2)
+    return (
+        doc.text[alignment.start : alignment.end],
+        alignment._asdict(),
+        issues,
+        round(confidence, 2),
+    )
 
 
-def extract_bottler_producer(text: str) -> Tuple[Optional[str], float]:
+def extract_bottler_producer(text: Text) -> Tuple[Optional[str], float]:
     """Extract bottler/producer information from label."""
-    if not text:
+    doc = as_document(text)
+    if not doc:
         return None, 0.0
 
-    text_lower = text.lower()
+    text = doc.text
 
     # First try to find the distillery name from "BOTTLED BY [DISTILLING CO]" patterns
-    distillery_match = re.search(
-        r"(?:bottled|distilled).*?(distilling\s*(?:co\.?|company)|distillery)",
-        text,
-        re.IGNORECASE,
-    )
+    distillery_match = BOTTLED_BY_DISTILLERY_PATTERN.search(text)
     if distillery_match:
         # Get the company name before it
         before_text = text[: distillery_match.start()]
         # Find the capitalized name before
-        name_match = re.search(r"([A-Z][A-Za-z\s]{5,}?)(?:\s*$)", before_text)
+        name_match = NAME_BEFORE_PATTERN.search(before_text)
         if name_match:
             name = name_match.group(1).strip()
-            name = re.sub(r"[^\w\s]", "", name).strip()
+            name = PUNCTUATION_PATTERN.sub("", name).strip()
             if len(name) > 5:
                 return name.title() + " Distilling Co", 0.85
 
     # Look for "BOTTLED BY: [Company Name]" pattern
-    patterns = [
-        (
-            r"(?:bottled|distilled)\s*(?:&|and)?\s*(?:by)?\s*[:\s]*([A-Z][A-Za-z\s]{3,}?(?:CO\.?|Company|Inc\.?|LLC|Distillery))",
-            0.9,
-        ),
-        (r"([A-Z][A-Za-z\s]+(?:DISTILLING|DISTILLERY)(?:\s+CO\.?)?)", 0.85),
-    ]
-
-    for pattern, conf in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern, conf, required in BOTTLER_PATTERNS:
+        if required and required not in doc.lower:
+            continue
+        match = pattern.search(text)
         if match:
             bottler = match.group(1).strip()
-            bottler = re.sub(r"\s+", " ", bottler)
+            bottler = WHITESPACE_PATTERN.sub(" ", bottler)
             # Clean up OCR garbage
-            bottler = re.sub(r"[^A-Za-z\s\.]", "", bottler).strip()
+            bottler = NON_NAME_PATTERN.sub("", bottler).strip()
             if len(bottler) > 5:
                 return bottler.title(), conf
 
+    # Known city directly followed by its state, e.g. "LOUISVILLE, KY"
+    location = city_and_state(doc.places)
+    if location:
+        return f"Bottled in {location}", 0.7
+
     # Look for location pattern (City, State)
-    location_match = re.search(
-        r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?,\s*(?:[A-Z]{2}|[A-Z][a-z]+))", text
-    )
+    location_match = LOCATION_PATTERN.search(text)
     if location_match:
         # Found a location, extract as bottler location
         location = location_match.group(1)
@@ -655,70 +908,144 @@ def extract_bottler_producer(text: str) -> Tuple[Optional[str], float]:
     return None, 0.0
 
 
-def extract_country_of_origin(text: str) -> Tuple[Optional[str], float]:
+def extract_country_of_origin(text: Text) -> Tuple[Optional[str], float]:
     """Extract country of origin from label."""
-    if not text:
+    doc = as_document(text)
+    if not doc:
         return None, 0.0
 
-    text_lower = text.lower()
-
     # Direct "PRODUCT OF" pattern
-    product_of_match = re.search(
-        r"product\s+of\s+(?:the\s+)?([A-Za-z\s]+?)(?:\.|,|\n|$)", text, re.IGNORECASE
-    )
+    product_of_match = PRODUCT_OF_PATTERN.search(doc.text)
     if product_of_match:
         country = product_of_match.group(1).strip()
+        # Canonicalize a known country and drop OCR noise read after it
+        places = get_gazetteer().find(normalize_text(country).split())
+        if places and places[0].start == 0 and places[0].kind == "country":
+            return places[0].name, 0.95
         return country.title(), 0.95
 
-    # Check for common country names
-    countries = [
-        ("united states", "USA"),
-        ("usa", "USA"),
-        ("u.s.a.", "USA"),
-        ("america", "USA"),
-        ("united kingdom", "UK"),
-        ("uk", "UK"),
-        ("canada", "Canada"),
-        ("mexico", "Mexico"),
-        ("france", "France"),
-        ("italy", "Italy"),
-        ("spain", "Spain"),
-        ("ireland", "Ireland"),
-        ("japan", "Japan"),
-        ("scotland", "Scotland"),
-        ("ireland", "Ireland"),
-    ]
-
-    for pattern, country_name in countries:
-        if pattern in text_lower:
-            return country_name, 0.9
+    # First country named anywhere on the label
+    for place in doc.places:
+        if place.kind == "country":
+            return place.name, 0.9 if place.exact else 0.85
 
-    # Look for state pattern (e.g., "KENTUCKY", "INDIANA", "KANSAS")
-    us_states = [
-        "kentucky",
-        "tennessee",
-        "indiana",
-        "kansas",
-        "california",
-        "new york",
-        "texas",
-        "florida",
-        "ohio",
-        "pennsylvania",
-        "illinois",
-        "georgia",
-        "virginia",
-        "oregon",
-        "washington",
-        "colorado",
-        "missouri",
-        "wisconsin",
-        "michigan",
-    ]
-
-    for state in us_states:
-        if state in text_lower:
-            # If we find a US state, likely USA origin
+    # A US state (e.g. "KENTUCKY", "INDIANA", "KANSAS") implies USA origin
+    for place in doc.places:
+        if place.kind == "state" and not place.abbreviation:
             return "USA", 0.75
 
     return None, 0.0
+
+
+# Columns returned by validate_batch, one list entry per text
+BATCH_COLUMNS = (
+    "brand_name",
+    "brand_name_confidence",
+    "class_type",
+    "class_type_confidence",
+    "alcohol_content",
+    "alcohol_content_parsed",
+    "alcohol_content_confidence",
+    "net_contents",
+    "net_contents_parsed",
+    "net_contents_confidence",
+    "government_warning",
+    "government_warning_parsed",
+    "government_warning_issues",
+    "government_warning_confidence",
+    "bottler_producer",
+    "bottler_producer_confidence",
+    "country_of_origin",
+    "country_of_origin_confidence",
+)
+
+# Texts scored together; bounds the size of each cdist matrix
+BATCH_CHUNK_SIZE = 256
+
+
+def validate_batch(
+    texts: Sequence[str], processes: int = 0, chunk_size: int = BATCH_CHUNK_SIZE
+) -> Dict[str, List[Any]]:
+    """
+    Run every extractor over many stored OCR texts, e.g. to re-score history
+    after a rule change. Returns columns (see BATCH_COLUMNS) rather than one
+    result per text. Within each chunk the fuzzy keyword checks and warning
+    word snapping for all texts are done in single process.cdist calls;
+    with processes > 1, chunks are spread over that many worker processes.
+    Results match the per-text functions.
+    """
+    chunks = [texts[i : i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    if processes > 1 and len(chunks) > 1:
+        # Imported here: only batch jobs need a pool of their own
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            parts = list(pool.map(_validate_chunk, chunks))
+    else:
+        parts = [_validate_chunk(chunk) for chunk in chunks]
+
+    columns: Dict[str, List[Any]] = {name: [] for name in BATCH_COLUMNS}
+    for part in parts:
+        for name in BATCH_COLUMNS:
+            columns[name].extend(part[name])
+    return columns
+
+
+def _validate_chunk(texts: Sequence[str]) -> Dict[str, List[Any]]:
+    docs = [LabelDocument(text) for text in texts]
+    present = [doc for doc in docs if doc]
+
+    # Fill each document's memo with batched scores before the extractors
+    # ask for them one document at a time
+    fuzzy_contains_all_batch(
+        [d for d in present if not any(v in d.normalized for v in WARNING_VARIANTS)],
+        WARNING_VARIANTS,
+        threshold=70,
+    )
+    fuzzy_contains_all_batch(
+        present, WARNING_PARA1_KEYWORDS + WARNING_PARA2_KEYWORDS, threshold=70
+    )
+    windows = [_warning_window(doc) for doc in present]
+    snaps = snap_warning_words(
+        [
+            w
+            for located in windows
+            if located
+            for w in located[2]
+            if w not in WARNING_WORD_SET
+        ]
+    )
+    for doc in present:
+        doc.memo["warning_snaps"] = snaps
+
+    registry = get_brand_registry()
+    if registry is not None:
+        # Only documents without a full distillery name get as far as the registry
+        pending = [doc for doc in present if not _distillery_brand(doc)]
+        candidates = [brand_candidate_lines(doc) for doc in pending]
+        matches = iter(
+            registry.lookup_many(
+                [normalized for lines in candidates for _, normalized in lines],
+                normalized=True,
+            )
+        )
+        for doc, lines in zip(pending, candidates):
+            doc.memo["brand_lookup"] = {line: next(matches) for line, _ in lines}
+
+    columns: Dict[str, List[Any]] = {name: [] for name in BATCH_COLUMNS}
+    for doc in docs:
+        row = (
+            *extract_brand_name(doc),
+            *extract_class_type(doc),
+            *extract_alcohol_content(doc),
+            *extract_net_contents(doc),
+            *validate_government_warning(doc),
+            *extract_bottler_producer(doc),
+            *extract_country_of_origin(doc),
+        )
+        for name, value in zip(BATCH_COLUMNS, row):
+            columns[name].append(value)
+    return columns
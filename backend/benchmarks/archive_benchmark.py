@@ -0,0 +1,112 @@
+"""
+Memory and throughput of ingesting an archive into a job.
+
+Writes ZIP (deflate) and .tar.gz archives of --images copies of the sample
+labels to a temporary directory, then streams each from disk through
+archives.iter_archive in 64 KB chunks, the way POST /api/jobs/archive
+receives its body, staging every member in a temporary job store. Reports
+the Python heap peak (tracemalloc) and the ingestion rate; the peak should
+stay flat as --images grows. OCR is not run.
+
+Run from backend/:
+    python -m benchmarks.archive_benchmark [--images 1000]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from app.services.archives import iter_archive
+from app.services.jobs import JobStore, new_job_id
+from app.services.uploads import max_upload_bytes
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "sample-labels")
+CHUNK_BYTES = 64 * 1024
+
+
+def sample_images():
+    images = []
+    for name in sorted(os.listdir(SAMPLES_DIR)):
+        if name.lower().endswith((".png", ".jpg", ".jpeg")):
+            with open(os.path.join(SAMPLES_DIR, name), "rb") as f:
+                images.append((name, f.read()))
+    return images
+
+
+def build_zip(images, count, path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i in range(count):
+            name, data = images[i % len(images)]
+            archive.writestr(f"labels/{i:06d}_{name}", data)
+
+
+def build_tar_gz(images, count, path):
+    with tarfile.open(path, mode="w:gz") as archive:
+        for i in range(count):
+            name, data = images[i % len(images)]
+            info = tarfile.TarInfo(f"labels/{i:06d}_{name}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+async def body_chunks(path):
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_BYTES):
+            yield chunk
+
+
+async def ingest(path, store):
+    job_id = new_job_id()
+    total = 0
+    async for member in iter_archive(body_chunks(path), max_upload_bytes()):
+        store.stage(job_id, total, member.name, member.content, member.error)
+        total += 1
+    return total
+
+
+def measure(path, store):
+    tracemalloc.start()
+    start = time.perf_counter()
+    total = asyncio.run(ingest(path, store))
+    elapsed = time.perf_counter() - start
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return total, heap_peak / 1e6, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--images", type=int, default=1000)
+    args = parser.parse_args()
+
+    images = sample_images()
+    largest = max(len(data) for _, data in images) / 1e6
+    print(f"{len(images)} sample labels, largest {largest:.1f} MB")
+    print(
+        f"{'format':>7} {'images':>7} {'archive MB':>11} {'heap peak MB':>13} "
+        f"{'images/s':>9} {'MB/s':>7}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        store = JobStore(os.path.join(directory, "jobs.sqlite3"))
+        for count in sorted({max(1, args.images // 10), args.images}):
+            for label, build in (("zip", build_zip), ("tar.gz", build_tar_gz)):
+                path = os.path.join(directory, f"labels.{label}")
+                build(images, count, path)
+                size = os.path.getsize(path) / 1e6
+                total, heap, elapsed = measure(path, store)
+                os.remove(path)
+                print(
+                    f"{label:>7} {total:>7} {size:>11.1f} {heap:>13.1f} "
+                    f"{total / elapsed:>9.0f} {size / elapsed:>7.1f}"
+                )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Throughput of re-validating stored OCR texts.
+
+Compares the per-text extractors (one LabelDocument and seven extractor
+calls per text, as pipeline.extract_fields does) with
+validators.validate_batch, in-process and across worker processes.
+Texts are repeated until --count is reached.
+
+Run from backend/:
+    python -m benchmarks.batch_benchmark [--count 5000] [--processes 4] [--texts texts.json]
+"""
+
+import argparse
+import os
+import time
+
+from app.services.document import LabelDocument
+from app.services.validators import validate_batch
+from benchmarks.validators_benchmark import EXTRACTORS, load_texts
+
+
+def per_text(texts):
+    for text in texts:
+        doc = LabelDocument(text)
+        for extractor in EXTRACTORS:
+            extractor(doc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--texts", help="JSON list of OCR texts to use")
+    args = parser.parse_args()
+
+    source = load_texts(args.texts)
+    texts = (source * (args.count // len(source) + 1))[: args.count]
+    # Load the brand registry and gazetteer outside the timings
+    validate_batch(texts[:1])
+
+    runs = [
+        ("per-text extractors", lambda: per_text(texts)),
+        ("validate_batch", lambda: validate_batch(texts)),
+    ]
+    if args.processes > 1:
+        runs.append(
+            (
+                f"validate_batch x{args.processes}",
+                lambda: validate_batch(texts, processes=args.processes),
+            )
+        )
+
+    print(f"{len(texts)} texts ({len(source)} distinct), {os.cpu_count()} CPUs")
+    for label, run in runs:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:>24}: {len(texts) / elapsed:8.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
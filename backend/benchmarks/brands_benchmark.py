@@ -0,0 +1,90 @@
+"""
+Brand registry lookup cost as the registry grows.
+
+Builds synthetic registries of 1k-50k two/three-word brand names (plus the
+bundled brands), then times BrandRegistry.lookup over the lines of the
+sample-label OCR text. Lookup cost should stay roughly flat with size.
+
+Run from backend/:
+    python -m benchmarks.brands_benchmark [--texts texts.json]
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from app.services.brands import DEFAULT_REGISTRY_PATH, BrandRegistry
+from benchmarks.validators_benchmark import load_texts
+
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+
+
+def synthetic_names(count, seed=7):
+    """Pronounceable made-up names, e.g. "Tovaril Mesk"."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        words = []
+        for _ in range(rng.randint(2, 3)):
+            word = "".join(
+                rng.choice(CONSONANTS) + rng.choice(VOWELS)
+                for _ in range(rng.randint(1, 3))
+            )
+            if rng.random() < 0.5:
+                word += rng.choice(CONSONANTS)
+            words.append(word.capitalize())
+        names.add(" ".join(words))
+    return sorted(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--texts", help="JSON list of OCR texts to use")
+    args = parser.parse_args()
+
+    lines = [
+        line.strip()
+        for text in load_texts(args.texts)
+        for line in text.split("\n")
+        if line.strip()
+    ]
+    with open(DEFAULT_REGISTRY_PATH, newline="") as f:
+        bundled = list(csv.reader(f))[1:]
+
+    print(f"{len(lines)} OCR lines")
+    print(
+        f"{'brands':>7} {'build ms':>9} {'memory MB':>10} {'us/line':>8} {'found':>6}"
+    )
+    for size in (0, 1000, 10000, 50000):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, newline=""
+        ) as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "aliases"])
+            writer.writerows(bundled)
+            writer.writerows([name, ""] for name in synthetic_names(size))
+            path = f.name
+        try:
+            start = time.perf_counter()
+            registry = BrandRegistry(path)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            found = {m.name for line in lines for m in registry.lookup(line)}
+            per_line = (time.perf_counter() - start) / len(lines) * 1e6
+
+            stats = registry.stats()
+            print(
+                f"{stats['brands']:>7} {build_ms:>9.0f} "
+                f"{stats['memory_bytes'] / 1e6:>10.1f} {per_line:>8.0f} {len(found):>6}"
+            )
+        finally:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+End-to-end latency, throughput and field accuracy over the sample labels.
+
+Sends every image in sample-labels/ through routers.verify.process_single_image
+(upload read, shared-memory hand-off to the OCR pool, OCR passes, validators)
+with the result cache off. Reports p50/p95 latency of one request at a time,
+the time spent in each stage (from the result metadata), throughput with
+--concurrency requests in flight, and per-field accuracy against
+sample-labels/ground_truth.json. --json writes the whole report as one
+object; --compare prints the change against such a file from another commit.
+
+Run from backend/:
+    python -m benchmarks.e2e_benchmark [--iterations 3] [--mode none] [--json after.json] [--compare before.json]
+"""
+
+import argparse
+import asyncio
+import glob
+import io
+import json
+import math
+import os
+import statistics
+import subprocess
+import time
+
+from fastapi import UploadFile
+from rapidfuzz import fuzz
+
+from app.config import settings
+from app.models.schemas import FieldStatus
+from app.routers.verify import process_single_image
+from app.services.brands import normalize_name
+from app.services.executor import pool_size, shutdown_pool
+from benchmarks.validators_benchmark import SAMPLE_DIR
+
+GROUND_TRUTH_PATH = os.path.join(SAMPLE_DIR, "ground_truth.json")
+
+# Minimum fuzz.ratio between normalized text values, so stray OCR
+# characters ("Ee Mountain Pass Distilling Co") still count as read
+TEXT_MATCH_RATIO = 90
+
+
+def percentile(values, q):
+    """Nearest-rank percentile, q in (0, 1]."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def load_images(directory):
+    paths = sorted(
+        path
+        for pattern in ("*.png", "*.jpg", "*.jpeg")
+        for path in glob.glob(os.path.join(directory, pattern))
+    )
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((os.path.basename(path), f.read()))
+    return images
+
+
+def field_correct(name, field, expected):
+    """Whether one field result matches its ground-truth entry."""
+    if expected is None:
+        return field.status == FieldStatus.MISSING
+    if name == "government_warning":
+        return (field.status == FieldStatus.DETECTED) == expected
+    if field.value is None:
+        return False
+    if name == "alcohol_content":
+        return (
+            field.parsed_value is not None and abs(field.parsed_value - expected) < 0.01
+        )
+    if name == "net_contents":
+        parsed = field.parsed_value or {}
+        return (
+            abs(parsed.get("amount", -1) - expected["amount"]) < 0.01
+            and parsed.get("unit") == expected["unit"]
+        )
+    value = normalize_name(field.value)
+    return any(
+        fuzz.ratio(value, normalize_name(accepted)) >= TEXT_MATCH_RATIO
+        for accepted in expected
+    )
+
+
+def stage_timings(metadata):
+    """Flatten a result's metadata into {stage: ms}."""
+    metadata = metadata or {}
+    stages = {}
+    for key in ("decode_ms", "preprocess_ms"):
+        if key in metadata:
+            stages[key[:-3]] = metadata[key]
+    for name, ms in metadata.get("pass_ms", {}).items():
+        stages[f"ocr:{name}"] = ms
+    for name, ms in metadata.get("validator_ms", {}).items():
+        stages[f"validate:{name}"] = ms
+    return stages
+
+
+async def verify(filename, content, mode, budget_ms):
+    upload = UploadFile(io.BytesIO(content), filename=filename)
+    start = time.perf_counter()
+    result = await process_single_image(upload, mode, budget_ms)
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def run(images, args, budget_ms):
+    # Start every worker and load Tesseract outside the timings
+    await asyncio.gather(
+        *(verify(*images[0], args.mode, budget_ms) for _ in range(pool_size()))
+    )
+
+    latencies, stages, first = [], {}, {}
+    for _ in range(args.iterations):
+        for filename, content in images:
+            result, elapsed = await verify(filename, content, args.mode, budget_ms)
+            latencies.append(elapsed)
+            first.setdefault(filename, (result, elapsed))
+            for stage, ms in stage_timings(result.metadata).items():
+                stages.setdefault(stage, []).append(ms)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(filename, content):
+        async with semaphore:
+            await verify(filename, content, args.mode, budget_ms)
+
+    requests = images * args.iterations
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(*image) for image in requests))
+    throughput = len(requests) / (time.perf_counter() - start)
+    return latencies, stages, first, throughput
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(args, images, truth, latencies, stages, first, throughput):
+    per_image = []
+    hits = {}
+    for filename, _ in images:
+        result, elapsed = first[filename]
+        expected = truth.get(filename)
+        correct = {}
+        if expected is not None:
+            for name, field in result.fields:
+                if name in expected:
+                    correct[name] = field_correct(name, field, expected[name])
+                    hits.setdefault(name, []).append(correct[name])
+        per_image.append(
+            {
+                "filename": filename,
+                "latency_ms": round(elapsed, 1),
+                "passes": (result.metadata or {}).get("passes", []),
+                "timed_out": result.timed_out,
+                "correct": correct,
+                "values": {name: field.value for name, field in result.fields},
+            }
+        )
+
+    checked = [ok for oks in hits.values() for ok in oks]
+    return {
+        "commit": git_commit(),
+        "mode": args.mode,
+        "iterations": args.iterations,
+        "images": len(images),
+        "cpus": os.cpu_count(),
+        "workers": pool_size(),
+        "concurrency": args.concurrency,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "mean": round(statistics.mean(latencies), 1),
+            "max": round(max(latencies), 1),
+        },
+        "throughput_images_per_s": round(throughput, 2),
+        "stages_ms": {
+            stage: {
+                "runs": len(values),
+                "mean": round(statistics.mean(values), 3),
+                "p95": round(percentile(values, 0.95), 3),
+            }
+            for stage, values in stages.items()
+        },
+        "accuracy": {
+            "overall": round(sum(checked) / len(checked), 3) if checked else None,
+            "fields": {
+                name: round(sum(oks) / len(oks), 3) for name, oks in hits.items()
+            },
+        },
+        "per_image": per_image,
+    }
+
+
+def print_report(report):
+    latency = report["latency_ms"]
+    print(
+        f"{report['images']} images x {report['iterations']}, mode={report['mode']}, "
+        f"{report['cpus']} CPUs, {report['workers']} OCR workers"
+    )
+    print(
+        f"latency p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms, "
+        f"max {latency['max']:.0f} ms"
+    )
+    print(
+        f"throughput {report['throughput_images_per_s']:.2f} images/s "
+        f"({report['concurrency']} in flight)"
+    )
+
+    print(f"\n{'stage':>28} {'runs':>5} {'mean ms':>9} {'p95 ms':>9}")
+    for stage, timing in report["stages_ms"].items():
+        print(
+            f"{stage:>28} {timing['runs']:>5} {timing['mean']:>9.2f} {timing['p95']:>9.2f}"
+        )
+
+    accuracy = report["accuracy"]
+    print(f"\n{'field':>28} {'accuracy':>9}")
+    for name, rate in accuracy["fields"].items():
+        print(f"{name:>28} {rate:>9.0%}")
+    if accuracy["overall"] is not None:
+        print(f"{'overall':>28} {accuracy['overall']:>9.0%}")
+
+    for image in report["per_image"]:
+        for name, ok in image["correct"].items():
+            if not ok:
+                print(f"  {image['filename']}: {name} = {image['values'][name]!r}")
+
+
+def print_comparison(before, after):
+    print(f"\nchange from {before.get('commit') or 'baseline'}:")
+    rows = [
+        ("latency p50 ms", before["latency_ms"]["p50"], after["latency_ms"]["p50"]),
+        ("latency p95 ms", before["latency_ms"]["p95"], after["latency_ms"]["p95"]),
+        (
+            "images/s",
+            before["throughput_images_per_s"],
+            after["throughput_images_per_s"],
+        ),
+        ("accuracy", before["accuracy"]["overall"], after["accuracy"]["overall"]),
+    ]
+    for name, rate in after["accuracy"]["fields"].items():
+        rows.append((name, before["accuracy"]["fields"].get(name), rate))
+    for label, old, new in rows:
+        if old is None or new is None:
+            continue
+        print(f"{label:>28} {old:>9.4g} -> {new:<9.4g} ({new - old:+.4g})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--images", default=SAMPLE_DIR)
+    parser.add_argument("--truth", default=GROUND_TRUTH_PATH)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--mode", default=settings.preprocess_mode)
+    parser.add_argument(
+        "--budget-ms",
+        type=int,
+        default=settings.ocr_budget_ms,
+        help="per-image OCR budget, as /api/verify applies (0 = unlimited)",
+    )
+    parser.add_argument("--concurrency", type=int, default=pool_size())
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="report from an earlier run to diff against")
+    args = parser.parse_args()
+
+    # Every request must run OCR; workers never touch the cache
+    settings.cache_enabled = False
+    images = load_images(args.images)
+    with open(args.truth) as f:
+        truth = json.load(f)
+
+    try:
+        measured = asyncio.run(run(images, args, args.budget_ms or None))
+    finally:
+        shutdown_pool()
+
+    report = build_report(args, images, truth, *measured)
+    print_report(report)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
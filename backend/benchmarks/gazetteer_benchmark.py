@@ -0,0 +1,66 @@
+"""
+Location lookup cost as the gazetteer grows.
+
+Times Gazetteer.find (one automaton scan over the words of a document) against the
+per-name substring loop it replaced, for the bundled gazetteer and for
+gazetteers padded with 1k-20k synthetic place names.
+
+Run from backend/:
+    python -m benchmarks.gazetteer_benchmark [--texts texts.json]
+"""
+
+import argparse
+import time
+
+from app.services.document import LabelDocument
+from app.services.gazetteer import DEFAULT_GAZETTEER_PATH, Gazetteer, load_entries
+from benchmarks.brands_benchmark import synthetic_names
+from benchmarks.validators_benchmark import load_texts
+
+
+def loop_find(doc, names):
+    """The previous lookup: one substring scan of the text per name."""
+    return [name for name in names if name in doc.lower]
+
+
+def time_us(fn, docs, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for doc in docs:
+            fn(doc)
+    return (time.perf_counter() - start) / repeat / len(docs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--texts", help="JSON list of OCR texts to use")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts)
+    bundled = load_entries(DEFAULT_GAZETTEER_PATH)
+    print(f"{len(texts)} documents")
+    print(f"{'names':>7} {'patterns':>9} {'build ms':>9} {'loop us':>8} {'scan us':>8}")
+    for extra in (0, 1000, 5000, 20000):
+        entries = bundled + [
+            ("city", name, [], []) for name in synthetic_names(extra, seed=11)
+        ]
+        start = time.perf_counter()
+        gazetteer = Gazetteer(entries)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        names = [n.lower() for _, name, aliases, _ in entries for n in (name, *aliases)]
+        loop = time_us(
+            lambda doc: loop_find(doc, names), [LabelDocument(t) for t in texts]
+        )
+        scan = time_us(
+            lambda doc: gazetteer.find(doc.norm_words),
+            [LabelDocument(t) for t in texts],
+        )
+        print(
+            f"{len(entries):>7} {gazetteer.size:>9} {build_ms:>9.0f} "
+            f"{loop:>8.0f} {scan:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Near-duplicate detection: hash distances and index lookup cost.
+
+For each sample label, hashes edited copies (JPEG re-encodes, half scale,
+brightness/contrast, blur, a 1 degree rotation, a 3% crop, and a blanked
+strip where the warning usually sits) and prints their Hamming distance to
+the original, next to the distances between different labels. The blanked
+strip stays close, which is why a hash match is only reused after an OCR
+pass reads the same fields. Then times lookups in the multi-index hash against a linear scan of --entries
+stored hashes (random, plus near copies of the queries) and checks both
+return the same matches.
+
+Run from backend/:
+    python -m benchmarks.near_duplicate_benchmark [--entries 100000] [--max-distance 32]
+"""
+
+import argparse
+import os
+import random
+import time
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.services.similarity import HASH_BITS, MultiIndexHash, hamming, image_dhash
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "sample-labels")
+
+
+def encode(image, ext=".jpg", quality=90):
+    ok, data = cv2.imencode(ext, image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return data.tobytes()
+
+
+def variants(image):
+    height, width = image.shape[:2]
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), 1.0, 1.0)
+    return {
+        "jpeg q85": encode(image, quality=85),
+        "jpeg q50": encode(image, quality=50),
+        "scale 50%": encode(cv2.resize(image, (width // 2, height // 2)), ".png"),
+        "brighter": encode(cv2.convertScaleAbs(image, alpha=1.1, beta=15)),
+        "blur": encode(cv2.GaussianBlur(image, (5, 5), 0)),
+        "rotate 1deg": encode(
+            cv2.warpAffine(
+                image, rotation, (width, height), borderMode=cv2.BORDER_REPLICATE
+            )
+        ),
+        "crop 3%": encode(image[int(height * 0.03) :, int(width * 0.03) :]),
+        "blank strip": encode(blank_strip(image)),
+    }
+
+
+def blank_strip(image):
+    """White out 6% of the height in the lower part, e.g. the warning."""
+    height = image.shape[0]
+    blanked = image.copy()
+    blanked[int(height * 0.82) : int(height * 0.88)] = 255
+    return blanked
+
+
+def distance_report(max_distance):
+    names = sorted(n for n in os.listdir(SAMPLES_DIR) if n.endswith(".png"))
+    hashes = {}
+    rows = []
+    for name in names:
+        with open(os.path.join(SAMPLES_DIR, name), "rb") as f:
+            data = f.read()
+        start = time.perf_counter()
+        hashes[name] = image_dhash(data)
+        hash_ms = (time.perf_counter() - start) * 1000
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        edited = {
+            label: hamming(hashes[name], image_dhash(content))
+            for label, content in variants(image).items()
+        }
+        rows.append((name, hash_ms, edited))
+
+    labels = list(rows[0][2])
+    print(f"Distance to the original ({HASH_BITS}-bit dHash)")
+    print(f"{'label':>28} {'hash ms':>8} " + " ".join(f"{l:>11}" for l in labels))
+    for name, hash_ms, edited in rows:
+        print(
+            f"{name:>28} {hash_ms:>8.0f} "
+            + " ".join(f"{edited[l]:>11}" for l in labels)
+        )
+    between = sorted(
+        hamming(hashes[a], hashes[b]) for a in names for b in names if a < b
+    )
+    print(f"Between different labels: {between}")
+    print(
+        f"--max-distance: {max_distance} "
+        f"(NEAR_DUPLICATE_MAX_DISTANCE: {settings.near_duplicate_max_distance})"
+    )
+
+
+def lookup_report(entries, queries, max_distance):
+    rng = random.Random(0)
+    stored = [rng.getrandbits(HASH_BITS) for _ in range(entries)]
+    probes = []
+    for i in range(queries):
+        # Every other query has a stored near copy
+        value = stored[i] if i % 2 == 0 else rng.getrandbits(HASH_BITS)
+        for bit in rng.sample(range(HASH_BITS), max_distance // 2):
+            value ^= 1 << bit
+        probes.append(value)
+
+    index = MultiIndexHash()
+    start = time.perf_counter()
+    for i, value in enumerate(stored):
+        index.add(value, str(i))
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.search(value, max_distance) for value in probes]
+    index_ms = (time.perf_counter() - start) * 1000 / queries
+
+    start = time.perf_counter()
+    scanned = [
+        sorted(
+            (hamming(value, other), str(i))
+            for i, other in enumerate(stored)
+            if hamming(value, other) <= max_distance
+        )
+        for value in probes
+    ]
+    scan_ms = (time.perf_counter() - start) * 1000 / queries
+
+    assert indexed == scanned, "multi-index hash and linear scan disagree"
+    matches = sum(1 for found in indexed if found)
+    print(
+        f"\n{entries} stored hashes, {queries} lookups within {max_distance} bits "
+        f"({matches} with a match)"
+    )
+    print(f"{'method':>18} {'ms/lookup':>10}")
+    print(f"{'multi-index hash':>18} {index_ms:>10.3f}   (built in {build_s:.1f}s)")
+    print(f"{'linear scan':>18} {scan_ms:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--max-distance", type=int, default=32)
+    args = parser.parse_args()
+
+    distance_report(args.max_distance)
+    lookup_report(args.entries, args.queries, args.max_distance)
+
+
+if __name__ == "__main__":
+    main()
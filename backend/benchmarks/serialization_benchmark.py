@@ -0,0 +1,197 @@
+"""
+Cost and size of encoding verification results.
+
+OCRs the sample labels once, repeats their results up to --images, then
+times each way of turning them into a response body: FastAPI's default
+response_model path (the previous behaviour), one pass through
+pydantic-core, orjson over model_dump(), MessagePack, and the compact
+options (raw_text=false, metadata=false, fields=...). Also times a page of
+GET /api/jobs/{id} built the previous way (each stored result validated
+into an ImageResult, then the response re-validated) against loading the
+stored JSON as plain data.
+
+Run from backend/:
+    python -m benchmarks.serialization_benchmark [--images 100]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.schemas import (
+    BatchSummary,
+    ImageResult,
+    JobItem,
+    JobResponse,
+    JobStatus,
+    VerifyResponse,
+)
+from app.routers.verify import summarize
+from app.services.pipeline import verify_image
+from app.services.responses import (
+    ResponseOptions,
+    encode_data,
+    encode_model,
+    load_json,
+    msgpack,
+)
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "sample-labels")
+
+
+def sample_results():
+    results = []
+    for name in sorted(os.listdir(SAMPLES_DIR)):
+        if name.lower().endswith((".png", ".jpg", ".jpeg")):
+            with open(os.path.join(SAMPLES_DIR, name), "rb") as f:
+                result, _ = verify_image(f.read(), name)
+            results.append(result)
+    return results
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn()
+    return (time.perf_counter() - start) / repeat, len(body)
+
+
+def fastapi_default(field, response):
+    async def render():
+        content = await serialize_response(
+            field=field, response_content=response, is_coroutine=True
+        )
+        return JSONResponse(content).body
+
+    return asyncio.run(render())
+
+
+def verify_methods(response):
+    field = create_response_field(name="response", type_=VerifyResponse)
+    compact = ResponseOptions(raw_text=False, metadata=False)
+    selected = ResponseOptions(
+        fields=frozenset({"brand_name", "alcohol_content", "government_warning"}),
+        raw_text=False,
+        metadata=False,
+    )
+
+    def exclude(options):
+        return {"results": {"__all__": options.exclude()}}
+
+    methods = {
+        "FastAPI response_model (previous)": lambda: fastapi_default(field, response),
+        "pydantic-core JSON (default)": lambda: encode_model(
+            response, ResponseOptions()
+        ),
+        "orjson(model_dump())": lambda: orjson.dumps(response.model_dump(mode="json")),
+        "JSON, no raw_text/metadata": lambda: encode_model(
+            response, compact, exclude(compact)
+        ),
+        "JSON, 3 fields, no raw_text/metadata": lambda: encode_model(
+            response, selected, exclude(selected)
+        ),
+    }
+    if msgpack is not None:
+        packed = compact._replace(encoding="msgpack")
+        methods["MessagePack"] = lambda: encode_model(
+            response, ResponseOptions(encoding="msgpack")
+        )
+        methods["MessagePack, no raw_text/metadata"] = lambda: encode_model(
+            response, packed, exclude(packed)
+        )
+    return methods
+
+
+def job_page_methods(results):
+    stored = [result.model_dump_json() for result in results]
+    field = create_response_field(name="response", type_=JobResponse)
+    envelope = dict(
+        job_id="0" * 32,
+        status=JobStatus.COMPLETED,
+        created_at=0.0,
+        finished_at=0.0,
+        total=len(stored),
+        queued=0,
+        running=0,
+        done=len(stored),
+        failed=0,
+        batch_summary=BatchSummary(
+            total_images=len(stored), fully_compliant=0, needs_review=len(stored)
+        ),
+        offset=0,
+        limit=len(stored),
+    )
+
+    def previous():
+        items = [
+            JobItem(
+                position=i,
+                filename="label.png",
+                status="done",
+                result=ImageResult.model_validate_json(text),
+            )
+            for i, text in enumerate(stored)
+        ]
+        return fastapi_default(field, JobResponse(**envelope, items=items))
+
+    def current():
+        options = ResponseOptions()
+        items = [
+            JobItem(position=i, filename="label.png", status="done")
+            for i in range(len(stored))
+        ]
+        data = JobResponse(**envelope, items=items).model_dump(mode="json")
+        for item, text in zip(data["items"], stored):
+            item["result"] = options.select(load_json(text))
+        return encode_data(data, options)
+
+    return {
+        "validate each result (previous)": previous,
+        "load stored JSON as data": current,
+    }
+
+
+def report(title, methods, count, repeat):
+    print(f"\n{title}")
+    print(f"{'method':>38} {'ms':>8} {'us/image':>9} {'bytes/image':>12}")
+    for label, fn in methods.items():
+        seconds, size = timed(fn, repeat)
+        print(
+            f"{label:>38} {seconds * 1000:>8.2f} {seconds * 1e6 / count:>9.1f} "
+            f"{size / count:>12.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    samples = sample_results()
+    results = [samples[i % len(samples)] for i in range(args.images)]
+    response = VerifyResponse(results=results, batch_summary=summarize(results))
+
+    report(
+        f"VerifyResponse with {args.images} results",
+        verify_methods(response),
+        args.images,
+        args.repeat,
+    )
+    report(
+        f"GET /api/jobs/{{id}} page of {args.images} results",
+        job_page_methods(results),
+        args.images,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
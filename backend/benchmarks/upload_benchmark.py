@@ -0,0 +1,119 @@
+"""
+Peak memory of reading one /api/verify request's uploads.
+
+Spools --files uploads of --size-mb random bytes the way the multipart
+parser does (SpooledTemporaryFile, on disk past 1 MB), then reads them all
+as one request does, with every upload held until OCR would run:
+the previous path (UploadFile.read() into bytes, then a copy into shared
+memory for the worker) against uploads.read_upload (chunks straight into
+shared memory, hashed on the way). Reports the Python heap peak
+(tracemalloc), shared memory held and, on Linux, the process's peak RSS.
+
+Run from backend/:
+    python -m benchmarks.upload_benchmark [--files 10] [--size-mb 10]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+import tracemalloc
+from multiprocessing import shared_memory
+from tempfile import SpooledTemporaryFile
+
+from fastapi import UploadFile
+
+from app.config import settings
+from app.services.uploads import read_upload
+
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def make_uploads(payloads):
+    uploads = []
+    for i, payload in enumerate(payloads):
+        spool = SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        spool.write(payload)
+        spool.seek(0)
+        uploads.append(UploadFile(spool, size=len(payload), filename=f"{i}.png"))
+    return uploads
+
+
+async def previous_path(files):
+    held = []
+    for file in files:
+        content = await file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        shm = shared_memory.SharedMemory(create=True, size=len(content))
+        shm.buf[: len(content)] = content
+        held.append((content, digest, shm))
+    shared = sum(shm.size for _, _, shm in held)
+    for _, _, shm in held:
+        shm.close()
+        shm.unlink()
+    return shared
+
+
+async def current_path(files):
+    held = [await read_upload(file) for file in files]
+    shared = sum(upload.size for upload in held)
+    for upload in held:
+        upload.close()
+    return shared
+
+
+def reset_peak_rss():
+    """Reset VmHWM (Linux); returns False where that is not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def measure(path, payloads):
+    files = make_uploads(payloads)
+    rss_before = peak_rss_mb() if reset_peak_rss() else None
+    tracemalloc.start()
+    start = time.perf_counter()
+    shared = asyncio.run(path(files))
+    elapsed = time.perf_counter() - start
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rss = peak_rss_mb() - rss_before if rss_before is not None else None
+    for file in files:
+        file.file.close()
+    return heap_peak / 1e6, shared / 1e6, rss, elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=settings.max_files)
+    parser.add_argument("--size-mb", type=float, default=settings.max_file_size_mb)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    payloads = [os.urandom(size) for _ in range(args.files)]
+    print(f"{args.files} uploads x {args.size_mb:g} MB")
+    print(
+        f"{'path':>12} {'heap peak MB':>13} {'shared MB':>10} "
+        f"{'peak RSS +MB':>13} {'ms':>6}"
+    )
+    for label, path in (("previous", previous_path), ("read_upload", current_path)):
+        heap, shared, rss, ms = measure(path, payloads)
+        rss_text = f"{rss:>13.0f}" if rss is not None else f"{'n/a':>13}"
+        print(f"{label:>12} {heap:>13.1f} {shared:>10.1f} {rss_text} {ms:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
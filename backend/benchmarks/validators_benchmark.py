@@ -0,0 +1,83 @@
+"""
+Per-document cost of the field validators.
+
+OCRs the sample labels once (or loads texts from a JSON list), then times the
+seven extractors per document in two ways: each extractor handed the raw
+text, so it builds its own analysis, and all of them sharing one
+LabelDocument as pipeline.extract_fields does.
+
+Run from backend/:
+    python -m benchmarks.validators_benchmark [--iterations 200] [--texts texts.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+
+from app.services.document import LabelDocument
+from app.services.ocr import run_ocr
+from app.services.validators import (
+    extract_alcohol_content,
+    extract_bottler_producer,
+    extract_brand_name,
+    extract_class_type,
+    extract_country_of_origin,
+    extract_net_contents,
+    validate_government_warning,
+)
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "sample-labels")
+
+EXTRACTORS = (
+    extract_brand_name,
+    extract_class_type,
+    extract_alcohol_content,
+    extract_net_contents,
+    validate_government_warning,
+    extract_bottler_producer,
+    extract_country_of_origin,
+)
+
+
+def load_texts(path=None):
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    texts = []
+    for image_path in sorted(glob.glob(os.path.join(SAMPLE_DIR, "*.png"))):
+        with open(image_path, "rb") as f:
+            texts.append(run_ocr(f.read()).text)
+    return texts
+
+
+def per_document_us(texts, iterations, shared):
+    """Median microseconds to run every extractor over one document."""
+    timings = []
+    for _ in range(iterations):
+        for text in texts:
+            start = time.perf_counter()
+            source = LabelDocument(text) if shared else text
+            for extractor in EXTRACTORS:
+                extractor(source)
+            timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--texts", help="JSON list of OCR texts to use")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts)
+    print(f"{len(texts)} documents, {args.iterations} iterations")
+    for label, shared in (("raw text per extractor", False), ("shared document", True)):
+        cost = per_document_us(texts, args.iterations, shared)
+        print(f"{label:>24}: {cost:8.0f} us/document")
+
+
+if __name__ == "__main__":
+    main()
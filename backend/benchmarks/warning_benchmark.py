@@ -0,0 +1,96 @@
+"""
+Government warning validation cost as OCR text and keyword lists grow.
+
+Compares batched keyword matching (validators.fuzzy_contains_all, one
+process.cdist call per window length) with the per-keyword Python loop it
+replaced, on sample-label OCR text repeated 1-8 times, and the warning
+alignment (validators.locate_warning, a bounded window after the header)
+with the whole-text fuzz.ratio it replaced.
+
+Run from backend/:
+    python -m benchmarks.warning_benchmark [--texts texts.json]
+"""
+
+import argparse
+import time
+
+from rapidfuzz import fuzz
+
+from app.services.document import LabelDocument
+from app.services.validators import (
+    WARNING_PARA1_KEYWORDS,
+    WARNING_PARA2_KEYWORDS,
+    REQUIRED_WARNING_NORMALIZED,
+    WARNING_VARIANTS,
+    fuzzy_contains_all,
+    locate_warning,
+    validate_government_warning,
+)
+from benchmarks.validators_benchmark import load_texts
+
+KEYWORDS = WARNING_VARIANTS + WARNING_PARA1_KEYWORDS + WARNING_PARA2_KEYWORDS
+
+
+def loop_contains(doc: LabelDocument, keyword: str, threshold: int) -> bool:
+    """The previous matcher: one fuzz.ratio call per window, per keyword."""
+    if keyword in doc.normalized:
+        return True
+    size = len(keyword.split())
+    words = doc.norm_words
+    for i in range(len(words) - size + 1):
+        if fuzz.ratio(" ".join(words[i : i + size]), keyword) >= threshold:
+            return True
+    return False
+
+
+def time_us(fn, docs, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for doc in docs:
+            fn(doc)
+    return (time.perf_counter() - start) / repeat / len(docs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--texts", help="JSON list of OCR texts to use")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts)
+    print(f"{'copies':>6} {'words':>6} {'kw':>4} {'loop us':>10} {'batched us':>11}")
+    for copies in (1, 2, 4, 8):
+        for keywords in (KEYWORDS, KEYWORDS * 4):
+            # Documents are built outside the timing, as extract_fields does
+            source = ["\n".join([text] * copies) for text in texts]
+            words = sum(len(LabelDocument(t).norm_words) for t in source) // len(source)
+            loop = time_us(
+                lambda doc: [loop_contains(doc, k, 70) for k in keywords],
+                [LabelDocument(t) for t in source],
+            )
+            batched = time_us(
+                lambda doc: fuzzy_contains_all(doc, keywords, 70),
+                [LabelDocument(t) for t in source],
+            )
+            print(
+                f"{copies:>6} {words:>6} {len(keywords):>4} {loop:>10.0f} {batched:>11.0f}"
+            )
+
+    print(f"{'copies':>6} {'chars':>6} {'whole ratio us':>15} {'locate us':>10}")
+    for copies in (1, 4, 16):
+        source = ["\n".join([text] * copies) for text in texts]
+        docs = [LabelDocument(t) for t in source]
+        chars = sum(len(doc.normalized) for doc in docs) // len(docs)
+        whole = time_us(
+            lambda doc: fuzz.ratio(doc.normalized, REQUIRED_WARNING_NORMALIZED), docs
+        )
+        # Reuse the documents, as extract_fields does, so windows are cached
+        locate = time_us(locate_warning, docs)
+        print(f"{copies:>6} {chars:>6} {whole:>15.0f} {locate:>10.0f}")
+
+    docs = [LabelDocument(t) for t in texts]
+    cost = time_us(validate_government_warning, docs, repeat=20)
+    print(f"validate_government_warning: {cost:.0f} us/document")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from app.services.archives import ArchiveError, iter_archive
+
+MB = 1024 * 1024
+
+
+class Unseekable(io.RawIOBase):
+    """Makes zipfile stream members with data descriptors, as zip tools piping output do."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def make_zip(members, streamed=False) -> bytes:
+    target = Unseekable() if streamed else io.BytesIO()
+    with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return (target.buffer if streamed else target).getvalue()
+
+
+def read_members(data: bytes, limit: int):
+    async def chunks():
+        for i in range(0, len(data), 64 * 1024):
+            yield data[i : i + 64 * 1024]
+
+    async def collect():
+        return [member async for member in iter_archive(chunks(), limit)]
+
+    return asyncio.run(collect())
+
+
+def test_oversized_member_is_reported_and_later_members_read():
+    data = make_zip([("bomb.png", b"\0" * (20 * MB)), ("label.png", b"label")])
+    bomb, label = read_members(data, MB)
+    assert bomb.content is None and "exceeds" in bomb.error
+    assert label == ("label.png", b"label", None)
+
+
+def test_oversized_member_without_header_size_rejects_archive():
+    data = make_zip([("bomb.png", b"\0" * (20 * MB))], streamed=True)
+    with pytest.raises(ArchiveError):
+        read_members(data, MB)
+
+
+def test_streamed_members_within_limit_are_read():
+    data = make_zip([("a.png", b"a" * 1000), ("b.jpg", b"b")], streamed=True)
+    assert [(m.name, m.content) for m in read_members(data, MB)] == [
+        ("a.png", b"a" * 1000),
+        ("b.jpg", b"b"),
+    ]
@@ -0,0 +1,54 @@
+import pytest
+
+from app.services.brands import BrandRegistry
+from app.services.validators import extract_brand_name
+
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / "brands.csv"
+    path.write_text("name,aliases\nAbsolut,\nPatron,\nWeller,\nWild Turkey,\n")
+    return BrandRegistry(str(path))
+
+
+@pytest.mark.parametrize(
+    "line",
+    ["Absolute bliss vodka", "For our patrons", "Welder's reserve", "Redemptions"],
+)
+def test_one_word_names_do_not_match_near_misses(registry, line):
+    assert registry.lookup(line) == []
+
+
+@pytest.mark.parametrize("line", ["ABSOLUT", "Absolut Vodka", "ABSO LUT"])
+def test_one_word_names_match_whole_words(registry, line):
+    assert [m.name for m in registry.lookup(line)] == ["Absolut"]
+
+
+def test_multi_word_names_still_match_fuzzily(registry):
+    assert [m.name for m in registry.lookup("WILD TURKY")] == ["Wild Turkey"]
+
+
+def test_near_miss_label_words_are_not_a_brand():
+    assert extract_brand_name("Absolute bliss vodka") == (None, 0.0)
+
+
+def test_registered_names_outside_brand_lines_are_ignored():
+    text = "\n".join(
+        [
+            "OLD TOM",
+            "Kentucky Straight Bourbon Whiskey",
+            "Bottled by Wild Turkey Co., Lawrenceburg, KY",
+            "45% Alc./Vol. 750 mL Absolut",
+            "GOVERNMENT WARNING: (1) According to the Surgeon General, women",
+        ]
+    )
+    assert extract_brand_name(text) == ("Old Tom", 0.85)
+
+
+def test_reload_swaps_index_and_fingerprint_together(registry, tmp_path):
+    before = registry.fingerprint
+    (tmp_path / "brands.csv").write_text("name,aliases\nHigh Ridge,\n")
+    registry.load()
+    assert registry.fingerprint != before
+    assert registry.lookup("ABSOLUT") == []
+    assert registry.stats()["fingerprint"] == registry.fingerprint
@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+
+from app.cli import CSV_COLUMNS, completed_paths
+
+
+def csv_text(*rows) -> str:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, CSV_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+    return out.getvalue()
+
+
+def test_jsonl_resume_skips_blank_and_half_written_lines(tmp_path):
+    output = tmp_path / "results.jsonl"
+    done = json.dumps({"path": "a.png", "result": {}}) + "\n"
+    failed = json.dumps({"path": "b.png", "error": "unreadable"}) + "\n"
+    output.write_text(done + "\n" + failed + '{"path": "c.png", "res')
+
+    assert completed_paths(str(output), "jsonl") == {"a.png"}
+    assert output.read_text() == done + "\n" + failed
+
+
+def test_csv_resume_keeps_records_with_embedded_newlines(tmp_path):
+    output = tmp_path / "results.csv"
+    warning = "GOVERNMENT WARNING: (1) According to\nthe Surgeon General"
+    complete = csv_text(
+        {"path": "a.png", "status": "done", "government_warning": warning}
+    )
+    last = csv_text(
+        {"path": "b.png", "status": "done", "government_warning": warning}
+    ).split("\r\n", 1)[1]
+    # Killed right after the newline inside the quoted warning
+    output.write_text(complete + last[: last.index("\n") + 1], newline="")
+
+    assert completed_paths(str(output), "csv") == {"a.png"}
+    assert output.read_bytes() == complete.encode()
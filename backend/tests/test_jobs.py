@@ -0,0 +1,62 @@
+import io
+import sqlite3
+import time
+
+from app.services.jobs import JobStore
+
+
+def open_store(tmp_path, lease_seconds=60) -> JobStore:
+    return JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=lease_seconds)
+
+
+def test_items_leased_to_a_live_process_are_not_recovered(tmp_path):
+    first, second = open_store(tmp_path), open_store(tmp_path)
+    job_id = first.submit([("a.png", io.BytesIO(b"a"))], "none", 0)
+    assert first.claim()[:2] == (job_id, 0)
+
+    # A second process starting up must not take over the running item
+    assert second.recover() == 0
+    assert second.claim() is None
+    assert first.renew(job_id, 0)
+
+
+def test_expired_leases_are_claimed_again(tmp_path):
+    first, second = open_store(tmp_path, lease_seconds=0), open_store(tmp_path)
+    job_id = first.submit([("a.png", io.BytesIO(b"a"))], "none", 0)
+    first.claim()
+    time.sleep(0.01)
+
+    assert second.claim()[:2] == (job_id, 0)
+    # The first worker lost the item, so its late result is dropped
+    assert not first.renew(job_id, 0)
+    first.fail(job_id, 0, "stale")
+    second.complete(job_id, 0, "{}", True)
+    job = second.get(job_id)
+    assert job["counts"]["done"] == 1 and job["finished_at"] is not None
+
+
+def test_release_requeues_own_items_only(tmp_path):
+    first, second = open_store(tmp_path), open_store(tmp_path)
+    first.submit([("a.png", io.BytesIO(b"a")), ("b.png", io.BytesIO(b"b"))], "none", 0)
+    first.claim()
+    second.claim()
+    assert first.release() == 1
+    assert first.status_counts()["queued"] == 1
+
+
+def test_files_without_leases_are_upgraded(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE items (job_id TEXT NOT NULL, position INTEGER NOT NULL, "
+        "filename TEXT NOT NULL, status TEXT NOT NULL, image BLOB, result TEXT, "
+        "error TEXT, compliant INTEGER, updated_at REAL NOT NULL, "
+        "PRIMARY KEY (job_id, position))"
+    )
+    db.execute(
+        "INSERT INTO items VALUES ('j', 0, 'a.png', 'running', x'00', NULL, NULL, NULL, 0)"
+    )
+    db.commit()
+    db.close()
+
+    assert JobStore(str(path)).recover() == 1
@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import tracemalloc
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services.uploads import PART_OVERHEAD_BYTES, PartSizeCounter, read_upload
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def one_mb_limit(monkeypatch):
+    monkeypatch.setattr(settings, "max_file_size_mb", 1)
+    monkeypatch.setattr(settings, "max_files", 1)
+
+
+def spooled_upload(data: bytes, size=None) -> UploadFile:
+    # Like a multipart part spooled to disk, without a known size by default
+    spool = tempfile.SpooledTemporaryFile(max_size=0)
+    spool.write(data)
+    spool.seek(0)
+    return UploadFile(spool, size=size, filename="label.png")
+
+
+def test_read_upload_adds_no_heap_copy():
+    data = os.urandom(8 * MB)
+    file = spooled_upload(data)
+
+    tracemalloc.start()
+    try:
+        upload = asyncio.run(read_upload(file))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    with upload:
+        assert upload.size == len(data)
+        assert upload.digest == hashlib.sha256(data).hexdigest()
+        with upload.view() as view:
+            assert view == data
+    # Chunks go straight from the spool into shared memory
+    assert peak < MB
+
+
+def test_read_upload_rejects_oversized_stream(one_mb_limit):
+    file = spooled_upload(b"\0" * (MB + 1))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(file))
+    assert error.value.status_code == 413
+
+
+def test_read_upload_rejects_known_size_without_reading(one_mb_limit):
+    file = UploadFile(io.BytesIO(), size=MB + 1, filename="label.png")
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(file))
+    assert error.value.status_code == 413
+
+
+def test_request_over_content_length_limit_is_rejected(one_mb_limit):
+    client = TestClient(app)
+    response = client.post(
+        "/api/verify", files={"files": ("label.png", b"\0" * (2 * MB), "image/png")}
+    )
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body exceeds 1MB"}
+
+
+def multipart_body(*files, boundary=b"x") -> bytes:
+    body = b""
+    for name, data in files:
+        body += (
+            b"--" + boundary + b"\r\n"
+            b'Content-Disposition: form-data; name="files"; filename="'
+            + name
+            + b'"\r\n\r\n'
+            + data
+            + b"\r\n"
+        )
+    return body + b"--" + boundary + b"--\r\n"
+
+
+def test_chunked_request_over_limit_is_rejected(one_mb_limit):
+    # Each file is within MAX_FILE_SIZE_MB, together they exceed the request
+    body = multipart_body((b"a.png", b"\0" * (MB // 2)), (b"b.png", b"\0" * MB))
+    client = TestClient(app)
+    response = client.post(
+        "/api/verify",
+        content=iter([body[:MB], body[MB:]]),
+        headers={"content-type": "multipart/form-data; boundary=x"},
+    )
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body exceeds 1MB"}
+
+
+def test_oversized_part_is_rejected_while_streaming(one_mb_limit):
+    body = multipart_body((b"a.png", b"a" * 100), (b"big.png", b"\0" * (3 * MB)))
+    counter = PartSizeCounter(b"x", MB + PART_OVERHEAD_BYTES)
+    chunks = [body[i : i + 7919] for i in range(0, len(body), 7919)]
+    fed = 0
+    for chunk in chunks:
+        fed += 1
+        if not counter.feed(chunk):
+            break
+    assert fed < len(chunks) // 2
+    assert counter.filename() == "big.png"
+
+
+def test_parts_within_limit_pass_with_split_delimiters():
+    files = [(f"{i}.png".encode(), b"\1" * 5000) for i in range(20)]
+    body = multipart_body(*files)
+    counter = PartSizeCounter(b"x", 5200)
+    # Chunk size chosen so delimiters fall across chunk boundaries
+    assert all(counter.feed(body[i : i + 3]) for i in range(0, len(body), 3))
+
+
+def test_archive_over_byte_cap_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "archive_max_mb", 1)
+    client = TestClient(app)
+    response = client.post("/api/jobs/archive", content=b"\0" * (2 * MB))
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body exceeds 1MB"}
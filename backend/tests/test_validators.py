@@ -0,0 +1,34 @@
+from app.services.document import LabelDocument
+from app.services.validators import (
+    REQUIRED_WARNING,
+    brand_candidate_lines,
+    validate_government_warning,
+)
+
+
+def test_warning_span_survives_characters_that_lowercase_longer():
+    # "İ".lower() is two code points; offsets must still index the OCR text
+    text = "İSTANBUL İTHALAT İÇKİ\n" + REQUIRED_WARNING + "\nBottled by X"
+    value, parsed, _, _ = validate_government_warning(text)
+    assert value == REQUIRED_WARNING
+    assert text[parsed["start"] : parsed["end"]] == REQUIRED_WARNING
+
+
+def test_lower_keeps_offsets():
+    doc = LabelDocument("İstanbul GOVERNMENT")
+    assert len(doc.lower) == len(doc.text)
+    assert doc.lower == "istanbul government"
+
+
+def test_document_index_maps_offsets_to_tokens_and_lines():
+    doc = LabelDocument("Old Tom\n45% Alc./Vol.")
+    assert doc.norm_words == ["old", "tom", "45", "alc", "vol"]
+    assert doc.token_index(doc.text.index("Alc")) == 3
+    assert doc.line_at(doc.text.index("Vol")) == 1
+    assert doc.line_words(1) == ["45", "alc", "vol"]
+
+
+def test_wrapped_warning_lines_are_not_brand_candidates():
+    words = REQUIRED_WARNING.split()
+    text = "\n".join(["Old Tom", " ".join(words[:20]), " ".join(words[20:])])
+    assert brand_candidate_lines(LabelDocument(text)) == [("Old Tom", "old tom")]
@@ -23,7 +23,7 @@ export default function Home() {
     setResults(null);
 
     try {
-      const response = await verifyLabels(files);
+      const response = await verifyLabels(files, setResults);
       setResults(response);
     } catch (err) {
       setError(err instanceof Error ? err.message : "An unexpected error occurred");
@@ -103,6 +103,23 @@ export default function Home() {
           )}
         </div>
 
+        {results?.errors && results.errors.length > 0 && (
+          <Alert variant="destructive" className="mb-6">
+            <AlertCircle className="h-4 w-4" />
+            <AlertTitle>
+              {results.errors.length} image{results.errors.length === 1 ? "" : "s"} could
+              not be verified
+            </AlertTitle>
+            <AlertDescription>
+              <ul className="list-disc pl-4">
+                {results.errors.map((message, i) => (
+                  <li key={i}>{message}</li>
+                ))}
+              </ul>
+            </AlertDescription>
+          </Alert>
+        )}
+
         {results && <BatchResults response={results} />}
 
         <footer className="mt-12 pt-6 border-t text-center text-sm text-gray-500">
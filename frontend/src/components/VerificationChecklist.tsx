@@ -20,7 +20,7 @@ const FIELD_LABELS: Record<keyof FieldResults, string> = {
 };
 
 export function VerificationChecklist({ result }: VerificationChecklistProps) {
-  const { fields, summary, filename, processing_time_ms } = result;
+  const { fields, summary, filename, processing_time_ms, timed_out, metadata } = result;
 
   return (
     <Card>
@@ -30,6 +30,9 @@ export function VerificationChecklist({ result }: VerificationChecklistProps) {
             <CardTitle className="text-lg">{filename}</CardTitle>
             <p className="text-sm text-gray-500 mt-1">
               Processed in {processing_time_ms}ms
+              {timed_out && " (time budget reached, partial result)"}
+              {metadata?.near_duplicate &&
+                ` (reused result of near-identical ${metadata.near_duplicate.filename})`}
             </p>
           </div>
           <div className="flex items-center gap-2">
@@ -1,9 +1,22 @@
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || '';
 
+export interface WarningDifference {
+  op: 'replace' | 'missing' | 'extra';
+  expected: string;
+  found: string;
+}
+
+export interface WarningAlignment {
+  start: number;
+  end: number;
+  similarity: number;
+  diff: WarningDifference[];
+}
+
 export interface FieldResult {
   status: 'detected' | 'missing' | 'formatting_issue';
   value?: string;
-  parsed_value?: number | { amount: number; unit: string } | null;
+  parsed_value?: number | { amount: number; unit: string } | WarningAlignment | null;
   issues?: string[];
   confidence?: number;
 }
@@ -31,6 +44,13 @@ export interface ImageResult {
   raw_text?: string;
   fields: FieldResults;
   summary: Summary;
+  cached?: boolean;
+  reused?: boolean;
+  timed_out?: boolean;
+  metadata?: {
+    near_duplicate?: { filename: string; distance: number };
+    [key: string]: unknown;
+  };
 }
 
 export interface BatchSummary {
@@ -42,24 +62,89 @@ export interface BatchSummary {
 export interface VerifyResponse {
   results: ImageResult[];
   batch_summary: BatchSummary;
+  /** "filename: reason" for each image that could not be verified */
+  errors?: string[];
+}
+
+export type VerifyStreamEvent =
+  | { type: 'result'; index: number; result: ImageResult }
+  | { type: 'error'; index: number; filename: string; error: unknown }
+  | { type: 'summary'; batch_summary: BatchSummary };
+
+// HTTPException details may be dicts or lists, not just strings
+function describe(detail: unknown): string {
+  return typeof detail === 'string' ? detail : JSON.stringify(detail);
 }
 
-export async function verifyLabels(files: File[]): Promise<VerifyResponse> {
+function summarize(results: ImageResult[]): BatchSummary {
+  const fully_compliant = results.filter((r) => r.summary.is_compliant).length;
+  return {
+    total_images: results.length,
+    fully_compliant,
+    needs_review: results.length - fully_compliant,
+  };
+}
+
+/**
+ * Verify labels, streaming results as each image finishes. onProgress is
+ * called with the results so far (in upload order) after every image; the
+ * returned promise resolves with the complete response. Images that fail
+ * are listed in errors; it only rejects if every image failed.
+ */
+export async function verifyLabels(
+  files: File[],
+  onProgress?: (partial: VerifyResponse) => void,
+): Promise<VerifyResponse> {
   const formData = new FormData();
   
   files.forEach((file) => {
     formData.append('files', file);
   });
 
-  const response = await fetch(`${API_BASE}/api/verify`, {
+  const response = await fetch(`${API_BASE}/api/verify?stream=true`, {
     method: 'POST',
     body: formData,
   });
 
-  if (!response.ok) {
+  if (!response.ok || !response.body) {
     const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
-    throw new Error(error.detail || `HTTP ${response.status}`);
+    throw new Error(error.detail ? describe(error.detail) : `HTTP ${response.status}`);
   }
 
-  return response.json();
+  const slots: (ImageResult | undefined)[] = new Array(files.length);
+  const errors: string[] = [];
+  let batchSummary: BatchSummary | null = null;
+
+  const handle = (line: string) => {
+    if (!line.trim()) return;
+    const event = JSON.parse(line) as VerifyStreamEvent;
+    if (event.type === 'result') {
+      slots[event.index] = event.result;
+      const results = slots.filter((r): r is ImageResult => r !== undefined);
+      onProgress?.({ results, batch_summary: summarize(results), errors: [...errors] });
+    } else if (event.type === 'error') {
+      errors.push(`${event.filename}: ${describe(event.error)}`);
+    } else {
+      batchSummary = event.batch_summary;
+    }
+  };
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+    lines.forEach(handle);
+  }
+  handle(buffer + decoder.decode());
+
+  const results = slots.filter((r): r is ImageResult => r !== undefined);
+  if (results.length === 0 && errors.length > 0) {
+    throw new Error(errors.join('; '));
+  }
+  return { results, batch_summary: batchSummary ?? summarize(results), errors };
 }